@@ -6,61 +6,116 @@ Interactive CLI interface for calculating remaining time to craft an ASU bag
 based on current resource collection progress and crafting chain requirements.
 """
 
+import argparse
+import csv
 import json
-import os
-from datetime import datetime, timedelta
-from config import CRAFTING_CHAIN, CONVERSIONS, SCAVENGING, BAG_CRAFTER, SYN_RATE
+import sys
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from config import CONVERSIONS, SCAVENGING, BAG_CRAFTER, SYN_RATE
 from utils import (calculate_scav_time, hours_to_days, calculate_expected_med_tech_per_run,
-                   calculate_tech_scrap_equivalent_from_inventory, calculate_eoc_equivalent_from_inventory,
+                   calculate_med_tech_total, calculate_tech_scrap_equivalent_from_inventory,
+                   calculate_eoc_equivalent_from_inventory,
                    calculate_remaining_bags_to_craft, calculate_craftable_bags_from_resources,
-                   calculate_total_requirements)
+                   calculate_total_requirements, validate_inventory_data, estimate_completion_date, add_days)
+from chain_plan import get_chain_plan
+from scav_distribution import calculate_scav_time_bands
+from storage import (INVENTORY_FILE, INVENTORY_FIELDS, DEFAULT_PLAYER, JsonInventoryStore,
+                     SqliteInventoryStore, file_lock, open_store)
+from snapshot_log import SnapshotLog, snapshot_log_path
+from rate_estimator import load_rate_estimator, save_rate_estimator
+from inventory import Inventory, InventoryArray
+from crafting_schedule import plan_crafting_schedule
+from pipeline import calculate_pipeline
+from cost_optimizer import optimize_bag_crafter
+from guild_planner import plan_guild
+from sweep import parse_grid, run_sweep
+import instrumentation
+from instrumentation import EXPORT_FORMATS, PROFILE_SORTS, stage, time_stage
+from inverse_solver import (runs_per_day_for_date, completion_for_runs_per_day, achievable_asus,
+                            runs_per_day_for_date_batch, completion_for_runs_per_day_batch,
+                            achievable_asus_batch)
 
-INVENTORY_FILE = "asu_inventory.json"
+STREAM_CHUNK_LINES = 1000
+STREAM_BUFFER_BYTES = 1 << 20
 
 class ASUCalculator:
-    def __init__(self):
-        self.inventory = self.load_inventory()
+    def __init__(self, inventory=None, store=None, snapshot_log=None, rate_estimator=None, verbose=True,
+                 as_of=None):
+        """Create a calculator for the given inventory, or the stored one if omitted
+        
+        inventory is an inventory dict or an inventory.Inventory.
+        store is any storage backend with load() and save(inventory); the
+        default is the JSON file INVENTORY_FILE. Every save is also appended
+        to snapshot_log, by default the store's log for its player (see
+        snapshot_log.snapshot_log_path).
+        Recent collection rates come from rate_estimator, which is loaded for
+        the snapshot log when the inventory is loaded from the store. Pass
+        verbose=False to silence load/save messages (e.g. for piped output).
+        Time-dependent results are calculated as of the as_of datetime, or
+        the current time when it is None.
+        """
+        self.verbose = verbose
+        self.as_of = as_of
+        self.store = store if store is not None else JsonInventoryStore(INVENTORY_FILE)
+        if snapshot_log is None:
+            snapshot_log = SnapshotLog(snapshot_log_path(self.store))
+        self.snapshot_log = snapshot_log
+        if inventory is None:
+            inventory = self.load_inventory()
+            if rate_estimator is None:
+                rate_estimator = load_rate_estimator(snapshot_log)
+        self.inventory = inventory
+        self.rate_estimator = rate_estimator
     
     def load_inventory(self):
-        """Load inventory from JSON file or create new one"""
-        if os.path.exists(INVENTORY_FILE):
+        """Load inventory from the store or create new one"""
+        with stage('load'):
             try:
-                with open(INVENTORY_FILE, 'r') as f:
-                    inventory = json.load(f)
-                print(f"✅ Loaded inventory from {INVENTORY_FILE}")
-                return inventory
+                inventory = self.store.load()
+                if inventory is not None:
+                    if self.verbose:
+                        print(f"✅ Loaded inventory from {self.store.path}")
+                    return inventory
             except (json.JSONDecodeError, FileNotFoundError):
-                print(f"⚠️  Error loading {INVENTORY_FILE}, creating new inventory")
-        
-        # Create new inventory with default values
-        inventory = {
-            "tech_scraps": 0,
-            "tech_scrap_clusters": 0,
-            "med_tech": 0,
-            "med_tech_clusters": 0,
-            "bitcoin": 0,
-            "old_pouches": 0,
-            "fanny_packs": 0,
-            "explorer_backpacks": 0,
-            "employee_office_cases": 0,
-            "asus": 0,
-            "start_date": None,
-            "last_updated": None
-        }
-        return inventory
+                if self.verbose:
+                    print(f"⚠️  Error loading {self.store.path}, creating new inventory")
+            
+            # Create new inventory with default values
+            inventory = {
+                "tech_scraps": 0,
+                "tech_scrap_clusters": 0,
+                "med_tech": 0,
+                "med_tech_clusters": 0,
+                "bitcoin": 0,
+                "old_pouches": 0,
+                "fanny_packs": 0,
+                "explorer_backpacks": 0,
+                "employee_office_cases": 0,
+                "asus": 0,
+                "start_date": None,
+                "last_updated": None
+            }
+            return inventory
     
     def save_inventory(self):
-        """Save current inventory to JSON file"""
-        self.inventory["last_updated"] = datetime.now().isoformat()
-        
-        # Create backup if file exists
-        if os.path.exists(INVENTORY_FILE):
-            backup_file = f"{INVENTORY_FILE}.backup"
-            os.rename(INVENTORY_FILE, backup_file)
-        
-        with open(INVENTORY_FILE, 'w') as f:
-            json.dump(self.inventory, f, indent=2)
-        print(f"💾 Inventory saved to {INVENTORY_FILE}")
+        """Save current inventory to the store"""
+        with stage('save'):
+            self.inventory["last_updated"] = datetime.now().isoformat()
+            self.store.save(self.inventory)
+            
+            # Other processes may have saved since we loaded, so refresh the
+            # estimator from disk while holding the log's lock
+            with file_lock(self.snapshot_log.path):
+                if self.rate_estimator is not None:
+                    self.rate_estimator = load_rate_estimator(self.snapshot_log)
+                record = self.snapshot_log.append(self.inventory)
+                if self.rate_estimator is not None:
+                    self.rate_estimator.update(record['recorded_at'], record['tech_scrap_equivalent'])
+                    save_rate_estimator(self.rate_estimator, self.snapshot_log)
+            if self.verbose:
+                print(f"💾 Inventory saved to {self.store.path}")
     
     def update_inventory(self):
         """Interactive inventory update"""
@@ -111,13 +166,21 @@ class ASUCalculator:
         """Calculate total tech scrap equivalent from all inventory"""
         return calculate_tech_scrap_equivalent_from_inventory(self.inventory)
     
-    def calculate_collection_rate(self):
+    def resolve_as_of(self, as_of=None):
+        """The time to calculate results at: as_of, else the calculator's as_of, else now"""
+        if as_of is not None:
+            return as_of
+        if self.as_of is not None:
+            return self.as_of
+        return datetime.now()
+    
+    def calculate_collection_rate(self, as_of=None):
         """Calculate actual collection rate based on start date"""
         if not self.inventory.get("start_date"):
             return None
         
         start_date = datetime.fromisoformat(self.inventory["start_date"])
-        days_elapsed = (datetime.now() - start_date).total_seconds() / 86400
+        days_elapsed = (self.resolve_as_of(as_of) - start_date).total_seconds() / 86400
         
         if days_elapsed <= 0:
             return None
@@ -129,29 +192,54 @@ class ASUCalculator:
         expected_per_run = calculate_expected_med_tech_per_run()
         scav_runs_per_day = daily_rate / (expected_per_run * CONVERSIONS['recycle_ratio'])
         
+        # Rolling window and EWMA rates from the snapshot history
+        recent_rates = None
+        if self.rate_estimator is not None:
+            recent_rates = self.rate_estimator.rates()
+        
         return {
             'days_elapsed': days_elapsed,
             'tech_scrap_collected': tech_scrap_collected,
             'daily_rate': daily_rate,
-            'scav_runs_per_day': scav_runs_per_day
+            'scav_runs_per_day': scav_runs_per_day,
+            'recent_rates': recent_rates
         }
     
     def calculate_eoc_progress(self):
         """Calculate current progress in EOC equivalents"""
         return calculate_eoc_equivalent_from_inventory(self.inventory)
     
-    def calculate_results_data(self):
-        """Calculate all results data without any display logic"""
-        total_req = calculate_total_requirements()
-        collection_rate = self.calculate_collection_rate()
-        eoc_progress = self.calculate_eoc_progress()
+    def calculate_static_results(self, total_req=None):
+        """Calculate the results that depend only on inventory amounts and config
         
-        # Remaining gathering requirements
-        remaining_eocs = max(0, total_req['employee_office_cases'] - eoc_progress)
+        Everything except collection_rate and completion_estimate, which
+        depend on the current time and the start date.
+        """
+        if total_req is None:
+            total_req = time_stage('results.total_requirements', calculate_total_requirements)
+        remaining_bags = time_stage('results.remaining_bags', calculate_remaining_bags_to_craft, self.inventory)
+        return {
+            'total_requirements': total_req,
+            'eoc_progress': time_stage('results.eoc_progress', self.calculate_eoc_progress),
+            'remaining_gathering': time_stage('results.remaining_gathering', self.calculate_remaining_gathering,
+                                              total_req),
+            'remaining_bags': remaining_bags,
+            'crafting_totals': time_stage('results.crafting_totals', self.calculate_crafting_totals, remaining_bags),
+            'bag_crafter_service': time_stage('results.bag_crafter_service', self.calculate_bag_crafter_service,
+                                              remaining_bags)
+        }
+    
+    def calculate_pipeline(self, remaining_bags=None):
+        """Scav, recycle and craft as a concurrent pipeline (see pipeline.calculate_pipeline)"""
+        return time_stage('results.pipeline', calculate_pipeline, self.inventory, remaining_bags)
+    
+    def calculate_remaining_gathering(self, total_req=None):
+        """Tech scraps still to gather, MTC still to scavenge and the scav time for it"""
+        if total_req is None:
+            total_req = calculate_total_requirements()
         remaining_tech_scraps = max(0, total_req['tech_scraps'] - self.calculate_tech_scrap_equivalent())
         
-        current_med_tech_total = (self.inventory['med_tech'] + 
-                                 self.inventory['med_tech_clusters'] * CONVERSIONS['med_tech_per_cluster'])
+        current_med_tech_total = calculate_med_tech_total(self.inventory)
         med_tech_needed_for_remaining = remaining_tech_scraps / CONVERSIONS['recycle_ratio']
         remaining_mtc_needed = max(0, med_tech_needed_for_remaining - current_med_tech_total) / CONVERSIONS['med_tech_per_cluster']
         
@@ -160,35 +248,38 @@ class ASUCalculator:
         if remaining_mtc_needed > 0:
             med_tech_needed = remaining_mtc_needed * CONVERSIONS['med_tech_per_cluster']
             scav_time_gathering = calculate_scav_time(med_tech_needed)
+            scav_time_gathering['bands'] = calculate_scav_time_bands(med_tech_needed)
         
-        # Remaining bags to craft
-        remaining_bags = calculate_remaining_bags_to_craft(self.inventory)
-        
-        # Crafting time and BTC calculations
-        total_crafting_time_minutes = (
-            remaining_bags['old_pouches'] * CRAFTING_CHAIN['old_pouch']['crafting_time_minutes'] +
-            remaining_bags['fanny_packs'] * CRAFTING_CHAIN['fanny_pack']['crafting_time_minutes'] +
-            remaining_bags['explorer_backpacks'] * CRAFTING_CHAIN['explorer_backpack']['crafting_time_minutes'] +
-            remaining_bags['employee_office_cases'] * CRAFTING_CHAIN['employee_office_case']['crafting_time_minutes'] +
-            remaining_bags['asus'] * CRAFTING_CHAIN['asu']['crafting_time_minutes']
-        )
-        
-        total_crafting_btc = (
-            remaining_bags['old_pouches'] * CRAFTING_CHAIN['old_pouch']['bitcoin'] +
-            remaining_bags['fanny_packs'] * CRAFTING_CHAIN['fanny_pack']['bitcoin'] +
-            remaining_bags['explorer_backpacks'] * CRAFTING_CHAIN['explorer_backpack']['bitcoin'] +
-            remaining_bags['employee_office_cases'] * CRAFTING_CHAIN['employee_office_case']['bitcoin'] +
-            remaining_bags['asus'] * CRAFTING_CHAIN['asu']['bitcoin']
-        )
+        return {
+            'tech_scraps': remaining_tech_scraps,
+            'mtc_needed': remaining_mtc_needed,
+            'scav_time': scav_time_gathering
+        }
+    
+    def calculate_crafting_totals(self, remaining_bags):
+        """Crafting time (with and without syn) and BTC for the remaining bags"""
+        plan = get_chain_plan()
+        total_crafting_time_minutes = plan.crafting_minutes(remaining_bags)
+        total_crafting_btc = plan.crafting_bitcoin(remaining_bags)
         
         total_crafting_time_hours = total_crafting_time_minutes / 60
         total_crafting_time_days = hours_to_days(total_crafting_time_hours)
         total_crafting_time_hours_syn = total_crafting_time_hours * SYN_RATE
         total_crafting_time_days_syn = hours_to_days(total_crafting_time_hours_syn)
         
-        # Bag crafter service calculations
+        return {
+            'time_hours': total_crafting_time_hours,
+            'time_days': total_crafting_time_days,
+            'time_hours_syn': total_crafting_time_hours_syn,
+            'time_days_syn': total_crafting_time_days_syn,
+            'btc': total_crafting_btc
+        }
+    
+    def calculate_bag_crafter_service(self, remaining_bags):
+        """Doras to buy from the Bag Crafter Service, their MTC and BTC cost, and what is left after"""
+        plan = get_chain_plan()
         craftable_resources = calculate_craftable_bags_from_resources(self.inventory)
-        doras_still_needed = remaining_bags['explorer_backpacks']
+        doras_still_needed = remaining_bags[plan.dora_field]
         doras_you_can_craft = craftable_resources['total_craftable_doras']
         doras_to_buy = max(0, doras_still_needed - doras_you_can_craft)
         
@@ -204,14 +295,13 @@ class ASUCalculator:
         # After buying Doras calculations
         after_buying_doras = None
         if doras_to_buy > 0:
+            # Only the tiers crafted from Doras are left to craft
             current_btc = self.inventory['bitcoin']
-            remaining_eocs_after_purchase = remaining_bags['employee_office_cases']
-            remaining_btc_after_doras = (remaining_eocs_after_purchase * CRAFTING_CHAIN['employee_office_case']['bitcoin'] + 
-                                       CRAFTING_CHAIN['asu']['bitcoin'] - current_btc + btc_for_clustering)
+            remaining_after_purchase = {field: remaining_bags[field] for field in plan.fields_above_dora}
+            remaining_btc_after_doras = (plan.crafting_bitcoin(remaining_after_purchase) - current_btc +
+                                         btc_for_clustering)
             
-            eoc_crafting_time = remaining_eocs_after_purchase * CRAFTING_CHAIN['employee_office_case']['crafting_time_minutes']
-            asu_crafting_time = CRAFTING_CHAIN['asu']['crafting_time_minutes']
-            total_crafting_time_hours_after = (eoc_crafting_time + asu_crafting_time) / 60
+            total_crafting_time_hours_after = plan.crafting_minutes(remaining_after_purchase) / 60
             total_crafting_time_hours_syn_after = total_crafting_time_hours_after * SYN_RATE
             
             after_buying_doras = {
@@ -220,50 +310,92 @@ class ASUCalculator:
                 'crafting_time_hours_syn': total_crafting_time_hours_syn_after
             }
         
+        return {
+            'doras_still_needed': doras_still_needed,
+            'ops_from_tech_scraps': craftable_resources['ops_from_tech_scraps'],
+            'doras_you_can_craft': doras_you_can_craft,
+            'doras_to_buy': doras_to_buy,
+            'mtc_cost': mtc_cost_for_doras,
+            'btc_for_clustering': btc_for_clustering,
+            'scav_time': scav_time_bag_crafter,
+            'after_buying_doras': after_buying_doras
+        }
+    
+    def calculate_time_results(self, remaining_tech_scraps, as_of=None):
+        """Calculate the time-dependent results: collection rate and completion estimate"""
+        as_of = self.resolve_as_of(as_of)
+        collection_rate = self.calculate_collection_rate(as_of)
+        
         # Completion estimate
         completion_estimate = None
         if collection_rate and collection_rate['daily_rate'] > 0:
             days_to_completion = remaining_tech_scraps / collection_rate['daily_rate']
-            completion_date = datetime.now() + timedelta(days=days_to_completion)
+            completion_date = estimate_completion_date(remaining_tech_scraps, collection_rate['daily_rate'], as_of)
             completion_estimate = {
                 'days_to_completion': days_to_completion,
                 'completion_date': completion_date
             }
+            
+            # Same estimate at the recent (EWMA) rate, which follows cadence changes
+            recent_rates = collection_rate['recent_rates']
+            if recent_rates and recent_rates['ewma'] and recent_rates['ewma'] > 0:
+                recent_days = remaining_tech_scraps / recent_rates['ewma']
+                completion_estimate['recent_days_to_completion'] = recent_days
+                completion_estimate['recent_completion_date'] = estimate_completion_date(
+                    remaining_tech_scraps, recent_rates['ewma'], as_of)
         
         return {
-            'total_requirements': total_req,
             'collection_rate': collection_rate,
-            'eoc_progress': eoc_progress,
-            'remaining_gathering': {
-                'tech_scraps': remaining_tech_scraps,
-                'mtc_needed': remaining_mtc_needed,
-                'scav_time': scav_time_gathering
-            },
-            'remaining_bags': remaining_bags,
-            'crafting_totals': {
-                'time_hours': total_crafting_time_hours,
-                'time_days': total_crafting_time_days,
-                'time_hours_syn': total_crafting_time_hours_syn,
-                'time_days_syn': total_crafting_time_days_syn,
-                'btc': total_crafting_btc
-            },
-            'bag_crafter_service': {
-                'doras_still_needed': doras_still_needed,
-                'ops_from_tech_scraps': craftable_resources['ops_from_tech_scraps'],
-                'doras_you_can_craft': doras_you_can_craft,
-                'doras_to_buy': doras_to_buy,
-                'mtc_cost': mtc_cost_for_doras,
-                'btc_for_clustering': btc_for_clustering,
-                'scav_time': scav_time_bag_crafter,
-                'after_buying_doras': after_buying_doras
-            },
             'completion_estimate': completion_estimate
         }
     
+    def calculate_results_data(self, total_req=None, cache=None, as_of=None, pipeline=False):
+        """Calculate all results data without any display logic
+        
+        When a ResultsCache is given, the time-independent results are looked
+        up by inventory amounts and only computed on a miss. Cached parts are
+        shared between calls and must be treated as read-only. Time-dependent
+        results are calculated as of as_of (see resolve_as_of). The pipeline
+        model is only added, as 'pipeline', when asked for.
+        """
+        if cache is not None:
+            static = cache.get_or_compute(self.inventory, lambda: self.calculate_static_results(total_req))
+        else:
+            static = self.calculate_static_results(total_req)
+        timed = time_stage('results.time', self.calculate_time_results,
+                           static['remaining_gathering']['tech_scraps'], as_of)
+        
+        results = {
+            'total_requirements': static['total_requirements'],
+            'collection_rate': timed['collection_rate'],
+            'eoc_progress': static['eoc_progress'],
+            'remaining_gathering': static['remaining_gathering'],
+            'remaining_bags': static['remaining_bags'],
+            'crafting_totals': static['crafting_totals'],
+            'bag_crafter_service': static['bag_crafter_service'],
+            'completion_estimate': timed['completion_estimate']
+        }
+        if pipeline:
+            results['pipeline'] = self.calculate_pipeline(static['remaining_bags'])
+        return results
+    
+    def calculate_crafting_schedule(self, slots=1, syn_windows=(), as_of=None):
+        """Plan the remaining crafts over parallel slots with syn windows (see crafting_schedule)"""
+        remaining_bags = calculate_remaining_bags_to_craft(self.inventory)
+        return plan_crafting_schedule(remaining_bags, slots, syn_windows, self.resolve_as_of(as_of))
+    
+    def optimize_bag_crafter(self, objective='time', max_btc=None, max_minutes=None):
+        """Best number of Doras to buy from the Bag Crafter Service (see cost_optimizer)"""
+        return optimize_bag_crafter(self.inventory, objective, max_btc, max_minutes)
+    
     def display_results(self):
         """Display comprehensive calculation results"""
         results = self.calculate_results_data()
-        
+        with stage('render'):
+            self.print_results(results)
+    
+    def print_results(self, results):
+        """Print a calculate_results_data() dict in human-readable form"""
         print("\n" + "="*60)
         print("🎯 ASU CALCULATOR RESULTS")
         print("="*60)
@@ -283,6 +415,11 @@ class ASUCalculator:
             print(f"   Tech scrap collected (equivalent): {collection_rate['tech_scrap_collected']:,}")
             print(f"   Average per day: {collection_rate['daily_rate']:,.0f} tech scraps/day")
             print(f"   Estimated scav runs per day: {collection_rate['scav_runs_per_day']:.1f}")
+            recent_rates = collection_rate['recent_rates']
+            if recent_rates:
+                recent = [f"{name}: {rate:,.0f}" for name, rate in recent_rates.items() if rate is not None]
+                if recent:
+                    print(f"   Recent rates (tech scraps/day): {', '.join(recent)}")
         
         # Progress
         eoc_progress = results['eoc_progress']
@@ -300,6 +437,9 @@ class ASUCalculator:
             scav_time = gathering['scav_time']
             print(f"   Scav Time (without syn): {scav_time['hours_no_syn']:.1f} hours ({scav_time['days_no_syn']:.1f} days)")
             print(f"   Scav Time (with syn): {scav_time['hours_with_syn']:.1f} hours ({scav_time['days_with_syn']:.1f} days)")
+            p50, p90 = scav_time['bands']['p50'], scav_time['bands']['p90']
+            print(f"   Scav Runs (50% / 90% confidence): {p50['runs']:,} / {p90['runs']:,} runs "
+                  f"({p50['days_no_syn']:.1f} / {p90['days_no_syn']:.1f} days without syn)")
         
         # Remaining bags to craft
         remaining_bags = results['remaining_bags']
@@ -338,15 +478,625 @@ class ASUCalculator:
         else:
             print(f"   No Doras need to be purchased - you can craft all needed Doras")
         
+        # Scavenging, recycling and crafting running at the same time
+        pipeline = results.get('pipeline') or self.calculate_pipeline(results['remaining_bags'])
+        if pipeline['bottleneck']:
+            print(f"\n🏭 PIPELINE (scav, recycle and craft in parallel, without syn):")
+            for name, pipeline_stage in pipeline['stages'].items():
+                print(f"   {name.capitalize()}: {pipeline_stage['busy_minutes'] / 60:,.1f} hours busy "
+                      f"x{pipeline_stage['slots']} slots ({pipeline_stage['utilization'] * 100:.0f}% utilized)")
+            print(f"   Bottleneck: {pipeline['bottleneck']}")
+            print(f"   End-to-end: {pipeline['completion_hours']:,.1f} hours ({pipeline['completion_days']:.1f} days), "
+                  f"vs {pipeline['sequential_hours']:,.1f} hours one stage at a time")
+        
         # Completion estimate
         completion = results['completion_estimate']
         if completion:
             print(f"\n⏳ COMPLETION ESTIMATE:")
             print(f"   Days to completion: {completion['days_to_completion']:.1f}")
-            print(f"   Estimated completion: {completion['completion_date'].strftime('%Y-%m-%d %H:%M')}")
+            print(f"   Estimated completion: {_format_date(completion['completion_date'])}")
+            if 'recent_completion_date' in completion:
+                print(f"   At recent rate: {completion['recent_days_to_completion']:.1f} days "
+                      f"({_format_date(completion['recent_completion_date'])})")
 
-def main():
-    """Main application entry point"""
+def _format_date(date):
+    """A completion date for display; None means it falls after year 9999"""
+    return date.strftime('%Y-%m-%d %H:%M') if date is not None else "after year 9999"
+
+def flatten_results(results, prefix=""):
+    """Flatten a nested results dict into dotted keys, e.g. 'crafting_totals.btc'"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_results(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+def _flatten_columns(results, size):
+    """flatten_results() for results whose values are columns (arrays, lists or one shared value)
+    
+    A (present, part) tuple stands for a part that is None for some
+    inventories. Its columns hold None where present is false and, as in the
+    row-by-row output, a column of None under its own name is added when any
+    inventory lacks it.
+    """
+    columns = {}
+    missing = []
+    
+    def flatten(part, prefix, present):
+        for key, value in part.items():
+            name = f"{prefix}{key}"
+            if isinstance(value, tuple):
+                has_part, value = value
+                if present is not None:
+                    lacking = present & ~has_part
+                    has_part = present & has_part
+                else:
+                    lacking = ~has_part
+                if lacking.any():
+                    missing.append(name)
+                if has_part.any():
+                    flatten(value, f"{name}.", None if has_part.all() else has_part)
+            elif isinstance(value, dict):
+                flatten(value, f"{name}.", present)
+            else:
+                if isinstance(value, list):
+                    values = value
+                elif getattr(value, 'ndim', 0):
+                    values = value.tolist()
+                else:
+                    values = [value] * size
+                if present is not None:
+                    values = [item if flag else None for item, flag in zip(values, present.tolist())]
+                columns[name] = values
+    
+    flatten(results, "", None)
+    for name in missing:
+        columns[name] = [None] * size
+    return columns
+
+def _inventory_columns(inventories):
+    """Amount columns cleaned up like validate_inventory_data(), and the start dates"""
+    import vectorized
+    np = vectorized.np
+    if isinstance(inventories, InventoryArray):
+        columns = {field: np.maximum(column, 0) for field, column in inventories.columns().items()}
+        return columns, inventories.start_dates()
+    
+    columns = {}
+    for field in INVENTORY_FIELDS:
+        values = [inventory.get(field, 0) for inventory in inventories]
+        column = np.asarray(values)
+        if column.dtype.kind not in 'iuf':
+            column = np.asarray([value if isinstance(value, (int, float)) and value >= 0 else 0 for value in values])
+            if column.dtype.kind == 'b':
+                column = column.astype(np.int64)
+        columns[field] = np.where(column < 0, 0, column)
+    return columns, [inventory.get('start_date') for inventory in inventories]
+
+def _results_columns(inventories, as_of):
+    """calculate_results_batch() columns, each computed for every inventory at once with vectorized.py"""
+    import vectorized
+    np = vectorized.np
+    if not isinstance(inventories, InventoryArray):
+        inventories = list(inventories)
+    if not len(inventories):
+        return {}
+    columns, start_dates = _inventory_columns(inventories)
+    size = len(start_dates)
+    plan = get_chain_plan()
+    total_req = calculate_total_requirements()
+    per_cluster = CONVERSIONS['med_tech_per_cluster']
+    
+    # Static results, as in ASUCalculator.calculate_static_results()
+    equivalent = vectorized.calculate_tech_scrap_equivalent_from_inventory(columns)
+    remaining_tech_scraps = np.maximum(0, total_req['tech_scraps'] - equivalent)
+    med_tech_held = columns['med_tech'] + columns['med_tech_clusters'] * per_cluster
+    mtc_needed = np.maximum(0, remaining_tech_scraps / CONVERSIONS['recycle_ratio'] - med_tech_held) / per_cluster
+    gathering_scav_time = vectorized.calculate_scav_time(mtc_needed * per_cluster)
+    gathering_scav_time['bands'] = vectorized.calculate_scav_time_bands(mtc_needed * per_cluster)
+    
+    remaining_bags = vectorized.calculate_remaining_bags_to_craft(columns)
+    crafting_hours = plan.crafting_minutes(remaining_bags) / 60
+    crafting_hours_syn = crafting_hours * SYN_RATE
+    
+    craftable = vectorized.calculate_craftable_bags_from_resources(columns)
+    doras_still_needed = remaining_bags[plan.dora_field]
+    doras_you_can_craft = craftable['total_craftable_doras']
+    doras_to_buy = np.maximum(0, doras_still_needed - doras_you_can_craft)
+    mtc_cost = doras_to_buy * BAG_CRAFTER['mtc_per_dora']
+    btc_for_clustering = mtc_cost * CONVERSIONS['cluster_cost_mtc']
+    remaining_after_purchase = {field: remaining_bags[field] for field in plan.fields_above_dora}
+    hours_after_purchase = plan.crafting_minutes(remaining_after_purchase) / 60
+    
+    # Time-dependent results, as in ASUCalculator.calculate_time_results()
+    days_elapsed = np.ones(size)
+    has_rate = np.zeros(size, dtype=bool)
+    for index, start_date in enumerate(start_dates):
+        if not start_date:
+            continue
+        try:
+            start = datetime.fromisoformat(start_date)
+        except (ValueError, TypeError):
+            continue
+        days = (as_of - start).total_seconds() / 86400
+        if days > 0:
+            days_elapsed[index] = days
+            has_rate[index] = True
+    daily_rate = equivalent / days_elapsed
+    has_estimate = has_rate & (daily_rate > 0)
+    days_to_completion = remaining_tech_scraps / np.where(has_estimate, daily_rate, 1)
+    completion_dates = [add_days(as_of, days) if estimated else None
+                        for days, estimated in zip(days_to_completion.tolist(), has_estimate.tolist())]
+    
+    results = {
+        'total_requirements': total_req,
+        'collection_rate': (has_rate, {
+            'days_elapsed': days_elapsed,
+            'tech_scrap_collected': equivalent,
+            'daily_rate': daily_rate,
+            'scav_runs_per_day': daily_rate / (calculate_expected_med_tech_per_run() * CONVERSIONS['recycle_ratio']),
+            'recent_rates': None
+        }),
+        'eoc_progress': vectorized.calculate_eoc_equivalent_from_inventory(columns),
+        'remaining_gathering': {
+            'tech_scraps': remaining_tech_scraps,
+            'mtc_needed': mtc_needed,
+            'scav_time': (mtc_needed > 0, gathering_scav_time)
+        },
+        'remaining_bags': remaining_bags,
+        'crafting_totals': {
+            'time_hours': crafting_hours,
+            'time_days': crafting_hours / 24,
+            'time_hours_syn': crafting_hours_syn,
+            'time_days_syn': crafting_hours_syn / 24,
+            'btc': plan.crafting_bitcoin(remaining_bags)
+        },
+        'bag_crafter_service': {
+            'doras_still_needed': doras_still_needed,
+            'ops_from_tech_scraps': craftable['ops_from_tech_scraps'],
+            'doras_you_can_craft': doras_you_can_craft,
+            'doras_to_buy': doras_to_buy,
+            'mtc_cost': mtc_cost,
+            'btc_for_clustering': btc_for_clustering,
+            'scav_time': (mtc_cost > 0, vectorized.calculate_scav_time(mtc_cost * per_cluster)),
+            'after_buying_doras': (doras_to_buy > 0, {
+                'btc_needed': (plan.crafting_bitcoin(remaining_after_purchase) - columns['bitcoin'] +
+                               btc_for_clustering),
+                'crafting_time_hours': hours_after_purchase,
+                'crafting_time_hours_syn': hours_after_purchase * SYN_RATE
+            })
+        },
+        'completion_estimate': (has_estimate, {
+            'days_to_completion': days_to_completion,
+            'completion_date': completion_dates
+        })
+    }
+    return _flatten_columns(results, size)
+
+def calculate_results_batch(inventories, columnar=True, cache=None, as_of=None, pipeline=False):
+    """Calculate results for many inventory dicts in one pass
+    
+    No file I/O or printing is done. Inventories (dicts, Inventory objects or
+    an InventoryArray) are validated on a copy, so partial dicts are accepted. Returns a dict of columns keyed by flattened
+    result name when columnar (missing values are None), otherwise a list of
+    results dicts in input order. Every inventory is calculated as of the same
+    time, as_of or the time of the call. pipeline adds the pipeline model to
+    each result.
+    
+    With NumPy installed, columnar results without the pipeline are computed
+    a column at a time with vectorized.py. Otherwise each inventory goes
+    through ASUCalculator, and a ResultsCache skips recomputing repeated
+    inventories.
+    """
+    if as_of is None:
+        as_of = datetime.now()
+    if columnar and not pipeline:
+        import vectorized
+        if vectorized.HAS_NUMPY:
+            return _results_columns(inventories, as_of)
+    
+    total_req = calculate_total_requirements()
+    rows = []
+    for inventory in inventories:
+        inventory = inventory.copy() if isinstance(inventory, Inventory) else dict(inventory)
+        calculator = ASUCalculator(time_stage('validate', validate_inventory_data, inventory), as_of=as_of)
+        results = calculator.calculate_results_data(total_req, cache, pipeline=pipeline)
+        rows.append(flatten_results(results) if columnar else results)
+    
+    if not columnar:
+        return rows
+    
+    columns = {}
+    for index, row in enumerate(rows):
+        for name, value in row.items():
+            if name not in columns:
+                columns[name] = [None] * index
+            columns[name].append(value)
+        for name, column in columns.items():
+            if len(column) <= index:
+                column.append(None)
+    return columns
+
+def json_default(value):
+    """Serialize datetimes in results as ISO format strings"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def write_records(records, output_format, out):
+    """Write a (possibly nested) dict or list of dicts as JSON, or as CSV with flattened columns"""
+    with stage('render'):
+        _write_records(records, output_format, out)
+
+def _write_records(records, output_format, out):
+    if output_format == 'json':
+        json.dump(records, out, indent=2, default=json_default)
+        out.write("\n")
+        return
+    
+    if isinstance(records, dict):
+        records = [records]
+    rows = [flatten_results(record) for record in records]
+    columns = []
+    for row in rows:
+        columns.extend(name for name in row if name not in columns)
+    writer = csv.DictWriter(out, fieldnames=columns, restval='', lineterminator='\n')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({name: json_default(value) if isinstance(value, datetime) else value
+                         for name, value in row.items()})
+
+def _read_inventories(path):
+    """Read one inventory object or a list of them from a JSON file ('-' for stdin)"""
+    if path == '-':
+        inventories = json.load(sys.stdin)
+    else:
+        with open(path, 'r') as f:
+            inventories = json.load(f)
+    if isinstance(inventories, list):
+        if not all(isinstance(inventory, dict) for inventory in inventories):
+            raise ValueError("inventory list items must be objects")
+    elif not isinstance(inventories, dict):
+        raise ValueError("input must be an inventory object or a list of them")
+    return inventories
+
+def _inventory_overrides(args):
+    """Inventory fields given as command line flags"""
+    overrides = {field: getattr(args, field) for field in INVENTORY_FIELDS
+                 if getattr(args, field) is not None}
+    if getattr(args, 'start_date', None):
+        overrides['start_date'] = datetime.strptime(args.start_date, "%Y-%m-%d").isoformat()
+    return overrides
+
+def _command_compute(args, out):
+    """Compute results for inventories from --input, flags, or the store"""
+    overrides = _inventory_overrides(args)
+    if args.input:
+        inventories = _read_inventories(args.input)
+        if isinstance(inventories, list):
+            inventories = [dict(inventory, **overrides) for inventory in inventories]
+            write_records(calculate_results_batch(inventories, columnar=False, as_of=args.as_of,
+                                                  pipeline=args.pipeline), args.format, out)
+            return
+        inventory = dict(inventories, **overrides)
+    elif overrides:
+        inventory = overrides
+    else:
+        inventory = _stored_inventory(args)
+    
+    write_records(calculate_results_batch([inventory], columnar=False, as_of=args.as_of, pipeline=args.pipeline)[0],
+                  args.format, out)
+
+def _stored_inventory(args):
+    """Latest inventory of --player in --store"""
+    with open_store(args.store, args.player) as store:
+        return ASUCalculator(store=store, verbose=False).inventory
+
+def _single_inventory_calculator(args):
+    """Calculator for one inventory from --input, flags, or the store"""
+    overrides = _inventory_overrides(args)
+    if args.input:
+        inventory = dict(_read_inventories(args.input), **overrides)
+    elif overrides:
+        inventory = overrides
+    else:
+        inventory = _stored_inventory(args)
+    return ASUCalculator(time_stage('validate', validate_inventory_data, dict(inventory)), verbose=False,
+                         as_of=getattr(args, 'as_of', None))
+
+def _command_schedule(args, out):
+    """Plan the remaining crafts for an inventory from --input, flags, or the store"""
+    calculator = _single_inventory_calculator(args)
+    syn_windows = [(start * 60, end * 60) for start, end in args.syn_window or []]
+    schedule = calculator.calculate_crafting_schedule(args.slots, syn_windows)
+    write_records(schedule['steps'] if args.format == 'csv' else schedule, args.format, out)
+
+def _command_optimize(args, out):
+    """Choose how many Doras to buy for an inventory from --input, flags, or the store"""
+    calculator = _single_inventory_calculator(args)
+    max_minutes = args.max_hours * 60 if args.max_hours is not None else None
+    write_records(calculator.optimize_bag_crafter(args.objective, args.max_btc, max_minutes), args.format, out)
+
+def _population(args):
+    """Inventories from --input, or the latest of every player in a database store"""
+    if args.input:
+        return _read_inventories(args.input)
+    with open_store(args.store, args.player) as store:
+        if not hasattr(store, 'latest'):
+            raise ValueError(f"{args.command} needs --input or a database --store with several players")
+        return store.latest()
+
+def _command_guild(args, out):
+    """Pooled plan for the inventories in --input, or every player in a database store"""
+    plan = plan_guild(_population(args), args.asus, args.workers)
+    if args.format == 'csv':
+        rows = [dict({'player': name, 'crafting_minutes': member['crafting_minutes']}, **member['crafts'])
+                for name, member in plan['allocation'].items()]
+        write_records(rows, args.format, out)
+        return
+    write_records(plan, args.format, out)
+
+def _command_solve(args, out):
+    """Inverse queries (date -> runs/day, runs/day -> date, budget -> ASUs) for --input, flags, or the store"""
+    budget = args.btc is not None or args.runs is not None
+    if budget == (args.target_date is not None or args.runs_per_day is not None):
+        raise ValueError("Give either --target-date, --runs-per-day, or a --btc and/or --runs budget")
+    as_of = args.as_of or datetime.now()
+    overrides = _inventory_overrides(args)
+    inventories = _read_inventories(args.input) if args.input else None
+    if isinstance(inventories, list):
+        # Cleaned up like the single inventory below, so both paths agree on bad amounts
+        inventories = [time_stage('validate', validate_inventory_data, dict(inventory, **overrides))
+                       for inventory in inventories]
+        if args.target_date:
+            columns = runs_per_day_for_date_batch(inventories, args.target_date, as_of, args.target_asus)
+        elif args.runs_per_day is not None:
+            columns = completion_for_runs_per_day_batch(inventories, args.runs_per_day, as_of, args.target_asus)
+        else:
+            columns = achievable_asus_batch(inventories, args.btc, args.runs)
+        columns = {name: column.tolist() if hasattr(column, 'tolist') else column for name, column in columns.items()}
+        write_records([dict(zip(columns, row)) for row in zip(*columns.values())], args.format, out)
+        return
+    
+    if inventories is not None:
+        inventory = dict(inventories, **overrides)
+    elif overrides:
+        inventory = overrides
+    else:
+        inventory = _stored_inventory(args)
+    inventory = time_stage('validate', validate_inventory_data, dict(inventory))
+    if args.target_date:
+        result = runs_per_day_for_date(inventory, args.target_date, as_of, args.target_asus)
+    elif args.runs_per_day is not None:
+        result = completion_for_runs_per_day(inventory, args.runs_per_day, as_of, args.target_asus)
+    else:
+        result = achievable_asus(inventory, args.btc, args.runs)
+    write_records(result, args.format, out)
+
+def _command_sweep(args, out):
+    """Shift in every player's numbers over a grid of config overrides"""
+    rows = run_sweep(_population(args), parse_grid(args.set), args.as_of, args.workers, args.summary)
+    write_records(rows, args.format, out)
+
+def _command_update(args, out):
+    """Apply flag values to the stored inventory, save it and output the results"""
+    # Locked from load to save so concurrent updates are applied one after another
+    with open_store(args.store, args.player) as store, file_lock(store.path):
+        calculator = ASUCalculator(store=store, verbose=False)
+        calculator.inventory.update(_inventory_overrides(args))
+        if not calculator.inventory.get("start_date"):
+            calculator.inventory["start_date"] = datetime.now().isoformat()
+        calculator.save_inventory()
+    write_records(calculator.calculate_results_data(), args.format, out)
+
+def _command_history(args, out):
+    """Output stored inventory snapshots within an optional time range"""
+    with open_store(args.store, args.player) as store:
+        if isinstance(store, SqliteInventoryStore):
+            snapshots = list(store.history(args.since, args.until))
+        else:
+            snapshots = list(SnapshotLog(snapshot_log_path(store)).iter_snapshots(args.since, args.until))
+    write_records(snapshots, args.format, out)
+
+def _results_lines(lines, as_of):
+    """Compute one compact JSON results line per inventory line, as of the given time
+    
+    Lines that are not valid inventories produce an {"error": ...} line so
+    output lines stay aligned with input records. Blank lines are skipped.
+    """
+    total_req = calculate_total_requirements()
+    output = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            inventory = time_stage('validate', validate_inventory_data, json.loads(line))
+            results = ASUCalculator(inventory, verbose=False, as_of=as_of).calculate_results_data(total_req)
+            output.append(json.dumps(results, separators=(',', ':'), default=json_default))
+        except (ValueError, TypeError, AttributeError, OverflowError) as e:
+            output.append(json.dumps({'error': str(e)}))
+    return "".join(f"{line}\n" for line in output)
+
+def stream_results(infile, outfile, workers=1, chunk_lines=STREAM_CHUNK_LINES, as_of=None):
+    """Stream JSON Lines inventories from infile to JSON Lines results in outfile
+    
+    Input is read and written a chunk of lines at a time, so memory stays
+    bounded whatever the input size. With workers > 1 chunks are computed in a
+    process pool, with at most two chunks per worker in flight, and written
+    in input order. Every line is calculated as of the same time, as_of or
+    the start of the stream. Returns the number of chunks processed.
+    """
+    if as_of is None:
+        as_of = datetime.now()
+    chunks = iter(lambda: list(islice(infile, chunk_lines)), [])
+    if workers <= 1:
+        count = 0
+        for chunk in chunks:
+            outfile.write(_results_lines(chunk, as_of))
+            count += 1
+        return count
+    
+    from concurrent.futures import ProcessPoolExecutor
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_results_lines, chunk, as_of))
+            if len(pending) >= workers * 2:
+                outfile.write(pending.popleft().result())
+                count += 1
+        while pending:
+            outfile.write(pending.popleft().result())
+            count += 1
+    return count
+
+def _command_stream(args, out):
+    """Stream JSON Lines inventories from --input to JSON Lines results"""
+    if args.input == '-':
+        infile = open(sys.stdin.fileno(), 'r', buffering=STREAM_BUFFER_BYTES, closefd=False)
+    else:
+        infile = open(args.input, 'r', buffering=STREAM_BUFFER_BYTES)
+    if args.output == '-':
+        outfile = out
+    else:
+        outfile = open(args.output, 'w', buffering=STREAM_BUFFER_BYTES)
+    
+    try:
+        stream_results(infile, outfile, args.workers, args.chunk_lines, args.as_of)
+    finally:
+        infile.close()
+        if outfile is not out:
+            outfile.close()
+        else:
+            outfile.flush()
+
+def build_parser():
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(
+        description="ASU Time Calculator. Without a command, runs the interactive inventory update."
+    )
+    parser.add_argument('--store', default=INVENTORY_FILE,
+                        help=f"inventory file (.json) or database (.db) (default: {INVENTORY_FILE})")
+    parser.add_argument('--player', default=DEFAULT_PLAYER, help="player name in a database store")
+    parser.add_argument('--profile', action='store_true', help="run under cProfile and print sorted stats to stderr")
+    parser.add_argument('--profile-sort', choices=PROFILE_SORTS, default='cumulative',
+                        help="sort order for --profile stats (default: cumulative)")
+    parser.add_argument('--profile-limit', type=int, default=30, metavar='N',
+                        help="functions listed by --profile (default: 30)")
+    parser.add_argument('--timings', choices=EXPORT_FORMATS,
+                        help="time each stage, count utils calls, and print them to stderr in this format")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    def add_format(subparser):
+        subparser.add_argument('--format', choices=['json', 'csv'], default='json', help="output format")
+    
+    def add_inventory_flags(subparser):
+        for field in INVENTORY_FIELDS:
+            subparser.add_argument(f"--{field.replace('_', '-')}", dest=field, type=int, metavar='N')
+        subparser.add_argument('--start-date', metavar='YYYY-MM-DD', help="start date for collection tracking")
+    
+    def add_as_of(subparser):
+        subparser.add_argument('--as-of', type=datetime.fromisoformat, metavar='DATETIME',
+                               help="calculate rates and completion dates as of this ISO datetime (default: now)")
+    
+    compute = subparsers.add_parser('compute', help="compute results without saving")
+    compute.add_argument('--input', metavar='FILE',
+                         help="JSON inventory or list of inventories ('-' for stdin); default is the store")
+    add_inventory_flags(compute)
+    add_as_of(compute)
+    compute.add_argument('--pipeline', action='store_true',
+                         help="include the scav/recycle/craft pipeline model in the results")
+    add_format(compute)
+    
+    update = subparsers.add_parser('update', help="update the stored inventory from flags and compute results")
+    add_inventory_flags(update)
+    add_format(update)
+    
+    schedule = subparsers.add_parser('schedule', help="plan the remaining crafts over parallel slots")
+    schedule.add_argument('--input', metavar='FILE', help="JSON inventory ('-' for stdin); default is the store")
+    schedule.add_argument('--slots', type=int, default=1, metavar='N', help="parallel crafting slots (default: 1)")
+    schedule.add_argument('--syn-window', type=float, nargs=2, action='append', metavar=('START', 'END'),
+                          help="hours from now when syn is active; repeat for more windows")
+    add_inventory_flags(schedule)
+    add_as_of(schedule)
+    add_format(schedule)
+    
+    optimize = subparsers.add_parser('optimize', help="choose how many Doras to buy from the Bag Crafter Service")
+    optimize.add_argument('--input', metavar='FILE', help="JSON inventory ('-' for stdin); default is the store")
+    optimize.add_argument('--objective', choices=['time', 'btc'], default='time',
+                          help="minimize completion time or BTC spent (default: time)")
+    optimize.add_argument('--max-btc', type=float, metavar='BTC', help="BTC budget beyond the BTC on hand")
+    optimize.add_argument('--max-hours', type=float, metavar='HOURS', help="time budget in hours")
+    add_inventory_flags(optimize)
+    add_format(optimize)
+    
+    guild = subparsers.add_parser('guild', help="pool many inventories toward several ASUs and split the crafts")
+    guild.add_argument('--input', metavar='FILE',
+                       help="JSON {player: inventory} object or list of inventories ('-' for stdin); "
+                            "default is every player in the --store database")
+    guild.add_argument('--asus', type=int, default=1, metavar='N', help="ASUs to build (default: 1)")
+    guild.add_argument('--workers', type=int, default=1, metavar='N', help="worker processes for pooling (default: 1)")
+    add_format(guild)
+    
+    solve = subparsers.add_parser('solve', help="runs per day for a date, date for a run rate, or ASUs for a budget")
+    solve.add_argument('--input', metavar='FILE',
+                       help="JSON inventory or list of inventories ('-' for stdin); default is the store")
+    query = solve.add_mutually_exclusive_group()
+    query.add_argument('--target-date', type=datetime.fromisoformat, metavar='DATETIME',
+                       help="scav runs per day needed to finish gathering by this ISO date")
+    query.add_argument('--runs-per-day', type=float, metavar='N', help="completion date at this many scav runs per day")
+    solve.add_argument('--btc', type=float, metavar='BTC', help="ASUs reachable with this much more BTC")
+    solve.add_argument('--runs', type=float, metavar='N', help="ASUs reachable with this many more scav runs")
+    solve.add_argument('--target-asus', type=int, default=1, metavar='N',
+                       help="ASUs to finish for --target-date and --runs-per-day (default: 1)")
+    add_inventory_flags(solve)
+    add_as_of(solve)
+    add_format(solve)
+    
+    sweep = subparsers.add_parser('sweep', help="compare every player's numbers over a grid of config overrides")
+    sweep.add_argument('--input', metavar='FILE',
+                       help="JSON {player: inventory} object or list of inventories ('-' for stdin); "
+                            "default is every player in the --store database")
+    sweep.add_argument('--set', action='append', required=True, metavar='PATH=V1,V2',
+                       help="config values to try, e.g. SCAVENGING.med_tech_drop_chance=0.6,0.7; "
+                            "repeat for a grid")
+    sweep.add_argument('--workers', type=int, default=1, metavar='N', help="worker processes (default: 1)")
+    sweep.add_argument('--summary', action='store_true', help="one row per cell and metric instead of per player")
+    add_as_of(sweep)
+    add_format(sweep)
+    
+    history = subparsers.add_parser('history', help="list saved inventory snapshots")
+    history.add_argument('--since', metavar='DATE', help="earliest snapshot (ISO date or datetime)")
+    history.add_argument('--until', metavar='DATE', help="latest snapshot (ISO datetime, or a date to include that whole day)")
+    add_format(history)
+    
+    stream = subparsers.add_parser('stream', help="compute results for JSON Lines inventories, one per line")
+    stream.add_argument('--input', metavar='FILE', default='-', help="JSON Lines inventories (default: stdin)")
+    stream.add_argument('--output', metavar='FILE', default='-', help="JSON Lines results (default: stdout)")
+    stream.add_argument('--workers', type=int, default=1, metavar='N', help="worker processes (default: 1)")
+    stream.add_argument('--chunk-lines', type=int, default=STREAM_CHUNK_LINES, metavar='N',
+                        help=f"lines per chunk (default: {STREAM_CHUNK_LINES})")
+    add_as_of(stream)
+    
+    return parser
+
+COMMANDS = {
+    'compute': _command_compute,
+    'update': _command_update,
+    'schedule': _command_schedule,
+    'optimize': _command_optimize,
+    'guild': _command_guild,
+    'solve': _command_solve,
+    'sweep': _command_sweep,
+    'history': _command_history,
+    'stream': _command_stream
+}
+
+def run_interactive():
+    """Interactive inventory update followed by formatted results"""
     print("🎯 ASU Time Calculator")
     print("=" * 40)
     
@@ -361,5 +1111,33 @@ def main():
     except Exception as e:
         print(f"\n❌ Error: {e}")
 
+def _run(args, out):
+    """Run the chosen command, or the interactive update without one; returns the exit status"""
+    if args.command is None:
+        run_interactive()
+        return 0
+    
+    try:
+        COMMANDS[args.command](args, out)
+    except (OSError, ValueError, OverflowError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def main(argv=None, out=None):
+    """Main application entry point"""
+    args = build_parser().parse_args(argv)
+    out = out or sys.stdout
+    if args.timings:
+        instrumentation.enable()
+    try:
+        if args.profile:
+            return instrumentation.profile_call(_run, args, out, sort=args.profile_sort, limit=args.profile_limit)
+        return _run(args, out)
+    finally:
+        if args.timings:
+            instrumentation.disable()
+            sys.stderr.write(instrumentation.export(args.timings))
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the ASU Calculator hot paths
+
+Times calculate_results_data() and calculate_results_batch(), every inventory
+calculator in utils.py, the vectorized versions, the inverse queries,
+incremental (reactive) updates, guild pooling and replanning, inventory
+load/save and CLI startup over synthetic inventories at several scales, and
+reports ops/sec and peak traced memory.
+
+Each benchmark at scale N performs N operations, cycling over a pool of at
+most POOL_SIZE generated inventories so large scales do not need millions of
+dicts in memory. Timing runs are repeated (best of) without tracing; peak
+memory comes from one separate tracemalloc run of at most MEMORY_OPS
+operations, since tracing slows Python code down several times.
+
+Results can be saved as a baseline and later runs compared against it:
+
+    python benchmark.py --scales 1 10000 --save baseline.json
+    python benchmark.py --scales 1 10000 --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from itertools import cycle, islice
+
+import inverse_solver
+import utils
+import vectorized
+from asu_calculator import ASUCalculator, calculate_results_batch
+from chain_plan import get_chain_plan
+from guild_planner import GuildPlanner, pool_inventories
+from inventory import Inventory, InventoryArray
+from reactive_results import ReactiveResults
+from storage import INVENTORY_FIELDS, JsonInventoryStore, SqliteInventoryStore
+
+DEFAULT_SCALES = (1, 10_000, 1_000_000)
+POOL_SIZE = 10_000
+MEMORY_OPS = 10_000
+REPEAT = 3
+REPEAT_OPS_BUDGET = 1_000_000
+DEFAULT_TOLERANCE = 0.2
+AS_OF = datetime(2025, 6, 1)
+
+# Upper bounds for generated amounts, roughly one ASU's worth of each
+FIELD_LIMITS = {
+    'tech_scraps': 75_000,
+    'tech_scrap_clusters': 100,
+    'med_tech': 2_000,
+    'med_tech_clusters': 200,
+    'bitcoin': 500_000,
+    'old_pouches': 500,
+    'fanny_packs': 200,
+    'explorer_backpacks': 40,
+    'employee_office_cases': 10,
+    'asus': 1
+}
+
+def generate_inventories(count, seed=0):
+    """Yield count complete synthetic inventories, reproducible for a given seed
+
+    About a third of the amounts are zero, as in real inventories where most
+    players hold only a few bag tiers at a time.
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        inventory = {field: rng.randint(0, FIELD_LIMITS[field]) if rng.random() > 0.3 else 0
+                     for field in INVENTORY_FIELDS}
+        start = AS_OF - timedelta(days=rng.randint(1, 120))
+        inventory['start_date'] = start.isoformat()
+        inventory['last_updated'] = AS_OF.isoformat()
+        yield inventory
+
+class Benchmark:
+    """One named operation to time
+
+    setup(inventories, ops) prepares untimed state from an iterator of ops
+    inventories; run(state) performs the ops and teardown(state) cleans up.
+    max_ops caps the operations per run for slow operations (e.g. fsynced
+    saves), and scaled=False runs the operation max_ops times whatever the
+    scale.
+    """
+
+    def __init__(self, name, run, setup=None, teardown=None, max_ops=None, scaled=True):
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda inventories, ops: inventories)
+        self.teardown = teardown or (lambda state: None)
+        self.max_ops = max_ops
+        self.scaled = scaled
+
+    def ops_for(self, scale):
+        if not self.scaled:
+            return self.max_ops
+        return min(scale, self.max_ops) if self.max_ops else scale
+
+def _each(function):
+    """run() calling function once per inventory"""
+    def run(inventories):
+        for inventory in inventories:
+            function(inventory)
+    return run
+
+UTILS_CALLS = {
+    'validate_inventory_data': lambda inventory: utils.validate_inventory_data(dict(inventory)),
+    'tech_scrap_equivalent_from_inventory': utils.calculate_tech_scrap_equivalent_from_inventory,
+    'tech_scrap_equivalent_from_bags': utils.calculate_tech_scrap_equivalent_from_bags,
+    'eoc_equivalent_from_inventory': utils.calculate_eoc_equivalent_from_inventory,
+    'remaining_bags': utils.calculate_remaining_bags,
+    'remaining_bags_to_craft': utils.calculate_remaining_bags_to_craft,
+    'craftable_bags_from_resources': utils.calculate_craftable_bags_from_resources,
+    'scav_time': lambda inventory: utils.calculate_scav_time(inventory['med_tech']),
+    'scav_time_for_runs': lambda inventory: utils.calculate_scav_time_for_runs(inventory['asus'] + 10),
+    'bag_crafter_cost': lambda inventory: utils.calculate_bag_crafter_cost(inventory['explorer_backpacks']),
+    'crafting_time': lambda inventory: utils.calculate_crafting_time('fanny_pack', inventory['fanny_packs'], True),
+    'total_requirements': lambda inventory: utils.calculate_total_requirements(),
+    'estimate_completion_date': lambda inventory: utils.estimate_completion_date(
+        inventory['tech_scraps'], 1000, AS_OF),
+    'format_time_duration': lambda inventory: utils.format_time_duration(inventory['bitcoin'])
+}
+
+VECTORIZED_CALLS = {
+    'tech_scrap_equivalent_from_inventory': vectorized.calculate_tech_scrap_equivalent_from_inventory,
+    'eoc_equivalent_from_inventory': vectorized.calculate_eoc_equivalent_from_inventory,
+    'remaining_bags_to_craft': vectorized.calculate_remaining_bags_to_craft,
+    'craftable_bags_from_resources': vectorized.calculate_craftable_bags_from_resources
+}
+
+INVERSE_CALLS = {
+    'runs_per_day_for_date': lambda inventory: inverse_solver.runs_per_day_for_date(
+        inventory, AS_OF + timedelta(days=90), AS_OF),
+    'completion_for_runs_per_day': lambda inventory: inverse_solver.completion_for_runs_per_day(
+        inventory, 4, AS_OF),
+    'achievable_asus': lambda inventory: inverse_solver.achievable_asus(inventory, bitcoin=10 ** 8)
+}
+
+def _results_data(inventories):
+    total_req = utils.calculate_total_requirements()
+    for inventory in inventories:
+        ASUCalculator(inventory, verbose=False, as_of=AS_OF).calculate_results_data(total_req)
+
+def _json_setup(inventories, ops):
+    directory = tempfile.mkdtemp(prefix="asu_bench_")
+    store = JsonInventoryStore(os.path.join(directory, "inventory.json"), backup_generations=1)
+    inventories = list(inventories)
+    store.save(inventories[0])
+    return directory, store, inventories
+
+def _remove_directory(state):
+    shutil.rmtree(state[0])
+
+def _json_save(state):
+    _, store, inventories = state
+    for inventory in inventories:
+        store.save(inventory)
+
+def _json_load(state):
+    _, store, inventories = state
+    for _ in inventories:
+        store.load()
+
+def _sqlite_setup(inventories, ops):
+    directory = tempfile.mkdtemp(prefix="asu_bench_")
+    return directory, os.path.join(directory, "inventory.db"), inventories
+
+def _sqlite_bulk_insert(state):
+    _, path, inventories = state
+    with SqliteInventoryStore(path) as store:
+        store.bulk_insert((f"player{i % 100}", inventory) for i, inventory in enumerate(inventories))
+
+def _cli_startup(state):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "asu_calculator.py")
+    for _ in state:
+        subprocess.run([sys.executable, script, 'compute', '--tech-scraps', '1000'],
+                       check=True, stdout=subprocess.DEVNULL)
+
+def _reactive_setup(inventories, ops):
+    inventories = list(inventories)
+    model = ReactiveResults(inventories[0], as_of=AS_OF)
+    model.results()
+    return model, inventories
+
+def _reactive_update(field):
+    """run() setting one field from each inventory on a ReactiveResults and reading the results"""
+    def run(state):
+        model, inventories = state
+        for inventory in inventories:
+            model.update({field: inventory[field]})
+            model.results()
+    return run
+
+GUILD_MEMBERS = 100
+
+def _guild_setup(inventories, ops):
+    inventories = list(inventories)
+    return GuildPlanner(inventories[:GUILD_MEMBERS], target_asus=GUILD_MEMBERS), inventories
+
+def _guild_replan(state):
+    planner, inventories = state
+    for index, inventory in enumerate(inventories):
+        planner.set_member(str(index % GUILD_MEMBERS), inventory)
+        planner.plan()
+
+def build_benchmarks():
+    """All benchmarks, in report order"""
+    benchmarks = [Benchmark('results_data', _results_data),
+                  Benchmark('results_batch', lambda inventories: calculate_results_batch(list(inventories), as_of=AS_OF)),
+                  Benchmark('chain_plan.lookup', _each(lambda inventory: get_chain_plan()))]
+    benchmarks += [Benchmark(f"utils.{name}", _each(function)) for name, function in UTILS_CALLS.items()]
+    benchmarks += [Benchmark(f"inverse.{name}", _each(function)) for name, function in INVERSE_CALLS.items()]
+    benchmarks.append(Benchmark('inventory.slots_tech_scrap_equivalent',
+                                _each(utils.calculate_tech_scrap_equivalent_from_inventory),
+                                setup=lambda inventories, ops: [Inventory.from_dict(i) for i in inventories]))
+    benchmarks.append(Benchmark('inventory.array_tech_scrap_equivalent',
+                                lambda packed: vectorized.calculate_tech_scrap_equivalent_from_inventory(packed.columns()),
+                                setup=lambda inventories, ops: InventoryArray(inventories)))
+    benchmarks += [Benchmark(f"vectorized.{name}", function,
+                             setup=lambda inventories, ops: vectorized.to_columns(inventories))
+                   for name, function in VECTORIZED_CALLS.items()]
+    benchmarks += [
+        Benchmark('reactive.update_bitcoin', _reactive_update('bitcoin'), _reactive_setup),
+        Benchmark('reactive.update_med_tech', _reactive_update('med_tech'), _reactive_setup),
+        Benchmark('guild.pool_inventories', lambda inventories: pool_inventories(list(inventories))),
+        Benchmark('guild.replan', _guild_replan, _guild_setup, max_ops=10_000),
+        Benchmark('store.json_save', _json_save, _json_setup, _remove_directory, max_ops=200),
+        Benchmark('store.json_load', _json_load, _json_setup, _remove_directory, max_ops=10_000),
+        Benchmark('store.sqlite_bulk_insert', _sqlite_bulk_insert, _sqlite_setup, _remove_directory),
+        Benchmark('cli.startup', _cli_startup, max_ops=3, scaled=False)
+    ]
+    return benchmarks
+
+def _inventories(pool, ops):
+    return islice(cycle(pool), ops)
+
+def measure(benchmark, scale, pool, repeat=REPEAT, memory=True):
+    """Time one benchmark at one scale; returns a result dict
+
+    A single untimed operation runs first so lazily built caches (chain
+    plan, runs distribution) are not counted against small scales.
+    """
+    ops = benchmark.ops_for(scale)
+    warmup = benchmark.setup(_inventories(pool, 1), 1)
+    try:
+        benchmark.run(warmup)
+    finally:
+        benchmark.teardown(warmup)
+
+    repeat = max(1, min(repeat, REPEAT_OPS_BUDGET // max(ops, 1)))
+    best = None
+    for _ in range(repeat):
+        state = benchmark.setup(_inventories(pool, ops), ops)
+        start = time.perf_counter()
+        try:
+            benchmark.run(state)
+        finally:
+            elapsed = time.perf_counter() - start
+            benchmark.teardown(state)
+        best = elapsed if best is None else min(best, elapsed)
+
+    result = {
+        'ops': ops,
+        'seconds': best,
+        'ops_per_sec': ops / best if best > 0 else float('inf'),
+        'peak_bytes': None
+    }
+    if memory:
+        memory_ops = min(ops, MEMORY_OPS)
+        state = benchmark.setup(_inventories(pool, memory_ops), memory_ops)
+        tracemalloc.start()
+        try:
+            benchmark.run(state)
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            benchmark.teardown(state)
+    return result
+
+def run_benchmarks(scales=DEFAULT_SCALES, names=None, repeat=REPEAT, memory=True, seed=0, report=None):
+    """Run benchmarks at each scale; returns {'benchmark@scale': result}
+
+    names filters benchmarks by name prefix. report, if given, is called with
+    (key, result) as each result completes.
+    """
+    pool = list(generate_inventories(min(max(scales), POOL_SIZE), seed))
+    results = {}
+    for benchmark in build_benchmarks():
+        if names and not any(benchmark.name.startswith(name) for name in names):
+            continue
+        for scale in (scales if benchmark.scaled else scales[:1]):
+            key = f"{benchmark.name}@{scale}" if benchmark.scaled else benchmark.name
+            results[key] = measure(benchmark, scale, pool, repeat, memory)
+            if report:
+                report(key, results[key])
+    return results
+
+def save_baseline(path, results):
+    """Save results with enough context to judge whether a comparison is fair"""
+    baseline = {
+        'created': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'numpy': vectorized.HAS_NUMPY,
+        'results': results
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """List (key, baseline ops/sec, current ops/sec) for benchmarks slower than tolerance allows"""
+    regressions = []
+    for key, result in results.items():
+        previous = baseline['results'].get(key)
+        if previous and result['ops_per_sec'] < previous['ops_per_sec'] * (1 - tolerance):
+            regressions.append((key, previous['ops_per_sec'], result['ops_per_sec']))
+    return regressions
+
+def _print_result(key, result):
+    peak = f"{result['peak_bytes'] / 1024:10.1f} KiB" if result['peak_bytes'] is not None else ""
+    print(f"{key:<55} {result['ops']:>9,} ops {result['ops_per_sec']:>14,.0f} ops/s {peak}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ASU calculator hot paths")
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES),
+                        help="inventory counts to run at (default: 1 10000 1000000)")
+    parser.add_argument('--only', nargs='+', metavar='NAME', help="benchmark name prefixes to run")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help=f"timing runs, best is kept (default: {REPEAT})")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc peak memory run")
+    parser.add_argument('--seed', type=int, default=0, help="inventory generator seed")
+    parser.add_argument('--save', metavar='FILE', help="save results as a baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare against a saved baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed ops/sec drop before a regression is reported (default: {DEFAULT_TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(sorted(args.scales), args.only, args.repeat, not args.no_memory, args.seed,
+                             report=_print_result)
+    if args.save:
+        save_baseline(args.save, results)
+        print(f"💾 Baseline saved to {args.save}")
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for key, before, after in regressions:
+            print(f"❌ {key}: {before:,.0f} -> {after:,.0f} ops/s ({after / before - 1:+.0%})")
+        if regressions:
+            return 1
+        print(f"✅ No regressions against {args.compare}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Compiled crafting chain plan for ASU Calculator
+
+Precomputes the products of CRAFTING_CHAIN ratios (bags per ASU, tech scraps
+per bag, cumulative BTC and crafting time) once, so the calculators in utils.py
+only need a handful of multiplies per call. get_chain_plan() rebuilds the plan
+whenever a config setting it reads has changed, whether the setting was
+replaced or edited in place.
+"""
+
+import config
+from crafting_graph import CraftingGraph
+
+class ChainPlan:
+    """Cumulative multipliers and prefix sums for the crafting chain
+
+    Built from the chain's CraftingGraph. Tiers are in crafting order with the
+    final bag last, and every per-bag mapping is keyed by inventory field name
+    (e.g. 'fanny_packs').
+    """
+
+    def __init__(self, crafting_chain):
+        self.graph = CraftingGraph(crafting_chain)
+        graph = self.graph
+        final_tier = graph.final_tier
+
+        self.tiers = graph.tiers
+        self.fields = graph.fields
+        self.final_field = graph.field_of[final_tier]
+
+        # Direct recipe costs per tier
+        self.tier_bitcoin = {graph.field_of[tier]: graph.bitcoin[tier] for tier in self.tiers}
+        self.tier_minutes = {graph.field_of[tier]: graph.minutes[tier] for tier in self.tiers}
+
+        # Cumulative values from raw resources up to one bag of each tier
+        self.tech_scraps_per_bag = {graph.field_of[tier]: graph.raw_per_unit[tier].get('tech_scraps', 0)
+                                    for tier in self.tiers}
+        self.bitcoin_per_bag = {graph.field_of[tier]: graph.bitcoin_per_unit[tier] for tier in self.tiers}
+        self.minutes_per_bag = {graph.field_of[tier]: graph.minutes_per_unit[tier] for tier in self.tiers}
+
+        # Bags of each tier consumed by one final bag
+        self.bags_per_asu = dict(graph.bags_per_unit[final_tier])
+        self.bags_per_asu[self.final_field] = 1
+
+        # Bags below the progress (EOC) tier, highest first
+        eoc_tier = self._named_tier(config.PROGRESS_TIER, 'PROGRESS_TIER')
+        self.eoc_field = graph.field_of[eoc_tier]
+        eoc_bags = graph.bags_per_unit[eoc_tier]
+        self.bags_per_eoc = [(field, eoc_bags[field]) for field in reversed(self.fields) if field in eoc_bags]
+
+        # The bag the Bag Crafter Service sells, and the tiers crafted from it
+        dora_tier = self._named_tier(config.BAG_CRAFTER['dora_tier'], "BAG_CRAFTER['dora_tier']")
+        self.dora_field = graph.field_of[dora_tier]
+        self.fields_above_dora = [graph.field_of[tier] for tier in self.tiers
+                                  if self.dora_field in graph.bags_per_unit[tier]]
+
+        self.tech_scraps_per_asu = self.tech_scraps_per_bag[self.final_field]
+        self.bitcoin_per_asu = self.bitcoin_per_bag[self.final_field]
+
+    def _named_tier(self, tier, setting):
+        """A tier named in config, which must be in the chain below the final bag"""
+        if tier not in self.graph.field_of or tier == self.graph.final_tier:
+            raise ValueError(f"{setting} must name a crafting chain tier below the final bag, got: {tier}")
+        return tier
+
+    def crafting_minutes(self, bag_counts):
+        """Crafting minutes for the given bag counts, one tier at a time"""
+        return sum(bag_counts.get(field, 0) * self.tier_minutes[field] for field in self.fields)
+
+    def crafting_bitcoin(self, bag_counts):
+        """Crafting BTC for the given bag counts, one tier at a time"""
+        return sum(bag_counts.get(field, 0) * self.tier_bitcoin[field] for field in self.fields)
+
+_plan = None
+_plan_key = None
+
+def _config_key():
+    """The config settings the plan reads, as a comparable key"""
+    chain = config.CRAFTING_CHAIN
+    return (tuple(chain), tuple(map(tuple, map(dict.items, chain.values()))),
+            tuple(config.BAG_INVENTORY_FIELDS.items()), config.PROGRESS_TIER, config.BAG_CRAFTER['dora_tier'])
+
+def invalidate_chain_plan():
+    """Drop the cached plan so the next get_chain_plan() rebuilds it"""
+    global _plan
+    _plan = None
+
+def get_chain_plan():
+    """Return the plan for the current config, building it on first use or after a setting it reads changes"""
+    global _plan, _plan_key
+    key = _config_key()
+    if _plan is None or _plan_key != key:
+        _plan = ChainPlan(config.CRAFTING_CHAIN)
+        _plan_key = key
+    return _plan
@@ -30,6 +30,18 @@ CRAFTING_CHAIN = {
     }
 }
 
+# Inventory field holding each bag type
+BAG_INVENTORY_FIELDS = {
+    'old_pouch': 'old_pouches',
+    'fanny_pack': 'fanny_packs',
+    'explorer_backpack': 'explorer_backpacks',
+    'employee_office_case': 'employee_office_cases',
+    'asu': 'asus'
+}
+
+# Tier that progress is reported in (EOC equivalents)
+PROGRESS_TIER = 'employee_office_case'
+
 # Resource conversion ratios
 CONVERSIONS = {
     'tech_scrap_per_cluster': 1000,
@@ -51,8 +63,16 @@ SCAVENGING = {
 # Bag crafter service settings
 BAG_CRAFTER = {
     'mtc_per_dora': 15,  # 15 MTC per Explorer's Backpack
+    'dora_tier': 'explorer_backpack',  # Bag the service sells
     'service_name': 'Bag Crafter Service'
 }
 
+# Parallel slots per stage for the pipeline throughput model
+PIPELINE = {
+    'scavenging': 1,  # concurrent scav runs
+    'recycling': 1,   # recyclers, 1000 med tech per cycle
+    'crafting': 1     # crafting slots
+}
+
 # Syn rate multiplier (when syn is active)
 SYN_RATE = 0.2  # 20% of normal time
@@ -0,0 +1,216 @@
+"""
+Bag Crafter Service optimizer for ASU Calculator
+
+Chooses how many Doras to buy from the Bag Crafter Service instead of
+crafting them, minimizing either end-to-end time (the pipeline model) or
+BTC, optionally under a BTC and/or time budget.
+
+Buying d Doras costs d * mtc_per_dora Med Tech Clusters. Clusters already in
+the inventory are spent first, since they cost nothing to make. The rest are
+clustered from loose med tech at cluster_cost_mtc BTC each, and any med tech
+not on hand has to be scavenged. Every bag below the Dora tier is still
+crafted, so d is the only free integer. The other choices (which clusters
+pay, what gets crafted) follow from it.
+
+Total BTC and every pipeline stage's work are piecewise linear in d. The
+pieces break where a lower tier no longer needs crafting, where the tech
+scraps on hand start to suffice, where held clusters are used up and where
+the med tech on hand stops covering recycling. The first two are found by
+binary search, the others by solving the linear pieces. Within a piece BTC
+is linear and completion time is a max of linear terms, so the best d lies
+at a piece end, at the completion-time minimum (binary search on its slope)
+or where a budget is just met. Only those candidates are evaluated, each
+once, which is a few dozen evaluations instead of one per possible d.
+"""
+
+import math
+from functools import lru_cache
+
+import config
+from chain_plan import get_chain_plan
+from crafting_graph import raw_available
+from pipeline import STAGES, calculate_pipeline
+from result_cache import results_key
+from storage import INVENTORY_FIELDS
+
+OBJECTIVES = ('time', 'btc')
+
+def evaluate_purchase(inventory, doras_to_buy):
+    """BTC, MTC and pipeline time for buying doras_to_buy Doras and crafting everything else"""
+    plan = get_chain_plan()
+    dora_field = plan.dora_field
+    mtc_cost = doras_to_buy * config.BAG_CRAFTER['mtc_per_dora']
+    mtc_from_inventory = min(inventory.get('med_tech_clusters', 0), mtc_cost)
+    mtc_to_cluster = mtc_cost - mtc_from_inventory
+
+    adjusted = dict(inventory)
+    adjusted[dora_field] = adjusted.get(dora_field, 0) + doras_to_buy
+    adjusted['med_tech_clusters'] = adjusted.get('med_tech_clusters', 0) - mtc_from_inventory
+    adjusted['med_tech'] = (adjusted.get('med_tech', 0) -
+                            mtc_to_cluster * config.CONVERSIONS['med_tech_per_cluster'])
+
+    remaining_bags = plan.graph.remaining(adjusted)
+    pipeline = calculate_pipeline(adjusted, remaining_bags)
+    crafting_btc = plan.crafting_bitcoin(remaining_bags)
+    clustering_btc = mtc_to_cluster * config.CONVERSIONS['cluster_cost_mtc']
+    total_btc = crafting_btc + clustering_btc
+
+    return {
+        'doras_to_buy': doras_to_buy,
+        'mtc_cost': mtc_cost,
+        'mtc_from_inventory': mtc_from_inventory,
+        'mtc_to_cluster': mtc_to_cluster,
+        'clustering_btc': clustering_btc,
+        'crafting_btc': crafting_btc,
+        'total_btc': total_btc,
+        'btc_needed': max(0, total_btc - inventory.get('bitcoin', 0)),
+        'remaining_bags': remaining_bags,
+        'med_tech_on_hand': raw_available(adjusted, 'med_tech'),
+        'med_tech_to_recycle': pipeline['stages']['recycling']['units'],
+        'completion_minutes': pipeline['completion_minutes'],
+        'completion_hours': pipeline['completion_hours'],
+        'bottleneck': pipeline['bottleneck']
+    }
+
+def _flip_point(predicate, low, high):
+    """First d in (low, high] where a predicate true at low and false at high turns false, or None"""
+    if not predicate(low) or predicate(high):
+        return None
+    while high - low > 1:
+        middle = (low + high) // 2
+        if predicate(middle):
+            low = middle
+        else:
+            high = middle
+    return high
+
+def _crossing(a_low, a_high, b_low, b_high, low, high):
+    """Integer points around where two lines over [low, high] cross, or none"""
+    gap_low, gap_high = a_low - b_low, a_high - b_high
+    if gap_low == gap_high or gap_low * gap_high > 0:
+        return []
+    point = low + (high - low) * gap_low / (gap_low - gap_high)
+    return [math.floor(point), math.ceil(point)]
+
+def _minimum(cost, low, high):
+    """Smallest d in [low, high] minimizing a convex cost(d)"""
+    while low < high:
+        middle = (low + high) // 2
+        if cost(middle + 1) < cost(middle):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def _within(option, max_btc, max_minutes):
+    return ((max_btc is None or option['btc_needed'] <= max_btc) and
+            (max_minutes is None or option['completion_minutes'] <= max_minutes))
+
+def _objective_key(objective):
+    if objective == 'time':
+        return lambda option: (option['completion_minutes'], option['total_btc'], option['doras_to_buy'])
+    return lambda option: (option['total_btc'], option['completion_minutes'], option['doras_to_buy'])
+
+def optimize_bag_crafter(inventory, objective='time', max_btc=None, max_minutes=None):
+    """Best number of Doras to buy for the objective ('time' or 'btc') within the budgets
+
+    max_btc limits the BTC still needed beyond what the inventory holds;
+    max_minutes limits the end-to-end pipeline time. Returns dict with the
+    'best' option (None if nothing fits the budgets), the craft-everything
+    and buy-everything options for comparison, and how many purchase counts
+    were evaluated.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective} (expected one of {', '.join(OBJECTIVES)})")
+    plan = get_chain_plan()
+    doras_needed = plan.graph.remaining(inventory)[plan.dora_field]
+
+    evaluated = {}
+    def evaluate(doras):
+        if doras not in evaluated:
+            evaluated[doras] = evaluate_purchase(inventory, doras)
+        return evaluated[doras]
+
+    def completion(doras):
+        return evaluate(doras)['completion_minutes']
+
+    # Piece ends: lower tiers done, tech scraps sufficing, held clusters used up
+    # (a tier's need crosses zero between the last d it is needed and the flip)
+    flips = [_flip_point(lambda d, field=field: evaluate(d)['remaining_bags'][field] > 0, 0, doras_needed)
+             for field in plan.fields[:plan.fields.index(plan.dora_field)]]
+    flips.append(_flip_point(lambda d: evaluate(d)['med_tech_to_recycle'] > 0, 0, doras_needed))
+    breakpoints = {0, doras_needed}
+    for flip in flips:
+        if flip is not None:
+            breakpoints.update((flip - 1, flip))
+    mtc_per_dora = config.BAG_CRAFTER['mtc_per_dora']
+    if mtc_per_dora:
+        held = inventory.get('med_tech_clusters', 0) / mtc_per_dora
+        breakpoints.update((math.floor(held), math.ceil(held)))
+    breakpoints = sorted(point for point in breakpoints if point is not None and 0 <= point <= doras_needed)
+
+    # ...and where the med tech on hand stops covering recycling
+    for low, high in list(zip(breakpoints, breakpoints[1:])):
+        first, last = evaluate(low), evaluate(high)
+        breakpoints += [point for point in _crossing(first['med_tech_to_recycle'], last['med_tech_to_recycle'],
+                                                     first['med_tech_on_hand'], last['med_tech_on_hand'],
+                                                     low, high)
+                        if low < point < high]
+    breakpoints = sorted(set(breakpoints))
+
+    candidates = set(breakpoints)
+    for low, high in zip(breakpoints, breakpoints[1:]):
+        if high - low < 2:
+            continue
+        fastest = _minimum(completion, low, high)
+        candidates.add(fastest)
+        if max_minutes is not None:
+            # Time budget met on an interval around the fastest point
+            candidates.add(_flip_point(lambda d: completion(d) > max_minutes, low, fastest))
+            slower = _flip_point(lambda d: completion(d) <= max_minutes, fastest, high)
+            if slower is not None:
+                candidates.add(slower - 1)
+        if max_btc is not None:
+            first, last = evaluate(low), evaluate(high)
+            candidates.update(point for point in _crossing(first['btc_needed'], last['btc_needed'],
+                                                           max_btc, max_btc, low, high)
+                              if low <= point <= high)
+
+    options = [evaluate(doras) for doras in sorted(point for point in candidates if point is not None)]
+    feasible = [option for option in options if _within(option, max_btc, max_minutes)]
+    best = min(feasible, key=_objective_key(objective)) if feasible else None
+
+    return {
+        'objective': objective,
+        'max_btc': max_btc,
+        'max_minutes': max_minutes,
+        'doras_needed': doras_needed,
+        'best': best,
+        'craft_all': evaluate(0),
+        'buy_all': evaluate(doras_needed),
+        'evaluated': len(evaluated)
+    }
+
+def _settings_key():
+    """The config settings the optimizer reads, besides the chain, as a hashable key"""
+    return (tuple(config.BAG_CRAFTER.items()), tuple(config.CONVERSIONS.items()),
+            tuple(config.SCAVENGING.items()), tuple(config.PIPELINE.items()))
+
+@lru_cache(maxsize=1024)
+def _optimize_key(key, plan, settings, objective, max_btc, max_minutes):
+    return optimize_bag_crafter(dict(zip(INVENTORY_FIELDS, key)), objective, max_btc, max_minutes)
+
+def optimize_bag_crafter_cached(inventory, objective='time', max_btc=None, max_minutes=None):
+    """optimize_bag_crafter() memoized on the inventory amounts, chain plan and config settings
+
+    Changing config.BAG_CRAFTER, CONVERSIONS, SCAVENGING or PIPELINE (in
+    place or by reassigning them) misses the cache rather than returning a
+    stale result. The returned dict is shared between calls and must not be
+    modified; clear_optimizer_cache() drops every entry.
+    """
+    return _optimize_key(results_key(inventory), get_chain_plan(), _settings_key(),
+                         objective, max_btc, max_minutes)
+
+def clear_optimizer_cache():
+    """Forget every optimize_bag_crafter_cached() result"""
+    _optimize_key.cache_clear()
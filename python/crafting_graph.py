@@ -0,0 +1,174 @@
+"""
+Crafting graph for ASU Calculator
+
+Recipe engine driven by CRAFTING_CHAIN. Each recipe lists its BTC cost,
+crafting time and any number of ingredients. An ingredient named after a bag's
+inventory field (see config.BAG_INVENTORY_FIELDS) is another tier of the
+graph; anything else (e.g. 'tech_scraps') is a raw resource.
+
+Tiers are evaluated in topological order with per-unit subtree totals memoized
+when the graph is built, so adding a tier or recipe is a config change only and
+every per-inventory calculation is a single O(tiers) pass.
+"""
+
+import config
+
+RECIPE_COST_KEYS = ('bitcoin', 'crafting_time_minutes')
+
+# Raw resources that can also be held as clusters: (cluster field, units per cluster key)
+RAW_CLUSTER_FIELDS = {
+    'tech_scraps': ('tech_scrap_clusters', 'tech_scrap_per_cluster'),
+    'med_tech': ('med_tech_clusters', 'med_tech_per_cluster')
+}
+
+def raw_available(inventory, resource):
+    """Amount of a raw resource in inventory, including any clusters"""
+    amount = inventory.get(resource, 0)
+    if resource in RAW_CLUSTER_FIELDS:
+        cluster_field, per_cluster_key = RAW_CLUSTER_FIELDS[resource]
+        amount += inventory.get(cluster_field, 0) * config.CONVERSIONS[per_cluster_key]
+    return amount
+
+class CraftingGraph:
+    """Directed acyclic graph of bag recipes
+
+    Attributes keyed by tier name (e.g. 'fanny_pack') unless noted otherwise.
+    `tiers` and `fields` are in topological order, ingredients first.
+    """
+
+    def __init__(self, crafting_chain, bag_fields=None):
+        if bag_fields is None:
+            bag_fields = config.BAG_INVENTORY_FIELDS
+
+        self.field_of = {}
+        for tier in crafting_chain:
+            if tier not in bag_fields:
+                raise ValueError(f"No inventory field configured for bag type: {tier}")
+            self.field_of[tier] = bag_fields[tier]
+        tier_of_field = {field: tier for tier, field in self.field_of.items()}
+
+        # Split each recipe into bag inputs, raw inputs and costs
+        self.bag_inputs = {}
+        self.raw_inputs = {}
+        self.bitcoin = {}
+        self.minutes = {}
+        for tier, recipe in crafting_chain.items():
+            self.bag_inputs[tier] = [(tier_of_field[key], quantity) for key, quantity in recipe.items()
+                                     if key in tier_of_field]
+            self.raw_inputs[tier] = [(key, quantity) for key, quantity in recipe.items()
+                                     if key not in tier_of_field and key not in RECIPE_COST_KEYS]
+            self.bitcoin[tier] = recipe.get('bitcoin', 0)
+            self.minutes[tier] = recipe.get('crafting_time_minutes', 0)
+
+        self.tiers = self._topological_order(list(crafting_chain))
+        self.fields = [self.field_of[tier] for tier in self.tiers]
+
+        consumed = {source for inputs in self.bag_inputs.values() for source, _ in inputs}
+        self.final_tiers = [tier for tier in self.tiers if tier not in consumed]
+
+        # Flattened recipes for the per-inventory passes
+        self._backward = [(tier, self.field_of[tier], self.bag_inputs[tier]) for tier in reversed(self.tiers)]
+        self._forward = [(self.field_of[tier], self.raw_inputs[tier],
+                          [(self.field_of[source], quantity) for source, quantity in self.bag_inputs[tier]])
+                         for tier in self.tiers]
+
+        # Memoized per-unit subtree totals, built bottom-up
+        self.raw_per_unit = {}
+        self.bags_per_unit = {}
+        self.bitcoin_per_unit = {}
+        self.minutes_per_unit = {}
+        for tier in self.tiers:
+            raw = dict(self.raw_inputs[tier])
+            bags = {}
+            bitcoin = self.bitcoin[tier]
+            minutes = self.minutes[tier]
+            for source, quantity in self.bag_inputs[tier]:
+                for resource, amount in self.raw_per_unit[source].items():
+                    raw[resource] = raw.get(resource, 0) + amount * quantity
+                source_field = self.field_of[source]
+                bags[source_field] = bags.get(source_field, 0) + quantity
+                for field, count in self.bags_per_unit[source].items():
+                    bags[field] = bags.get(field, 0) + count * quantity
+                bitcoin += self.bitcoin_per_unit[source] * quantity
+                minutes += self.minutes_per_unit[source] * quantity
+            self.raw_per_unit[tier] = raw
+            self.bags_per_unit[tier] = bags
+            self.bitcoin_per_unit[tier] = bitcoin
+            self.minutes_per_unit[tier] = minutes
+
+    def _topological_order(self, tiers):
+        """Order tiers so every bag comes after its ingredients, keeping config order on ties"""
+        pending = {tier: {source for source, _ in self.bag_inputs[tier]} for tier in tiers}
+        order = []
+        while pending:
+            ready = [tier for tier in tiers if tier in pending and not pending[tier]]
+            if not ready:
+                raise ValueError(f"Crafting chain has a cycle between: {', '.join(pending)}")
+            for tier in ready:
+                del pending[tier]
+                order.append(tier)
+            for inputs in pending.values():
+                inputs.difference_update(ready)
+        return order
+
+    @property
+    def final_tier(self):
+        """The single bag nothing else is crafted from"""
+        if len(self.final_tiers) != 1:
+            raise ValueError(f"Crafting chain must have one final bag, got: {', '.join(self.final_tiers)}")
+        return self.final_tiers[0]
+
+    def remaining(self, inventory, target_count=1, target_tier=None):
+        """Bags of each tier still to craft for target_count final bags
+
+        Works backwards from the target, using existing bags of each tier
+        before requiring its ingredients. Returns {inventory field: count} in
+        crafting order.
+        """
+        if target_tier is None:
+            target_tier = self.final_tier
+
+        get = inventory.get
+        needed = {target_tier: target_count}
+        counts = []
+        for tier, field, inputs in self._backward:
+            count = needed.get(tier, 0) - get(field, 0)
+            if count > 0:
+                for source, quantity in inputs:
+                    needed[source] = needed.get(source, 0) + count * quantity
+            else:
+                count = 0
+            counts.append(count)
+        counts.reverse()
+        return dict(zip(self.fields, counts))
+
+    def craftable(self, inventory, through=None):
+        """Bags of each tier that can be crafted from current inventory
+
+        Each tier is considered on its own, using every bag of its ingredient
+        tiers that exists or could be crafted. Returns two dicts keyed by
+        inventory field: newly craftable counts and total available (existing
+        plus craftable). With through (an inventory field), tiers after it in
+        crafting order are left out.
+        """
+        get = inventory.get
+        crafted = {}
+        available = {}
+        for field, raw_inputs, bag_inputs in self._forward:
+            count = None
+            for resource, quantity in raw_inputs:
+                limit = raw_available(inventory, resource) // quantity
+                if count is None or limit < count:
+                    count = limit
+            for source_field, quantity in bag_inputs:
+                limit = available[source_field] // quantity
+                if count is None or limit < count:
+                    count = limit
+            if count is None:
+                count = 0
+            crafted[field] = count
+            available[field] = get(field, 0) + count
+            if field == through:
+                break
+
+        return crafted, available
@@ -0,0 +1,193 @@
+"""
+Crafting schedule planner for ASU Calculator
+
+Plans the remaining crafts over a number of parallel crafting slots, with
+syn active only during given time windows, and returns an ordered plan with
+the wall-clock time to the final bag.
+
+The planner is event-driven list scheduling: a heap of slot free times and a
+heap of pending completions. Whenever a slot frees up it starts the highest
+tier bag whose ingredients already exist (finishing bags as early as possible
+keeps the tail after the last pouch short), or waits for the next completion
+if nothing is ready. Crafts are scheduled in batches of as many as the next
+tier consumes at once (10 pouches for a fanny pack), which is exactly when
+their output becomes useful, so a full chain of tens of thousands of crafts
+takes a few thousand heap operations. Near the end of a tier batches shrink
+so the last crafts are spread over all slots. Crafts that overlap a syn window
+progress at 1 / SYN_RATE speed for the overlapping part.
+"""
+
+import bisect
+import heapq
+from datetime import datetime, timedelta
+
+import config
+from chain_plan import get_chain_plan
+
+def normalize_syn_windows(syn_windows, as_of=None):
+    """Sorted, merged (start, end) syn windows in minutes from as_of
+
+    Windows are (start, end) pairs of either minutes from as_of or datetimes.
+    Windows that end before as_of are dropped and ones already running are
+    clipped to start at 0. An end of None or float('inf') means syn stays on.
+    """
+    windows = []
+    for start, end in syn_windows:
+        if isinstance(start, datetime) or isinstance(end, datetime):
+            if as_of is None:
+                as_of = datetime.now()
+            start = (start - as_of).total_seconds() / 60
+            end = float('inf') if end is None else (end - as_of).total_seconds() / 60
+        elif end is None:
+            end = float('inf')
+        start = max(0, start)
+        if end > start:
+            windows.append((start, end))
+
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def finish_time(start, work_minutes, windows, syn_rate=None):
+    """Minute a craft of work_minutes (without syn) started at start finishes
+
+    windows are normalized syn windows; inside them work runs at 1 / syn_rate
+    speed.
+    """
+    if syn_rate is None:
+        syn_rate = config.SYN_RATE
+    time = start
+    index = bisect.bisect_right(windows, (time, float('inf')))
+    if index and windows[index - 1][1] > time:
+        index -= 1
+
+    while index < len(windows):
+        window_start, window_end = windows[index]
+        if time < window_start:
+            if work_minutes <= window_start - time:
+                return time + work_minutes
+            work_minutes -= window_start - time
+            time = window_start
+        capacity = (window_end - time) / syn_rate
+        if work_minutes <= capacity:
+            return time + work_minutes * syn_rate
+        work_minutes -= capacity
+        time = window_end
+        index += 1
+    return time + work_minutes
+
+def _merge_steps(jobs):
+    """Merge back-to-back batches of the same bag on the same slot into steps"""
+    steps = []
+    last_on_slot = {}
+    for slot, field, count, start, end in jobs:
+        step = last_on_slot.get(slot)
+        if step is not None and step['field'] == field and step['end_minute'] == start:
+            step['count'] += count
+            step['end_minute'] = end
+            continue
+        step = {'slot': slot, 'field': field, 'count': count, 'start_minute': start, 'end_minute': end}
+        last_on_slot[slot] = step
+        steps.append(step)
+    steps.sort(key=lambda step: (step['start_minute'], step['slot']))
+    return steps
+
+def plan_crafting_schedule(remaining_bags, slots=1, syn_windows=(), as_of=None, graph=None, syn_rate=None):
+    """Plan the crafts in remaining_bags over parallel slots, minimizing time to the final bag
+
+    remaining_bags is {inventory field: crafts still needed}, as returned by
+    utils.calculate_remaining_bags_to_craft(). Bags already held are those
+    the remaining crafts consume beyond what is still to be crafted, so the
+    inventory itself is not needed. syn_windows is a list of (start, end)
+    pairs, see normalize_syn_windows().
+
+    Returns dict with the makespan, completion date, slot utilization and
+    'steps': runs of identical crafts per slot, in start order.
+    """
+    if slots < 1:
+        raise ValueError("At least one crafting slot is needed")
+    if graph is None:
+        graph = get_chain_plan().graph
+    if as_of is None:
+        as_of = datetime.now()
+    if syn_rate is None:
+        syn_rate = config.SYN_RATE
+    windows = normalize_syn_windows(syn_windows, as_of)
+
+    tiers = graph.tiers
+    index_of = {tier: index for index, tier in enumerate(tiers)}
+    left = [remaining_bags.get(graph.field_of[tier], 0) for tier in tiers]
+    inputs = [[(index_of[source], quantity) for source, quantity in graph.bag_inputs[tier]] for tier in tiers]
+    work = [graph.minutes[tier] for tier in tiers]
+
+    # Batch size: the fewest bags of a tier any consumer needs for one craft
+    batch = [0] * len(tiers)
+    for tier_inputs in inputs:
+        for source, quantity in tier_inputs:
+            batch[source] = min(batch[source], quantity) if batch[source] else quantity
+    batch = [size or 1 for size in batch]
+
+    # Bags on hand: whatever the remaining crafts consume beyond what they produce
+    stock = [0] * len(tiers)
+    for index, tier_inputs in enumerate(inputs):
+        for source, quantity in tier_inputs:
+            stock[source] += left[index] * quantity
+    stock = [max(0, consumed - left[index]) for index, consumed in enumerate(stock)]
+
+    free_slots = [(0, slot) for slot in range(slots)]
+    completions = []
+    jobs = []
+    crafts_left = sum(left)
+    busy_minutes = 0
+    makespan = 0
+    order = list(reversed(range(len(tiers))))
+
+    while crafts_left:
+        time, slot = heapq.heappop(free_slots)
+        while completions and completions[0][0] <= time:
+            _, index, count = heapq.heappop(completions)
+            stock[index] += count
+
+        chosen = count = None
+        for index in order:
+            if not left[index]:
+                continue
+            count = min([batch[index], -(-left[index] // slots)] +
+                        [stock[source] // quantity for source, quantity in inputs[index]])
+            if count:
+                chosen = index
+                break
+        if chosen is None:
+            if not completions:
+                raise ValueError("Remaining bags cannot be crafted: missing ingredients")
+            heapq.heappush(free_slots, (completions[0][0], slot))
+            continue
+
+        for source, quantity in inputs[chosen]:
+            stock[source] -= quantity * count
+        left[chosen] -= count
+        crafts_left -= count
+        end = finish_time(time, work[chosen] * count, windows, syn_rate)
+        heapq.heappush(completions, (end, chosen, count))
+        heapq.heappush(free_slots, (end, slot))
+        jobs.append((slot, graph.field_of[tiers[chosen]], count, time, end))
+        busy_minutes += end - time
+        makespan = max(makespan, end)
+
+    sequential_minutes = sum(remaining_bags.get(graph.field_of[tier], 0) * work[index]
+                             for index, tier in enumerate(tiers))
+    return {
+        'slots': slots,
+        'syn_windows': windows,
+        'crafts': sum(job[2] for job in jobs),
+        'sequential_minutes': sequential_minutes,
+        'makespan_minutes': makespan,
+        'makespan_hours': makespan / 60,
+        'completion_date': as_of + timedelta(minutes=makespan),
+        'utilization': busy_minutes / (slots * makespan) if makespan else 0.0,
+        'steps': _merge_steps(jobs)
+    }
@@ -0,0 +1,254 @@
+"""
+Guild-pooled planning for ASU Calculator
+
+Pools the inventories of many players toward a number of ASUs and splits
+the remaining crafts back between the members.
+
+Pooling is a map-reduce. Chunks of member inventories are summed, in a
+process pool for large guilds, and the partial sums are added up. Each
+member keeps only a short row of the resources crafting spends (raw
+ingredients and BTC). GuildPlanner keeps the pooled totals up to date as
+members change, so a new plan after one inventory update costs O(tiers *
+members) and never re-sums the guild.
+
+Bags are assumed to be handed between members, so only raw ingredients
+and BTC limit who can craft a tier. Crafts are assigned tier by tier,
+ingredients first, by water-filling. Each member's crafting minutes are
+raised to a common level, capped by what they can pay for, which keeps
+the slowest member's share as small as possible. Crafts nobody can pay
+for are reported as unassigned.
+"""
+
+from itertools import islice, repeat
+
+from chain_plan import get_chain_plan
+from crafting_graph import raw_available
+from storage import INVENTORY_FIELDS
+
+POOL_CHUNK_SIZE = 5000
+
+def spent_resources(graph=None):
+    """Resources crafting spends from a member: raw ingredients, then BTC"""
+    if graph is None:
+        graph = get_chain_plan().graph
+    resources = []
+    for tier in graph.tiers:
+        for resource, _ in graph.raw_inputs[tier]:
+            if resource not in resources:
+                resources.append(resource)
+    return tuple(resources) + ('bitcoin',)
+
+def _member_row(inventory, resources):
+    return tuple(raw_available(inventory, resource) for resource in resources)
+
+def _pool_chunk(members, resources):
+    """Map step: field sums and a resource row per member for one chunk of (name, inventory)"""
+    totals = [0] * len(INVENTORY_FIELDS)
+    rows = []
+    for name, inventory in members:
+        for index, field in enumerate(INVENTORY_FIELDS):
+            totals[index] += inventory.get(field, 0) or 0
+        rows.append((name, _member_row(inventory, resources)))
+    return totals, rows
+
+def named_inventories(inventories):
+    """(name, inventory) pairs from a {name: inventory} dict, or a list named by 'player' or position"""
+    if isinstance(inventories, dict):
+        return iter(inventories.items())
+    return ((inventory.get('player', str(index)), inventory) for index, inventory in enumerate(inventories))
+
+def pool_inventories(inventories, workers=1, chunk_size=POOL_CHUNK_SIZE):
+    """Sum many member inventories into one pooled inventory
+
+    inventories is a {name: inventory} dict, or a list of inventories named by
+    their 'player' key or their position. With workers > 1 chunks are summed
+    in a process pool. Returns (pooled inventory, {name: resource row}) with
+    rows in spent_resources() order.
+    """
+    resources = spent_resources()
+    members = named_inventories(inventories)
+    chunks = iter(lambda: list(islice(members, chunk_size)), [])
+    if workers <= 1:
+        partials = (_pool_chunk(chunk, resources) for chunk in chunks)
+        return _reduce(partials)
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return _reduce(executor.map(_pool_chunk, chunks, repeat(resources)))
+
+def _reduce(partials):
+    """Reduce step: add the chunk sums and collect the member rows"""
+    totals = [0] * len(INVENTORY_FIELDS)
+    rows = {}
+    for chunk_totals, chunk_rows in partials:
+        for index, amount in enumerate(chunk_totals):
+            totals[index] += amount
+        rows.update(chunk_rows)
+    return dict(zip(INVENTORY_FIELDS, totals)), rows
+
+def _water_fill(count, loads, caps, minutes):
+    """Split count crafts of minutes each so loads + assigned rise to a common level, within caps"""
+    assigned = [0] * len(loads)
+    if count <= 0:
+        return assigned
+    if sum(caps) <= count:
+        return list(caps)
+
+    able = [index for index, cap in enumerate(caps) if cap]
+    able_loads = [loads[index] for index in able]
+    able_caps = [caps[index] for index in able]
+
+    def filled(level):
+        return [min(cap, max(0, int((level - load) // minutes))) for load, cap in zip(able_loads, able_caps)]
+
+    low, high = min(able_loads), max(able_loads) + count * minutes
+    while high - low > minutes / 2:
+        middle = (low + high) / 2
+        if sum(filled(middle)) >= count:
+            high = middle
+        else:
+            low = middle
+    for index, crafts in zip(able, filled(low)):
+        assigned[index] = crafts
+
+    # Hand out what the rounding left, least loaded first
+    short = count - sum(assigned)
+    for index in sorted(able, key=lambda index: loads[index] + assigned[index] * minutes):
+        if short <= 0:
+            break
+        if assigned[index] < caps[index]:
+            assigned[index] += 1
+            short -= 1
+    return assigned
+
+def allocate_crafts(remaining_bags, member_rows, resources=None, graph=None):
+    """Assign the remaining crafts of each tier to members
+
+    member_rows maps member name to its resource row (see pool_inventories).
+    Returns ({name: {field: crafts}}, {field: unassigned crafts}, {name:
+    crafting minutes}).
+    """
+    if graph is None:
+        graph = get_chain_plan().graph
+    if resources is None:
+        resources = spent_resources(graph)
+    names = list(member_rows)
+    stock = [list(member_rows[name]) for name in names]
+    loads = [0] * len(names)
+    assignment = {name: {} for name in names}
+    unassigned = {}
+    bitcoin = resources.index('bitcoin')
+    index_of = {resource: index for index, resource in enumerate(resources)}
+
+    for tier in graph.tiers:
+        field = graph.field_of[tier]
+        count = remaining_bags.get(field, 0)
+        if not count:
+            continue
+        costs = [(index_of[resource], quantity) for resource, quantity in graph.raw_inputs[tier]]
+        if graph.bitcoin[tier]:
+            costs.append((bitcoin, graph.bitcoin[tier]))
+        caps = [min((int(row[index] // quantity) for index, quantity in costs), default=count) for row in stock]
+        minutes = graph.minutes[tier] or 1
+        assigned = _water_fill(count, loads, caps, minutes)
+
+        for member, crafts in enumerate(assigned):
+            if not crafts:
+                continue
+            assignment[names[member]][field] = crafts
+            loads[member] += crafts * graph.minutes[tier]
+            for index, quantity in costs:
+                stock[member][index] -= crafts * quantity
+        if count > sum(assigned):
+            unassigned[field] = count - sum(assigned)
+
+    return assignment, unassigned, dict(zip(names, loads))
+
+class GuildPlanner:
+    """Pooled plan for a guild working toward target_asus ASUs
+
+    Members are added, replaced and removed one at a time, and the pooled
+    totals are updated in place, so plan() after each inventory change does
+    not re-sum the guild.
+    """
+
+    def __init__(self, inventories=None, target_asus=1, workers=1):
+        self.target_asus = target_asus
+        self.resources = spent_resources()
+        self._members = {}
+        self._rows = {}
+        self._totals = dict.fromkeys(INVENTORY_FIELDS, 0)
+        if inventories:
+            members = dict(named_inventories(inventories))
+            self._totals, self._rows = pool_inventories(members, workers)
+            self._members = {name: _amounts(inventory) for name, inventory in members.items()}
+
+    def __len__(self):
+        return len(self._members)
+
+    def __contains__(self, name):
+        return name in self._members
+
+    def set_member(self, name, inventory):
+        """Add a member or replace their inventory"""
+        self.remove_member(name)
+        amounts = _amounts(inventory)
+        for field, amount in amounts.items():
+            self._totals[field] += amount
+        self._members[name] = amounts
+        self._rows[name] = _member_row(inventory, self.resources)
+
+    def remove_member(self, name):
+        """Drop a member's inventory from the pool, if present"""
+        amounts = self._members.pop(name, None)
+        if amounts is None:
+            return
+        for field, amount in amounts.items():
+            self._totals[field] -= amount
+        del self._rows[name]
+
+    def pooled(self):
+        """Pooled inventory of all members"""
+        return dict(self._totals)
+
+    def plan(self, target_asus=None):
+        """Remaining chain for the guild and each member's share of the crafts
+
+        Returns dict with the pooled inventory, remaining bags, BTC and tech
+        scraps still to gather, the per-member 'allocation' (crafts per field
+        and crafting minutes), crafts no member can pay for, and the
+        makespan: the longest member crafting time.
+        """
+        if target_asus is None:
+            target_asus = self.target_asus
+        plan = get_chain_plan()
+        pooled = self.pooled()
+        remaining_bags = plan.graph.remaining(pooled, target_asus)
+        assignment, unassigned, minutes = allocate_crafts(remaining_bags, self._rows, self.resources, plan.graph)
+
+        tech_scraps_needed = sum(remaining_bags[plan.graph.field_of[tier]] * quantity
+                                 for tier in plan.graph.tiers
+                                 for resource, quantity in plan.graph.raw_inputs[tier] if resource == 'tech_scraps')
+        bitcoin_needed = plan.crafting_bitcoin(remaining_bags)
+        makespan = max(minutes.values(), default=0)
+        return {
+            'members': len(self._members),
+            'target_asus': target_asus,
+            'pooled_inventory': pooled,
+            'remaining_bags': remaining_bags,
+            'tech_scraps_needed': tech_scraps_needed,
+            'tech_scraps_to_gather': max(0, tech_scraps_needed - raw_available(pooled, 'tech_scraps')),
+            'bitcoin_needed': bitcoin_needed,
+            'bitcoin_to_gather': max(0, bitcoin_needed - pooled.get('bitcoin', 0)),
+            'allocation': {name: {'crafts': assignment[name], 'crafting_minutes': minutes[name]}
+                           for name in assignment},
+            'unassigned': unassigned,
+            'makespan_minutes': makespan,
+            'makespan_hours': makespan / 60
+        }
+
+def _amounts(inventory):
+    return {field: inventory.get(field, 0) or 0 for field in INVENTORY_FIELDS}
+
+def plan_guild(inventories, target_asus=1, workers=1):
+    """Pooled plan toward target_asus ASUs for a {name: inventory} dict or list of inventories"""
+    return GuildPlanner(inventories, target_asus, workers).plan()
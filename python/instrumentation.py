@@ -0,0 +1,178 @@
+"""
+Opt-in timing instrumentation for ASU Calculator
+
+Nothing is recorded until enable() is called. Until then stage() and
+time_stage() cost one flag check. Once enabled, two things are recorded:
+
+- Stage timers: calls, total seconds and max seconds for each named stage.
+  The calculator times 'load', 'validate', 'save', 'render' and each results
+  block as 'results.<name>'.
+- Call counters for every public function in the INSTRUMENTED_MODULES
+  (utils.py). enable() wraps each function in place, both in its module and
+  in every loaded module that imported it by name. disable() puts the
+  originals back.
+
+Recording is per process, so work done in worker processes (--workers) is
+not counted. export_json() and export_prometheus() report what was recorded.
+profile_call() runs a function under cProfile and prints sorted stats.
+"""
+
+import importlib
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+INSTRUMENTED_MODULES = ('utils',)
+EXPORT_FORMATS = ('json', 'prometheus')
+PROFILE_SORTS = ('cumulative', 'tottime', 'calls')
+METRIC_PREFIX = 'asu'
+
+_enabled = False
+_lock = threading.Lock()
+_stages = {}   # stage -> [calls, total seconds, max seconds]
+_calls = {}    # 'module.function' -> calls
+_patched = []  # (module namespace, attribute, original function)
+_NO_STAGE = nullcontext()
+
+def enabled():
+    """Whether stage timers and call counters are currently recording"""
+    return _enabled
+
+def enable(modules=INSTRUMENTED_MODULES):
+    """Start recording stage timers, and call counts for the functions in modules"""
+    global _enabled
+    if _enabled:
+        return
+    for module_name in modules:
+        _instrument(importlib.import_module(module_name))
+    _enabled = True
+
+def disable():
+    """Stop recording and restore the original functions; recorded data is kept until reset()"""
+    global _enabled
+    _enabled = False
+    while _patched:
+        namespace, attribute, original = _patched.pop()
+        namespace[attribute] = original
+
+def reset():
+    """Forget everything recorded so far"""
+    with _lock:
+        _stages.clear()
+        _calls.clear()
+
+def _record(name, seconds):
+    with _lock:
+        timer = _stages.get(name)
+        if timer is None:
+            _stages[name] = [1, seconds, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+@contextmanager
+def _timing(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+def stage(name):
+    """Context manager timing the named stage while instrumentation is enabled"""
+    if not _enabled:
+        return _NO_STAGE
+    return _timing(name)
+
+def time_stage(name, function, *args):
+    """function(*args), timed as the named stage while instrumentation is enabled"""
+    if not _enabled:
+        return function(*args)
+    start = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        _record(name, time.perf_counter() - start)
+
+def _counting(name, function):
+    @wraps(function)
+    def counted(*args, **kwargs):
+        with _lock:
+            _calls[name] = _calls.get(name, 0) + 1
+        return function(*args, **kwargs)
+    return counted
+
+def _instrument(module):
+    """Wrap the module's public functions with call counters, wherever they are referenced by name"""
+    import inspect
+    wrappers = {}
+    for name, function in inspect.getmembers(module, inspect.isfunction):
+        if function.__module__ == module.__name__ and not name.startswith('_'):
+            wrappers[id(function)] = (function, _counting(f"{module.__name__}.{name}", function))
+
+    for loaded in list(sys.modules.values()):
+        namespace = getattr(loaded, '__dict__', None)
+        if not isinstance(namespace, dict):
+            continue
+        for attribute, value in list(namespace.items()):
+            entry = wrappers.get(id(value))
+            if entry is not None and entry[0] is value:
+                namespace[attribute] = entry[1]
+                _patched.append((namespace, attribute, value))
+
+def export_json():
+    """Recorded stage timers and call counts as a dict"""
+    with _lock:
+        return {
+            'stages': {name: {'calls': calls, 'total_seconds': total, 'mean_seconds': total / calls,
+                              'max_seconds': longest}
+                       for name, (calls, total, longest) in sorted(_stages.items())},
+            'calls': dict(sorted(_calls.items()))
+        }
+
+def _metric(lines, name, kind, description, label, values):
+    lines.append(f"# HELP {METRIC_PREFIX}_{name} {description}")
+    lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+    for key, value in values:
+        lines.append(f'{METRIC_PREFIX}_{name}{{{label}="{key}"}} {value}')
+
+def export_prometheus():
+    """Recorded stage timers and call counts in the Prometheus text exposition format"""
+    data = export_json()
+    stages = data['stages']
+    lines = []
+    _metric(lines, 'stage_calls_total', 'counter', "Times each stage ran", 'stage',
+            ((name, timer['calls']) for name, timer in stages.items()))
+    _metric(lines, 'stage_seconds_total', 'counter', "Seconds spent in each stage", 'stage',
+            ((name, repr(timer['total_seconds'])) for name, timer in stages.items()))
+    _metric(lines, 'stage_max_seconds', 'gauge', "Longest single run of each stage", 'stage',
+            ((name, repr(timer['max_seconds'])) for name, timer in stages.items()))
+    _metric(lines, 'function_calls_total', 'counter', "Calls of each instrumented function", 'function',
+            data['calls'].items())
+    return "\n".join(lines) + "\n"
+
+def export(output_format='json'):
+    """What was recorded as text in one of EXPORT_FORMATS"""
+    if output_format == 'json':
+        return json.dumps(export_json(), indent=2) + "\n"
+    if output_format == 'prometheus':
+        return export_prometheus()
+    raise ValueError(f"Unknown export format: {output_format} (expected one of {', '.join(EXPORT_FORMATS)})")
+
+def profile_call(function, *args, sort='cumulative', limit=30, stream=None):
+    """Run function(*args) under cProfile and print its top limit stats by sort to stream (stderr)
+
+    Returns what function returns; stats are printed even if it raises.
+    """
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args)
+    finally:
+        stats = pstats.Stats(profiler, stream=stream or sys.stderr)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
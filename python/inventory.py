@@ -0,0 +1,181 @@
+"""
+Compact inventory types for ASU Calculator
+
+Inventory is a mutable mapping with one __slots__ attribute per inventory
+field, so it needs no per-instance dict and can be passed anywhere an
+inventory dict is expected (utils.py calculators, ASUCalculator, stores).
+InventoryArray keeps many inventories as an array of structs: one flat
+int64 array with a row of amounts per inventory, plus the two dates. It
+converts to the column dicts used by vectorized.py without building any
+per-inventory objects.
+
+Both convert cheaply to and from the JSON dict format with from_dict() and
+to_dict(); keys other than the inventory fields and dates are dropped.
+"""
+
+from array import array
+from collections.abc import MutableMapping
+
+from storage import INVENTORY_FIELDS
+
+DATE_FIELDS = ('start_date', 'last_updated')
+FIELDS = tuple(INVENTORY_FIELDS) + DATE_FIELDS
+_FIELD_SET = frozenset(FIELDS)
+_WIDTH = len(INVENTORY_FIELDS)
+
+class Inventory(MutableMapping):
+    """Inventory with a fixed set of fields stored in __slots__
+
+    Behaves like the inventory dict: inventory['bitcoin'], .get(), .update()
+    and iteration over the fields in INVENTORY_FIELDS order, then the dates.
+    Amounts default to 0 and dates to None. Setting an unknown key raises
+    KeyError, and fields cannot be deleted.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, data=None, **fields):
+        for field in INVENTORY_FIELDS:
+            setattr(self, field, 0)
+        self.start_date = None
+        self.last_updated = None
+        if data is not None:
+            self.update(data)
+        if fields:
+            self.update(fields)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build an Inventory from an inventory dict, ignoring unknown keys"""
+        inventory = cls()
+        for field, value in data.items():
+            if field in _FIELD_SET:
+                setattr(inventory, field, value)
+        return inventory
+
+    def to_dict(self):
+        """Plain inventory dict, e.g. for JSON"""
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def copy(self):
+        inventory = Inventory.__new__(Inventory)
+        for field in FIELDS:
+            setattr(inventory, field, getattr(self, field))
+        return inventory
+
+    def __getitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in _FIELD_SET:
+            return default
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        raise TypeError("Inventory fields cannot be deleted")
+
+    def __contains__(self, key):
+        return key in _FIELD_SET
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __repr__(self):
+        return f"Inventory({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (Inventory.from_dict, (self.to_dict(),))
+
+class InventoryArray:
+    """Many inventories stored as rows of a flat int64 array
+
+    Amounts must be whole numbers. Indexing returns an Inventory copy of a
+    row; use columns() for bulk calculations with vectorized.py.
+    """
+
+    def __init__(self, inventories=()):
+        self._amounts = array('q')
+        self._start_dates = []
+        self._last_updated = []
+        self.extend(inventories)
+
+    @classmethod
+    def from_dicts(cls, inventories):
+        return cls(inventories)
+
+    def to_dicts(self):
+        """List of plain inventory dicts"""
+        return [inventory.to_dict() for inventory in self]
+
+    def append(self, inventory):
+        """Add one inventory (any mapping); missing amounts count as 0"""
+        row = []
+        for field in INVENTORY_FIELDS:
+            value = inventory.get(field, 0) or 0
+            if value != int(value):
+                raise ValueError(f"{field} must be a whole number, got {value}")
+            row.append(int(value))
+        self._amounts.extend(row)
+        self._start_dates.append(inventory.get('start_date'))
+        self._last_updated.append(inventory.get('last_updated'))
+
+    def extend(self, inventories):
+        for inventory in inventories:
+            self.append(inventory)
+
+    def __len__(self):
+        return len(self._start_dates)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("InventoryArray index out of range")
+        inventory = Inventory.__new__(Inventory)
+        start = index * _WIDTH
+        for field, value in zip(INVENTORY_FIELDS, self._amounts[start:start + _WIDTH]):
+            setattr(inventory, field, value)
+        inventory.start_date = self._start_dates[index]
+        inventory.last_updated = self._last_updated[index]
+        return inventory
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __setitem__(self, index, inventory):
+        replacement = InventoryArray([inventory])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("InventoryArray index out of range")
+        self._amounts[index * _WIDTH:(index + 1) * _WIDTH] = replacement._amounts
+        self._start_dates[index] = replacement._start_dates[0]
+        self._last_updated[index] = replacement._last_updated[0]
+
+    def start_dates(self):
+        """List of each row's start_date (None where unset)"""
+        return list(self._start_dates)
+
+    def columns(self):
+        """Dict of per-field columns for vectorized.py (NumPy arrays, or lists without NumPy)"""
+        try:
+            import numpy as np
+        except ImportError:  # pragma: no cover - depends on environment
+            np = None
+        if np is not None:
+            if not len(self):
+                return {field: np.zeros(0, dtype=np.int64) for field in INVENTORY_FIELDS}
+            matrix = np.frombuffer(self._amounts, dtype=np.int64).reshape(len(self), _WIDTH)
+            return {field: matrix[:, index].copy() for index, field in enumerate(INVENTORY_FIELDS)}
+        return {field: self._amounts[index::_WIDTH].tolist() for index, field in enumerate(INVENTORY_FIELDS)}
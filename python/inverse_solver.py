@@ -0,0 +1,219 @@
+"""
+Inverse queries for ASU Calculator
+
+The forward model estimates completion as remaining tech scraps divided by
+the daily collection rate, where one scav run yields
+calculate_expected_med_tech_per_run() med tech, recycled at recycle_ratio.
+That model is linear in the run rate, so it inverts in closed form:
+
+- target date -> scav runs per day needed (runs_per_day_for_date)
+- runs per day -> completion date (completion_for_runs_per_day)
+
+How many ASUs a budget buys is also answered here (achievable_asus). Tech
+scraps per ASU are constant, so the scav-run limit is closed form. The BTC
+still to spend is piecewise linear in the target, since held bags are used
+before crafting more. The BTC limit is therefore found by bisection, between
+bounds that differ only by the BTC value of the held bags, which takes a few
+graph evaluations.
+
+The _batch versions take a list of inventories (or an InventoryArray) and
+return dicts of columns, using NumPy when it is installed.
+"""
+
+import math
+from datetime import datetime
+
+import utils
+from chain_plan import get_chain_plan
+from config import CONVERSIONS, SCAVENGING, SYN_RATE
+
+def tech_scraps_per_run():
+    """Expected tech scraps from one scav run once its med tech is recycled"""
+    return utils.calculate_expected_med_tech_per_run() * CONVERSIONS['recycle_ratio']
+
+def remaining_tech_scraps(inventory, target_asus=1):
+    """Tech scraps still to gather for target_asus ASUs, counting held ASUs and bags"""
+    plan = get_chain_plan()
+    needed = plan.tech_scraps_per_asu * max(0, target_asus - inventory.get(plan.final_field, 0))
+    return max(0, needed - utils.calculate_tech_scrap_equivalent_from_inventory(inventory))
+
+def _scav_hours(runs_per_day):
+    hours = runs_per_day * SCAVENGING['run_time_hours']
+    return hours, hours * SYN_RATE
+
+def runs_per_day_for_date(inventory, target_date, as_of=None, target_asus=1):
+    """Scav runs per day needed to gather everything by target_date
+
+    Returns dict with the runs and scav hours per day (with and without syn),
+    and whether that fits in a day. runs_per_day is None if target_date is
+    not after as_of and gathering is still needed.
+    """
+    if as_of is None:
+        as_of = datetime.now()
+    remaining = remaining_tech_scraps(inventory, target_asus)
+    runs_needed = remaining / tech_scraps_per_run()
+    days_available = (target_date - as_of).total_seconds() / 86400
+
+    runs_per_day = None
+    if not remaining:
+        runs_per_day = 0.0
+    elif days_available > 0:
+        runs_per_day = runs_needed / days_available
+
+    hours = hours_syn = None
+    if runs_per_day is not None:
+        hours, hours_syn = _scav_hours(runs_per_day)
+    return {
+        'target_date': target_date,
+        'days_available': days_available,
+        'remaining_tech_scraps': remaining,
+        'runs_needed': runs_needed,
+        'runs_per_day': runs_per_day,
+        'scav_hours_per_day': hours,
+        'scav_hours_per_day_syn': hours_syn,
+        'achievable': hours is not None and hours <= 24,
+        'achievable_with_syn': hours_syn is not None and hours_syn <= 24
+    }
+
+def completion_for_runs_per_day(inventory, runs_per_day, as_of=None, target_asus=1):
+    """Completion date when scavenging runs_per_day runs a day
+
+    days_to_completion and completion_date are None when runs_per_day is
+    not positive and gathering is still needed. completion_date is also
+    None when it would fall after year 9999.
+    """
+    if as_of is None:
+        as_of = datetime.now()
+    remaining = remaining_tech_scraps(inventory, target_asus)
+    runs_needed = remaining / tech_scraps_per_run()
+
+    days = None
+    if not remaining:
+        days = 0.0
+    elif runs_per_day > 0:
+        days = runs_needed / runs_per_day
+    return {
+        'runs_per_day': runs_per_day,
+        'remaining_tech_scraps': remaining,
+        'runs_needed': runs_needed,
+        'days_to_completion': days,
+        'completion_date': utils.add_days(as_of, days) if days is not None else None
+    }
+
+def _bitcoin_needed(inventory, target_asus):
+    plan = get_chain_plan()
+    return plan.crafting_bitcoin(plan.graph.remaining(inventory, target_asus))
+
+def achievable_asus(inventory, bitcoin=None, runs=None):
+    """Most ASUs reachable with bitcoin more BTC and runs more scav runs
+
+    A budget of None is unlimited, but at least one must be given. Returns
+    dict with the ASU count (held ASUs included), which budget limits it,
+    and the BTC and runs that count takes.
+    """
+    if bitcoin is None and runs is None:
+        raise ValueError("Give a BTC budget, a scav run budget, or both")
+    plan = get_chain_plan()
+    held = inventory.get(plan.final_field, 0)
+
+    limits = {}
+    if runs is not None:
+        gathered = utils.calculate_tech_scrap_equivalent_from_inventory(inventory) + runs * tech_scraps_per_run()
+        limits['tech_scraps'] = held + int(gathered // plan.tech_scraps_per_asu)
+    if bitcoin is not None:
+        # A new ASU costs at most bitcoin_per_asu, and held bags save at most their BTC value
+        budget = inventory.get('bitcoin', 0) + bitcoin
+        held_value = sum(inventory.get(field, 0) * plan.bitcoin_per_bag[field] for field in plan.fields[:-1])
+        low = held + int(budget // plan.bitcoin_per_asu)
+        high = held + int((budget + held_value) // plan.bitcoin_per_asu)
+        if 'tech_scraps' in limits:
+            low, high = min(low, limits['tech_scraps']), min(high, limits['tech_scraps'])
+        while low < high:
+            middle = (low + high + 1) // 2
+            if _bitcoin_needed(inventory, middle) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        limits['bitcoin'] = low
+
+    limited_by = min(limits, key=limits.get)
+    asus = limits[limited_by]
+    return {
+        'asus': asus,
+        'limited_by': limited_by,
+        'bitcoin_needed': max(0, _bitcoin_needed(inventory, asus) - inventory.get('bitcoin', 0)),
+        'runs_needed': remaining_tech_scraps(inventory, asus) / tech_scraps_per_run()
+    }
+
+def _remaining_column(columns, target_asus):
+    """Vectorized remaining_tech_scraps over a dict of columns"""
+    import vectorized
+    plan = get_chain_plan()
+    equivalent = vectorized.calculate_tech_scrap_equivalent_from_inventory(columns)
+    held = vectorized.np.asarray(columns[plan.final_field])
+    needed = plan.tech_scraps_per_asu * vectorized.np.maximum(0, target_asus - held)
+    return vectorized.np.maximum(0, needed - equivalent)
+
+def runs_per_day_for_date_batch(inventories, target_date, as_of=None, target_asus=1):
+    """runs_per_day_for_date() for many inventories; returns dict of columns
+
+    runs_per_day is NaN (None without NumPy) where the date cannot be met.
+    """
+    import vectorized
+    if as_of is None:
+        as_of = datetime.now()
+    if not vectorized.HAS_NUMPY:
+        rows = [runs_per_day_for_date(inventory, target_date, as_of, target_asus) for inventory in inventories]
+        return {key: [row[key] for row in rows]
+                for key in ('remaining_tech_scraps', 'runs_needed', 'runs_per_day', 'scav_hours_per_day')}
+
+    np = vectorized.np
+    remaining = _remaining_column(vectorized.to_columns(inventories), target_asus)
+    runs_needed = remaining / tech_scraps_per_run()
+    days_available = (target_date - as_of).total_seconds() / 86400
+    if days_available > 0:
+        runs_per_day = runs_needed / days_available
+    else:
+        runs_per_day = np.where(remaining > 0, np.nan, 0.0)
+    return {
+        'remaining_tech_scraps': remaining,
+        'runs_needed': runs_needed,
+        'runs_per_day': runs_per_day,
+        'scav_hours_per_day': runs_per_day * SCAVENGING['run_time_hours']
+    }
+
+def completion_for_runs_per_day_batch(inventories, runs_per_day, as_of=None, target_asus=1):
+    """completion_for_runs_per_day() for many inventories; returns dict of columns
+
+    runs_per_day is one rate for all or one per inventory. Where a rate is
+    not positive days_to_completion is NaN and completion_date None, as is
+    a completion_date after year 9999.
+    """
+    import vectorized
+    if as_of is None:
+        as_of = datetime.now()
+    if not vectorized.HAS_NUMPY:
+        inventories = list(inventories)
+        rates = runs_per_day if isinstance(runs_per_day, (list, tuple)) else [runs_per_day] * len(inventories)
+        rows = [completion_for_runs_per_day(inventory, rate, as_of, target_asus)
+                for inventory, rate in zip(inventories, rates)]
+        return {key: [row[key] for row in rows]
+                for key in ('remaining_tech_scraps', 'runs_needed', 'days_to_completion', 'completion_date')}
+
+    np = vectorized.np
+    remaining = _remaining_column(vectorized.to_columns(inventories), target_asus)
+    runs_needed = remaining / tech_scraps_per_run()
+    rates = np.broadcast_to(np.asarray(runs_per_day, dtype=np.float64), runs_needed.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days = np.where(remaining == 0, 0.0, np.where(rates > 0, runs_needed / rates, np.nan))
+    return {
+        'remaining_tech_scraps': remaining,
+        'runs_needed': runs_needed,
+        'days_to_completion': days,
+        'completion_date': [None if math.isnan(day) else utils.add_days(as_of, day) for day in days.tolist()]
+    }
+
+def achievable_asus_batch(inventories, bitcoin=None, runs=None):
+    """achievable_asus() for many inventories; returns dict of lists"""
+    rows = [achievable_asus(inventory, bitcoin, runs) for inventory in inventories]
+    return {key: [row[key] for row in rows] for key in ('asus', 'limited_by', 'bitcoin_needed', 'runs_needed')}
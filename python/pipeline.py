@@ -0,0 +1,99 @@
+"""
+Pipeline throughput model for ASU Calculator
+
+Treats scavenging (med tech), recycling (med tech -> tech scraps) and
+crafting as three concurrent stages, each with a number of parallel slots
+(config.PIPELINE), instead of adding their times up one after another.
+
+Each stage is modeled as a fluid flow. Its busy time is its work divided by
+its slots. It can finish no earlier than its own start plus that busy time,
+and no earlier than one unit of work after the stage feeding it finishes
+(one scav run, one recycling cycle, one craft per tier). The stage with the
+most busy time is the bottleneck. The last stage's finish is the end-to-end
+completion time.
+"""
+
+import config
+from chain_plan import get_chain_plan
+from crafting_graph import raw_available
+from utils import calculate_expected_med_tech_per_run
+
+STAGES = ('scavenging', 'recycling', 'crafting')
+MED_TECH_PER_RECYCLE = 1000
+
+def _stage(units, unit_minutes, slots, start, upstream_finish, tail_minutes):
+    """Busy time and finish time in minutes for one stage"""
+    busy = units * unit_minutes / slots
+    finish = start + busy if units > 0 else 0
+    if units > 0 and upstream_finish:
+        finish = max(finish, upstream_finish + tail_minutes)
+    return {
+        'units': units,
+        'slots': slots,
+        'rate_per_hour': slots * 60 / unit_minutes if unit_minutes else 0.0,
+        'busy_minutes': busy,
+        'start_minutes': start if units > 0 else 0,
+        'finish_minutes': finish
+    }
+
+def calculate_pipeline(inventory, remaining_bags=None, slots=None, use_syn=False):
+    """Model gathering and crafting of the remaining bags as a concurrent pipeline
+
+    slots maps stage name to parallel slots, defaulting to config.PIPELINE;
+    every stage needs at least one. With use_syn every stage runs at
+    SYN_RATE of its normal time. Returns a dict with per-stage units, rate,
+    busy and finish times, the bottleneck stage and the end-to-end
+    completion time.
+    """
+    slots = dict(config.PIPELINE, **(slots or {}))
+    for name in STAGES:
+        if slots[name] < 1:
+            raise ValueError(f"Each pipeline stage needs at least 1 slot, got {name}: {slots[name]}")
+    plan = get_chain_plan()
+    graph = plan.graph
+    if remaining_bags is None:
+        remaining_bags = graph.remaining(inventory)
+    speed = config.SYN_RATE if use_syn else 1
+
+    # Raw tech scraps the remaining crafts consume, and where they come from
+    tech_scraps_needed = sum(remaining_bags.get(graph.field_of[tier], 0) * quantity
+                             for tier in graph.tiers
+                             for resource, quantity in graph.raw_inputs[tier] if resource == 'tech_scraps')
+    tech_scrap_deficit = max(0, tech_scraps_needed - raw_available(inventory, 'tech_scraps'))
+    med_tech_to_recycle = tech_scrap_deficit / config.CONVERSIONS['recycle_ratio']
+    med_tech_on_hand = raw_available(inventory, 'med_tech')
+    med_tech_to_scavenge = max(0, med_tech_to_recycle - med_tech_on_hand)
+
+    run_minutes = config.SCAVENGING['run_time_hours'] * 60 * speed
+    med_tech_minutes = run_minutes / calculate_expected_med_tech_per_run()
+    recycle_minutes = config.CONVERSIONS['recycle_time_minutes'] * speed
+    crafts = sum(remaining_bags.get(field, 0) for field in plan.fields)
+    craft_minutes = plan.crafting_minutes(remaining_bags) * speed
+
+    # Critical path once the last tech scraps arrive: one craft of each tier still needed
+    crafting_tail = sum(plan.tier_minutes[field] for field in plan.fields if remaining_bags.get(field, 0)) * speed
+
+    scavenging = _stage(med_tech_to_scavenge, med_tech_minutes, slots['scavenging'], 0, 0, 0)
+    recycling_start = 0 if med_tech_on_hand >= min(MED_TECH_PER_RECYCLE, med_tech_to_recycle) else run_minutes
+    recycling = _stage(med_tech_to_recycle, recycle_minutes / MED_TECH_PER_RECYCLE, slots['recycling'],
+                       recycling_start, scavenging['finish_minutes'], recycle_minutes)
+    crafted, _ = graph.craftable(inventory)
+    crafting_start = 0 if any(crafted.values()) or not recycling['units'] else recycling_start + recycle_minutes
+    crafting = _stage(crafts, craft_minutes / crafts if crafts else 0, slots['crafting'],
+                      crafting_start, recycling['finish_minutes'], crafting_tail)
+
+    stages = {'scavenging': scavenging, 'recycling': recycling, 'crafting': crafting}
+    completion = max(stage['finish_minutes'] for stage in stages.values())
+    for stage in stages.values():
+        stage['utilization'] = stage['busy_minutes'] / completion if completion else 0.0
+    bottleneck = max(STAGES, key=lambda name: stages[name]['busy_minutes']) if completion else None
+    sequential = sum(stage['busy_minutes'] * stage['slots'] for stage in stages.values())
+
+    return {
+        'stages': stages,
+        'bottleneck': bottleneck,
+        'completion_minutes': completion,
+        'completion_hours': completion / 60,
+        'completion_days': completion / 1440,
+        'sequential_hours': sequential / 60
+    }
@@ -0,0 +1,114 @@
+"""
+Incremental collection rate estimator for ASU Calculator
+
+Tracks rolling 1-day, 7-day and 30-day collection rates and an exponentially
+weighted moving average (EWMA) rate from a stream of inventory snapshots.
+Each new snapshot is O(1) amortized work, so rates never need recomputing
+from the full history. The estimator state is small and is saved next to the
+snapshot log between runs.
+"""
+
+import json
+import os
+from collections import deque
+from datetime import datetime
+
+from storage import atomic_write_json
+
+DEFAULT_WINDOWS = {'1d': 1, '7d': 7, '30d': 30}
+EWMA_HALF_LIFE_DAYS = 3
+
+def _days_between(start, end):
+    return (end - start).total_seconds() / 86400
+
+class CollectionRateEstimator:
+    """Windowed and EWMA tech scrap collection rates, updated one snapshot at a time"""
+
+    def __init__(self, windows=None, half_life_days=EWMA_HALF_LIFE_DAYS):
+        self.windows = dict(windows if windows is not None else DEFAULT_WINDOWS)
+        self.half_life_days = half_life_days
+        # Per window: points from the last one at or before the window start onwards
+        self.points = {name: deque() for name in self.windows}
+        self.last = None
+        self.ewma_rate = None
+
+    def update(self, recorded_at, tech_scrap_equivalent):
+        """Add one snapshot; snapshots must arrive in time order"""
+        if isinstance(recorded_at, str):
+            recorded_at = datetime.fromisoformat(recorded_at)
+        if self.last is not None and recorded_at <= self.last[0]:
+            return
+
+        if self.last is not None:
+            elapsed = _days_between(self.last[0], recorded_at)
+            rate = (tech_scrap_equivalent - self.last[1]) / elapsed
+            if self.ewma_rate is None:
+                self.ewma_rate = rate
+            else:
+                alpha = 1 - 0.5 ** (elapsed / self.half_life_days)
+                self.ewma_rate += alpha * (rate - self.ewma_rate)
+
+        point = (recorded_at, tech_scrap_equivalent)
+        self.last = point
+        for name, days in self.windows.items():
+            points = self.points[name]
+            points.append(point)
+            while len(points) > 1 and _days_between(points[1][0], recorded_at) >= days:
+                points.popleft()
+
+    def update_from_snapshots(self, snapshots):
+        """Add every record from a snapshot stream (e.g. a SnapshotLog)"""
+        for record in snapshots:
+            self.update(record['recorded_at'], record['tech_scrap_equivalent'])
+        return self
+
+    def rates(self):
+        """Current daily rates per window plus 'ewma'; None where there is no data yet"""
+        rates = {}
+        for name, points in self.points.items():
+            if len(points) < 2:
+                rates[name] = None
+                continue
+            (start, start_value), (end, end_value) = points[0], points[-1]
+            rates[name] = (end_value - start_value) / _days_between(start, end)
+        rates['ewma'] = self.ewma_rate
+        return rates
+
+    def to_dict(self):
+        """Serializable estimator state"""
+        return {
+            'windows': self.windows,
+            'half_life_days': self.half_life_days,
+            'points': {name: [[t.isoformat(), value] for t, value in points]
+                       for name, points in self.points.items()},
+            'last': [self.last[0].isoformat(), self.last[1]] if self.last else None,
+            'ewma_rate': self.ewma_rate
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Restore an estimator saved with to_dict()"""
+        estimator = cls(state['windows'], state['half_life_days'])
+        for name, points in state['points'].items():
+            estimator.points[name] = deque((datetime.fromisoformat(t), value) for t, value in points)
+        if state['last']:
+            estimator.last = (datetime.fromisoformat(state['last'][0]), state['last'][1])
+        estimator.ewma_rate = state['ewma_rate']
+        return estimator
+
+def rate_state_path(snapshot_log):
+    """Path of the saved estimator state for a snapshot log"""
+    return os.path.splitext(snapshot_log.path)[0] + "_rates.json"
+
+def load_rate_estimator(snapshot_log):
+    """Load the saved estimator for a snapshot log, rebuilding it from the log if needed"""
+    path = rate_state_path(snapshot_log)
+    try:
+        with open(path, 'r') as f:
+            return CollectionRateEstimator.from_dict(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return CollectionRateEstimator().update_from_snapshots(snapshot_log)
+
+def save_rate_estimator(estimator, snapshot_log):
+    """Atomically save estimator state next to its snapshot log"""
+    atomic_write_json(rate_state_path(snapshot_log), estimator.to_dict())
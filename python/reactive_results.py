@@ -0,0 +1,139 @@
+"""
+Incremental results for ASU Calculator
+
+ReactiveResults holds one inventory and its calculate_results_data() output.
+When fields change it recomputes only the parts of the results that depend
+on them. This suits a live UI that recalculates on every slider movement.
+
+Each node of the results declares the inventory fields and other nodes it
+reads (RESULT_NODES). An update marks the nodes that read a changed field
+as dirty. results() then recomputes the dirty nodes in dependency order.
+If a recomputed node comes out equal to its old value, the nodes that read
+it are not dirtied (early cutoff). Changing only bitcoin, for example,
+recomputes just the bag crafter numbers. The time-dependent node is also
+recomputed whenever the as_of time moves, and every node is recomputed if
+config.CRAFTING_CHAIN changes. The pipeline node only exists when asked for,
+as with calculate_results_data(pipeline=True).
+"""
+
+from asu_calculator import ASUCalculator
+from chain_plan import get_chain_plan
+from pipeline import calculate_pipeline
+from storage import INVENTORY_FIELDS
+from utils import calculate_remaining_bags_to_craft, calculate_total_requirements, validate_inventory_data
+
+RAW_FIELDS = ('tech_scraps', 'tech_scrap_clusters', 'med_tech', 'med_tech_clusters')
+
+def _node_fields():
+    """Inventory fields each node reads, for the current chain"""
+    bag_fields = tuple(get_chain_plan().fields)
+    equivalent = RAW_FIELDS + bag_fields[:-1]
+    return {
+        'total_requirements': (),
+        'eoc_progress': bag_fields,
+        'remaining_gathering': equivalent,
+        'remaining_bags': bag_fields,
+        'crafting_totals': (),
+        'bag_crafter_service': ('tech_scraps', 'tech_scrap_clusters', 'bitcoin') + bag_fields,
+        'pipeline': RAW_FIELDS + bag_fields,
+        'time': equivalent + ('start_date',)
+    }
+
+# (node, nodes it reads, compute(calculator, values, as_of)) in dependency order
+RESULT_NODES = (
+    ('total_requirements', (), lambda calculator, values, as_of: calculate_total_requirements()),
+    ('eoc_progress', (), lambda calculator, values, as_of: calculator.calculate_eoc_progress()),
+    ('remaining_gathering', ('total_requirements',),
+     lambda calculator, values, as_of: calculator.calculate_remaining_gathering(values['total_requirements'])),
+    ('remaining_bags', (), lambda calculator, values, as_of: calculate_remaining_bags_to_craft(calculator.inventory)),
+    ('crafting_totals', ('remaining_bags',),
+     lambda calculator, values, as_of: calculator.calculate_crafting_totals(values['remaining_bags'])),
+    ('bag_crafter_service', ('remaining_bags',),
+     lambda calculator, values, as_of: calculator.calculate_bag_crafter_service(values['remaining_bags'])),
+    ('pipeline', ('remaining_bags',),
+     lambda calculator, values, as_of: calculate_pipeline(calculator.inventory, values['remaining_bags'])),
+    ('time', ('remaining_gathering',),
+     lambda calculator, values, as_of: calculator.calculate_time_results(
+         values['remaining_gathering']['tech_scraps'], as_of))
+)
+
+class ReactiveResults:
+    """calculate_results_data() for one inventory, kept up to date field by field
+
+    Node values are shared between results() calls and must be treated as
+    read-only. last_recomputed lists the nodes the latest results() call
+    recomputed. pipeline adds the pipeline model to the results.
+    """
+
+    def __init__(self, inventory, as_of=None, rate_estimator=None, pipeline=False):
+        self.calculator = ASUCalculator(validate_inventory_data(dict(inventory)), rate_estimator=rate_estimator,
+                                        verbose=False, as_of=as_of)
+        self.nodes = tuple(node for node in RESULT_NODES if pipeline or node[0] != 'pipeline')
+        self.values = {}
+        self.dirty = {name for name, _, _ in self.nodes}
+        self.last_recomputed = ()
+        self._readers = {}
+        for name, inputs, _ in self.nodes:
+            for source in inputs:
+                self._readers.setdefault(source, []).append(name)
+        self._plan = get_chain_plan()
+        self._fields = _node_fields()
+        self._as_of = None
+
+    @property
+    def inventory(self):
+        return self.calculator.inventory
+
+    def update(self, changes=None, **fields):
+        """Set inventory fields; returns the names of the fields whose values changed"""
+        changes = dict(changes or {}, **fields)
+        changed = []
+        for field, value in changes.items():
+            if field not in INVENTORY_FIELDS and field != 'start_date':
+                raise KeyError(field)
+            if self.inventory.get(field) != value:
+                self.inventory[field] = value
+                changed.append(field)
+        if changed:
+            changed_set = set(changed)
+            self.dirty.update(name for name, fields in self._fields.items() if changed_set.intersection(fields))
+        return changed
+
+    def results(self, as_of=None):
+        """The full results dict, recomputing only what changed since the last call"""
+        plan = get_chain_plan()
+        if plan is not self._plan:
+            self._plan = plan
+            self._fields = _node_fields()
+            self.dirty.update(name for name, _, _ in self.nodes)
+        as_of = self.calculator.resolve_as_of(as_of)
+        if as_of != self._as_of:
+            self._as_of = as_of
+            self.dirty.add('time')
+
+        recomputed = []
+        for name, _, compute in self.nodes:
+            if name not in self.dirty:
+                continue
+            value = compute(self.calculator, self.values, as_of)
+            if name not in self.values or value != self.values[name]:
+                self.values[name] = value
+                self.dirty.update(self._readers.get(name, ()))
+            recomputed.append(name)
+        self.dirty.clear()
+        self.last_recomputed = tuple(recomputed)
+
+        values = self.values
+        results = {
+            'total_requirements': values['total_requirements'],
+            'collection_rate': values['time']['collection_rate'],
+            'eoc_progress': values['eoc_progress'],
+            'remaining_gathering': values['remaining_gathering'],
+            'remaining_bags': values['remaining_bags'],
+            'crafting_totals': values['crafting_totals'],
+            'bag_crafter_service': values['bag_crafter_service'],
+            'completion_estimate': values['time']['completion_estimate']
+        }
+        if 'pipeline' in values:
+            results['pipeline'] = values['pipeline']
+        return results
@@ -0,0 +1,96 @@
+"""
+Results cache for ASU Calculator
+
+Bounded LRU cache with an optional time-to-live for the time-independent part
+of calculate_results_data(). Entries are keyed on the inventory amounts only,
+so the same inventory saved again (with a new last_updated) is still a hit.
+The collection rate and completion estimate depend on the current time and
+are always recomputed, see ASUCalculator.calculate_results_data().
+
+Cached results are computed from the config at the time they were stored;
+call clear() after changing config values. The cache is thread-safe, so one
+instance can be shared by the HTTP service's worker threads.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from storage import INVENTORY_FIELDS
+
+DEFAULT_MAXSIZE = 1024
+
+def results_key(inventory):
+    """Canonical cache key for an inventory: its amounts, ignoring timestamps"""
+    return tuple(inventory.get(field, 0) or 0 for field in INVENTORY_FIELDS)
+
+class ResultsCache:
+    """LRU cache of static results keyed on inventory amounts, with hit/miss counters"""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, inventory):
+        """Cached results for the inventory, or None on a miss"""
+        key = results_key(inventory)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.ttl is not None and self.clock() - entry[0] > self.ttl:
+                del self.entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, inventory, results):
+        """Store results for the inventory, evicting the least recently used entry if full"""
+        if self.maxsize <= 0:
+            return
+        key = results_key(inventory)
+        with self._lock:
+            self.entries[key] = (self.clock(), results)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, inventory, compute):
+        """Cached results for the inventory, calling compute() and storing them on a miss"""
+        results = self.get(inventory)
+        if results is None:
+            results = compute()
+            self.put(inventory, results)
+        return results
+
+    def clear(self):
+        """Drop every entry (e.g. after a config change); counters are kept"""
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
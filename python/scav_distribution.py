@@ -0,0 +1,148 @@
+"""
+Runs-to-target distribution for ASU Calculator
+
+Exact (or near-exact) distribution of the number of scavenging runs needed to
+collect a med tech target, without simulation. Each run drops
+Binomial(max_units_per_run, med_tech_drop_chance) items, so drops after n runs
+are the n-fold convolution of that per-run distribution, and reaching the
+target within n runs means collecting at least the needed drops by then.
+
+For each confidence level the distribution keeps a table of the most drops
+reached by run n with that probability. The table is nondecreasing in n, so
+the runs needed for any target is a binary search. The first EXACT_RUNS rows
+come from the convolution itself; later rows, where the distribution is very
+close to normal, use a skew-corrected normal quantile. Rows are added lazily
+and the whole table is cached until config.SCAVENGING changes.
+"""
+
+import bisect
+import math
+from statistics import NormalDist
+
+import config
+from scav_targets import DEFAULT_PERCENTILES, drops_needed
+from utils import calculate_scav_time_for_runs
+
+EXACT_RUNS = 64
+TAIL_PROBABILITY = 1e-16
+
+class RunsDistribution:
+    """Cached quantile tables of runs needed to reach a number of drops"""
+
+    def __init__(self, units_per_run, drop_chance, percentiles=DEFAULT_PERCENTILES, exact_runs=EXACT_RUNS):
+        if not 0 < drop_chance <= 1:
+            raise ValueError(f"med_tech_drop_chance must be above 0 and at most 1, got: {drop_chance}")
+        self.units_per_run = units_per_run
+        self.drop_chance = drop_chance
+        self.percentiles = tuple(percentiles)
+        self.exact_runs = exact_runs
+        self._z = {percentile: NormalDist().inv_cdf(1 - percentile / 100) for percentile in self.percentiles}
+
+        # tables[percentile][n - 1]: most drops reached by run n with that probability
+        self.tables = {percentile: [] for percentile in self.percentiles}
+        # survival[n - 1]: (offset, [P(drops >= offset + i) for each i]) for exact rows
+        self.survival = []
+        self._build_exact()
+
+    def _build_exact(self):
+        """Convolve the per-run drop distribution for the first exact_runs runs"""
+        units, chance = self.units_per_run, self.drop_chance
+        run_pmf = [math.comb(units, drops) * chance ** drops * (1 - chance) ** (units - drops)
+                   for drops in range(units + 1)]
+
+        pmf, offset = [1.0], 0
+        for _ in range(self.exact_runs):
+            convolved = [0.0] * (len(pmf) + units)
+            for i, a in enumerate(pmf):
+                for j, b in enumerate(run_pmf):
+                    convolved[i + j] += a * b
+
+            # Trim negligible tails so the support grows with sqrt(n), not n
+            start, end = 0, len(convolved)
+            while convolved[start] < TAIL_PROBABILITY:
+                start += 1
+            while convolved[end - 1] < TAIL_PROBABILITY:
+                end -= 1
+            pmf, offset = convolved[start:end], offset + start
+
+            survival = [0.0] * len(pmf)
+            total = 0.0
+            for i in range(len(pmf) - 1, -1, -1):
+                total += pmf[i]
+                survival[i] = total
+            self.survival.append((offset, survival))
+
+            for percentile, table in self.tables.items():
+                level = percentile / 100
+                index = len(survival) - 1
+                while index > 0 and survival[index] < level:
+                    index -= 1
+                table.append(offset + index)
+
+    def _approximate_drops(self, runs, percentile):
+        """Skew-corrected normal quantile of drops reached by a given run"""
+        trials = runs * self.units_per_run
+        if self.drop_chance == 1:
+            return trials  # Every unit drops
+        mean = trials * self.drop_chance
+        sd = math.sqrt(trials * self.drop_chance * (1 - self.drop_chance))
+        skew = (1 - 2 * self.drop_chance) / sd
+        z = self._z[percentile]
+        z += (z * z - 1) * skew / 6
+        return math.floor(mean + 0.5 + z * sd)
+
+    def runs_for_drops(self, drops, percentile):
+        """Fewest runs that collect `drops` drops with the given probability (percent)"""
+        if drops <= 0:
+            return 0
+        table = self.tables[percentile]
+        while table[-1] < drops:
+            table.append(max(table[-1], self._approximate_drops(len(table) + 1, percentile)))
+        return bisect.bisect_left(table, drops) + 1
+
+    def probability_within(self, drops, runs):
+        """Probability of collecting `drops` drops within `runs` runs"""
+        if drops <= 0:
+            return 1.0
+        if runs <= 0:
+            return 0.0
+        if runs <= len(self.survival):
+            offset, survival = self.survival[runs - 1]
+            index = drops - offset
+            if index < 0:
+                return 1.0
+            return survival[index] if index < len(survival) else 0.0
+
+        trials = runs * self.units_per_run
+        if self.drop_chance == 1:
+            return 1.0 if trials >= drops else 0.0
+        mean = trials * self.drop_chance
+        sd = math.sqrt(trials * self.drop_chance * (1 - self.drop_chance))
+        return 1 - NormalDist(mean, sd).cdf(drops - 0.5)
+
+_distribution = None
+_distribution_key = None
+
+def get_runs_distribution():
+    """Return the distribution for config.SCAVENGING, rebuilding it if the config changed"""
+    global _distribution, _distribution_key
+    key = (config.SCAVENGING['max_units_per_run'], config.SCAVENGING['med_tech_drop_chance'])
+    if key != _distribution_key:
+        _distribution = RunsDistribution(*key)
+        _distribution_key = key
+    return _distribution
+
+def calculate_scav_time_bands(med_tech_needed):
+    """Calculate scavenging time confidence bands for a med tech amount
+
+    Returns dict keyed 'p50', 'p90', ... with the run count and the same
+    hours/days fields as utils.calculate_scav_time
+    """
+    distribution = get_runs_distribution()
+    drops = drops_needed(med_tech_needed)
+    return {f"p{percentile:g}": calculate_scav_time_for_runs(distribution.runs_for_drops(drops, percentile))
+            for percentile in distribution.percentiles}
+
+def probability_of_finishing(med_tech_needed, runs):
+    """Probability of collecting med_tech_needed within the given number of runs"""
+    return get_runs_distribution().probability_within(drops_needed(med_tech_needed), runs)
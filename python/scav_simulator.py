@@ -0,0 +1,143 @@
+"""
+Monte Carlo scavenging simulator for ASU Calculator
+
+Simulates how many scavenging runs it takes to collect a med tech target,
+drawing each run's drops as Binomial(max_units_per_run, med_tech_drop_chance)
+from config.SCAVENGING, and reports percentile completion times.
+
+Runs are drawn in blocks: while a trial is still more than one run's worth of
+drops from the target, the next block of runs cannot reach it, so the whole
+block is drawn as a single binomial. Trials are split into fixed-size chunks
+with their own seeds and spread over a ProcessPoolExecutor, so results for a
+given seed do not depend on the number of workers.
+
+NumPy is optional; without it chunks are simulated with the random module.
+"""
+
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from config import SCAVENGING
+from scav_targets import DEFAULT_PERCENTILES, drops_needed
+from utils import calculate_scav_time_for_runs
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+    HAS_NUMPY = False
+
+CHUNK_TRIALS = 50000
+
+def _block_runs(deficit, units_per_run):
+    """Runs that can be drawn at once without possibly reaching the target"""
+    return max(1, -(-deficit // units_per_run) - 1)
+
+def _simulate_chunk_numpy(target_drops, trials, units_per_run, drop_chance, seed):
+    """Simulate runs-to-target for one chunk of trials with NumPy"""
+    rng = np.random.default_rng(seed)
+    runs = np.zeros(trials, dtype=np.int64)
+    deficit = np.full(trials, target_drops, dtype=np.int64)
+    active = np.flatnonzero(deficit > 0)
+
+    while active.size:
+        block = np.maximum(1, -(-deficit[active] // units_per_run) - 1)
+        runs[active] += block
+        deficit[active] -= rng.binomial(block * units_per_run, drop_chance)
+        active = active[deficit[active] > 0]
+
+    return runs
+
+def _binomial(rng, trials, chance):
+    """Binomial draw using the random module"""
+    binomialvariate = getattr(rng, 'binomialvariate', None)  # Python 3.12+
+    if binomialvariate is not None:
+        return binomialvariate(trials, chance)
+    return sum(1 for _ in range(trials) if rng.random() < chance)
+
+def _simulate_chunk_python(target_drops, trials, units_per_run, drop_chance, seed):
+    """Simulate runs-to-target for one chunk of trials with the random module"""
+    rng = random.Random(seed)
+    results = []
+
+    for _ in range(trials):
+        runs = 0
+        deficit = target_drops
+        while deficit > 0:
+            block = _block_runs(deficit, units_per_run)
+            runs += block
+            deficit -= _binomial(rng, block * units_per_run, drop_chance)
+        results.append(runs)
+
+    return results
+
+def _simulate_chunk(args):
+    """Worker entry point: simulate one chunk and return its run counts"""
+    target_drops, trials, units_per_run, drop_chance, seed, use_numpy = args
+    if use_numpy:
+        return _simulate_chunk_numpy(target_drops, trials, units_per_run, drop_chance, seed)
+    return _simulate_chunk_python(target_drops, trials, units_per_run, drop_chance, seed)
+
+def _chunk_seeds(seed, chunks):
+    """Independent, reproducible seeds for each chunk"""
+    if HAS_NUMPY:
+        return np.random.SeedSequence(seed).spawn(chunks)
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(chunks)]
+
+def _percentile(sorted_values, percentile):
+    """Nearest-rank percentile of an already sorted sequence"""
+    index = max(0, math.ceil(percentile / 100 * len(sorted_values)) - 1)
+    return int(sorted_values[index])
+
+def simulate_runs_to_target(med_tech_target, trials=100000, seed=None, workers=None):
+    """Simulate the number of scav runs needed to collect med_tech_target
+
+    Returns a flat list (or NumPy array) of run counts, one per trial. Trials
+    are simulated in chunks, in parallel when workers is more than 1 (default:
+    one per CPU).
+    """
+    target_drops = drops_needed(med_tech_target)
+    units_per_run = SCAVENGING['max_units_per_run']
+    drop_chance = SCAVENGING['med_tech_drop_chance']
+
+    chunk_sizes = [CHUNK_TRIALS] * (trials // CHUNK_TRIALS)
+    if trials % CHUNK_TRIALS:
+        chunk_sizes.append(trials % CHUNK_TRIALS)
+    seeds = _chunk_seeds(seed, len(chunk_sizes))
+    tasks = [(target_drops, size, units_per_run, drop_chance, chunk_seed, HAS_NUMPY)
+             for size, chunk_seed in zip(chunk_sizes, seeds)]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_simulate_chunk, tasks))
+    else:
+        chunks = [_simulate_chunk(task) for task in tasks]
+
+    if HAS_NUMPY:
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+    return [runs for chunk in chunks for runs in chunk]
+
+def calculate_scav_time_percentiles(med_tech_target, percentiles=DEFAULT_PERCENTILES,
+                                    trials=100000, seed=None, workers=None):
+    """Calculate percentile scavenging times for a med tech target by simulation
+
+    Returns dict keyed 'p50', 'p90', ... with the run count and the same
+    hours/days fields as utils.calculate_scav_time
+    """
+    runs = simulate_runs_to_target(med_tech_target, trials, seed, workers)
+    runs = np.sort(runs) if HAS_NUMPY else sorted(runs)
+
+    table = {}
+    for percentile in percentiles:
+        runs_needed = _percentile(runs, percentile) if len(runs) else 0
+        table[f"p{percentile:g}"] = calculate_scav_time_for_runs(runs_needed)
+
+    return table
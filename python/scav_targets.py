@@ -0,0 +1,20 @@
+"""
+Scavenging targets for ASU Calculator
+
+Turns a med tech target into the number of drops the simulator
+(scav_simulator.py) and the runs distribution (scav_distribution.py) work
+with. Kept free of NumPy and process pools so the calculator can import it
+cheaply.
+"""
+
+import math
+
+from config import SCAVENGING
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+def drops_needed(med_tech_target, med_tech_per_drop=None):
+    """Number of med tech drops needed to collect at least med_tech_target"""
+    if med_tech_per_drop is None:
+        med_tech_per_drop = SCAVENGING['med_tech_per_drop']
+    return max(0, math.ceil(med_tech_target / med_tech_per_drop))
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+ASU Calculator HTTP service
+
+Small asyncio HTTP/1.1 server that keeps config and the calculation caches
+warm and serves calculate_results_data() for posted inventories, so callers
+such as a Discord bot do not pay Python startup per request.
+
+Endpoints:
+    POST /calculate  inventory JSON object (or list of them) -> results JSON
+    GET  /metrics    request counts and latency percentiles per endpoint, plus
+                     stage timings and call counts when run with --timings
+    GET  /health     liveness check
+
+Connections are kept alive between requests. Concurrent requests for the same
+inventory are coalesced into a single calculation, and the time-independent
+part of the results is kept in an LRU cache so unchanged inventories are not
+recomputed.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from asu_calculator import ASUCalculator, json_default
+import instrumentation
+from chain_plan import get_chain_plan
+from result_cache import DEFAULT_MAXSIZE, ResultsCache
+from scav_distribution import get_runs_distribution
+from utils import calculate_total_requirements, validate_inventory_data
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+MAX_BODY_BYTES = 1 << 20
+LATENCY_SAMPLES = 10000
+KEEP_ALIVE_TIMEOUT = 30
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error"
+}
+
+class HTTPError(Exception):
+    """Error returned to the client with an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def inventory_key(inventory):
+    """Canonical key for an inventory, ignoring when it was last updated"""
+    return json.dumps({field: value for field, value in inventory.items() if field != 'last_updated'},
+                      sort_keys=True, default=str)
+
+def calculate_results(inventory, cache=None):
+    """Validate one inventory and calculate its results"""
+    inventory = instrumentation.time_stage('validate', validate_inventory_data, dict(inventory))
+    return ASUCalculator(inventory, verbose=False).calculate_results_data(calculate_total_requirements(), cache)
+
+class LatencyRecorder:
+    """Request counts and recent latencies per endpoint"""
+
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self.samples = samples
+        self.latencies = {}
+        self.counts = {}
+
+    def record(self, endpoint, seconds):
+        if endpoint not in self.latencies:
+            self.latencies[endpoint] = deque(maxlen=self.samples)
+            self.counts[endpoint] = 0
+        self.latencies[endpoint].append(seconds)
+        self.counts[endpoint] += 1
+
+    def snapshot(self):
+        """Counts and p50/p90/p99 latency in milliseconds over recent samples"""
+        metrics = {}
+        for endpoint, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            metrics[endpoint] = {'count': self.counts[endpoint]}
+            for percentile in (50, 90, 99):
+                index = max(0, math.ceil(percentile / 100 * len(ordered)) - 1)
+                metrics[endpoint][f"p{percentile}_ms"] = ordered[index] * 1000
+        return metrics
+
+class CalculatorServer:
+    """Asyncio HTTP server for the calculator"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=4, cache_size=DEFAULT_MAXSIZE, cache_ttl=None):
+        self.host = host
+        self.port = port
+        self.cache = ResultsCache(cache_size, cache_ttl)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.in_flight = {}
+        self.coalesced = 0
+        self.latency = LatencyRecorder()
+        self.server = None
+
+    async def start(self):
+        """Warm the calculation caches and start listening"""
+        get_chain_plan()
+        get_runs_distribution()
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def calculate(self, inventory):
+        """Calculate results, sharing one calculation between identical concurrent requests"""
+        key = inventory_key(inventory)
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, calculate_results, inventory, self.cache)
+        self.in_flight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self.in_flight.pop(key, None)
+
+    async def route(self, method, path, body):
+        """Dispatch a request and return (status, payload)"""
+        if path == '/calculate':
+            if method != 'POST':
+                raise HTTPError(405, "Use POST")
+            try:
+                data = json.loads(body or b'null')
+            except ValueError:
+                raise HTTPError(400, "Body must be JSON")
+            if isinstance(data, dict):
+                return 200, await self.calculate(data)
+            if isinstance(data, list) and all(isinstance(item, dict) for item in data):
+                return 200, list(await asyncio.gather(*(self.calculate(item) for item in data)))
+            raise HTTPError(400, "Body must be an inventory object or a list of them")
+
+        if path == '/metrics':
+            metrics = {
+                'endpoints': self.latency.snapshot(),
+                'in_flight': len(self.in_flight),
+                'coalesced': self.coalesced,
+                'cache': self.cache.stats()
+            }
+            if instrumentation.enabled():
+                metrics['instrumentation'] = instrumentation.export_json()
+            return 200, metrics
+
+        if path == '/health':
+            return 200, {'status': 'ok'}
+
+        raise HTTPError(404, f"No route for {path}")
+
+    async def read_line(self, reader):
+        """Read one line of the request head, which must fit in the reader's buffer limit"""
+        try:
+            return await reader.readline()
+        except ValueError:
+            # asyncio.LimitOverrunError, re-raised by readline() as ValueError
+            raise HTTPError(431, "Request line or header too long")
+
+    async def read_request(self, reader):
+        """Read one request; returns (method, path, version, headers, body) or None at EOF"""
+        request_line = await self.read_line(reader)
+        if not request_line:
+            return None
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await self.read_line(reader)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0) or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target.split('?', 1)[0], version, headers, body
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client closes it"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self.read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except HTTPError as e:
+                    await self.write_response(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, path, version, headers, body = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+                start = time.perf_counter()
+                try:
+                    status, payload = await self.route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+                await self.write_response(writer, status, payload, keep_alive)
+                self.latency.record(path if status != 404 else 'not_found', time.perf_counter() - start)
+
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def write_response(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, separators=(',', ':'), default=json_default).encode()
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=4, cache_size=DEFAULT_MAXSIZE, cache_ttl=None):
+    """Run the server until cancelled"""
+    server = CalculatorServer(host, port, workers, cache_size, cache_ttl)
+    await server.start()
+    print(f"🎯 ASU Calculator service listening on http://{server.host}:{server.port}")
+    async with server.server:
+        await server.server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the ASU calculator over HTTP")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"address to bind (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port to bind (default: {DEFAULT_PORT})")
+    parser.add_argument('--workers', type=int, default=4, help="calculation threads (default: 4)")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAXSIZE,
+                        help=f"cached inventories, 0 to disable (default: {DEFAULT_MAXSIZE})")
+    parser.add_argument('--cache-ttl', type=float, default=None, help="seconds before a cached result expires")
+    parser.add_argument('--timings', action='store_true',
+                        help="record stage timings and utils call counts and report them in /metrics")
+    args = parser.parse_args(argv)
+    if args.timings:
+        instrumentation.enable()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.cache_size, args.cache_ttl))
+    except KeyboardInterrupt:
+        print("\n👋 Goodbye!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Append-only inventory snapshot log for ASU Calculator
+
+Every saved inventory is appended to a JSON Lines file as one compact record
+with its timestamp and tech scrap equivalent. Records are only ever appended,
+in time order, so the log can be streamed lazily, e.g. to rebuild the
+collection rate estimator, without loading the whole history into memory.
+
+Each store has its own log next to it, named after the store file, so two
+JSON stores in one directory never share a history. The default store
+(asu_inventory.json) keeps its original SNAPSHOT_LOG_FILE. A multi-player
+store, such as a SQLite database, gets one log per player, named after the
+database and the player.
+"""
+
+import json
+import os
+from datetime import datetime
+from urllib.parse import quote
+
+from storage import INVENTORY_FIELDS, INVENTORY_FILE, parse_time_bound
+from utils import calculate_tech_scrap_equivalent_from_inventory
+
+SNAPSHOT_LOG_FILE = "asu_snapshots.jsonl"
+
+def snapshot_log_path(store):
+    """Path of the snapshot log for a store and, if it has one, the store's player"""
+    base = os.path.splitext(store.path)[0]
+    player = getattr(store, 'player', None)
+    if player is not None:
+        return f"{base}_{quote(player, safe='')}_snapshots.jsonl"
+    if os.path.basename(store.path) == INVENTORY_FILE:
+        return os.path.join(os.path.dirname(store.path), SNAPSHOT_LOG_FILE)
+    return f"{base}_snapshots.jsonl"
+
+class SnapshotLog:
+    """JSON Lines log of inventory snapshots"""
+
+    def __init__(self, path=SNAPSHOT_LOG_FILE):
+        self.path = path
+
+    def append(self, inventory, recorded_at=None):
+        """Append one snapshot record for the inventory and return the record"""
+        if recorded_at is None:
+            recorded_at = inventory.get('last_updated') or datetime.now().isoformat()
+        record = {
+            'recorded_at': recorded_at.isoformat() if isinstance(recorded_at, datetime) else recorded_at,
+            'tech_scrap_equivalent': calculate_tech_scrap_equivalent_from_inventory(inventory)
+        }
+        for field in INVENTORY_FIELDS:
+            if inventory.get(field):
+                record[field] = inventory[field]
+
+        line = json.dumps(record, separators=(',', ':')) + "\n"
+        with open(self.path, 'a') as f:
+            f.write(line)
+        return record
+
+    def __iter__(self):
+        return self.iter_snapshots()
+
+    def iter_snapshots(self, since=None, until=None):
+        """Yield snapshot records in time order, optionally within [since, until]
+
+        Records carry a parsed 'recorded_at' datetime. Lines that cannot be
+        parsed (e.g. a write cut short by a crash) are skipped.
+        """
+        since, until = parse_time_bound(since), parse_time_bound(until, end_of_day=True)
+        try:
+            f = open(self.path, 'r')
+        except FileNotFoundError:
+            return
+
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    record['recorded_at'] = datetime.fromisoformat(record['recorded_at'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if since is not None and record['recorded_at'] < since:
+                    continue
+                if until is not None and record['recorded_at'] > until:
+                    break
+                yield record
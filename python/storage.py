@@ -0,0 +1,315 @@
+"""
+Inventory storage backends for ASU Calculator
+
+JsonInventoryStore keeps a single inventory in a JSON file (the original
+asu_inventory.json format). SqliteInventoryStore keeps one row per inventory
+snapshot for any number of players, so every save adds to the history instead
+of replacing it. Both expose load() and save(inventory); open_store() picks
+one from the file extension.
+
+JSON saves are crash-safe: the new file is written to a temp file, fsynced
+and swapped in with os.replace(), under an advisory lock so concurrent
+writers (e.g. a cron job and a bot) take turns, and the previous versions
+are kept as rotating backups.
+
+save() only locks the write itself. A caller that loads, changes and saves
+an inventory should hold file_lock(store.path) from before the load until
+after the save, or a concurrent update made in between is lost. The lock is
+re-entrant within a thread, so save() can run inside it. The `update`
+command does this; the interactive session does not, since it holds the
+inventory while waiting for input.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+INVENTORY_FILE = "asu_inventory.json"
+DEFAULT_PLAYER = "default"
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+BACKUP_GENERATIONS = 3
+
+INVENTORY_FIELDS = [
+    'tech_scraps', 'tech_scrap_clusters', 'med_tech', 'med_tech_clusters',
+    'bitcoin', 'old_pouches', 'fanny_packs', 'explorer_backpacks',
+    'employee_office_cases', 'asus'
+]
+
+_held_locks = threading.local()
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive advisory lock on path + '.lock' (blocks until acquired)
+
+    Re-entrant: a thread already holding the lock on path just continues.
+    """
+    held = getattr(_held_locks, 'paths', None)
+    if held is None:
+        held = _held_locks.paths = set()
+    if path in held:
+        yield
+        return
+    with open(f"{path}.lock", 'a+') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:  # pragma: no cover - Windows
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        held.add(path)
+        try:
+            yield
+        finally:
+            held.discard(path)
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:  # pragma: no cover - Windows
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _fsync_directory(directory):
+    """Persist a rename in directory (no-op where directories cannot be opened)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def atomic_write_json(path, data, indent=None):
+    """Write data as JSON so that path always holds either the old or the new file"""
+    directory = os.path.dirname(path) or '.'
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _fsync_directory(directory)
+
+def backup_paths(path, generations=BACKUP_GENERATIONS):
+    """Backup file names, newest first: path.backup, path.backup.1, ..."""
+    return [f"{path}.backup"] + [f"{path}.backup.{n}" for n in range(1, generations)]
+
+def rotate_backups(path, generations=BACKUP_GENERATIONS):
+    """Shift existing backups one generation older and back up the current file
+
+    The current file stays in place; the newest backup is a hard link to it
+    (or a copy where links are not supported).
+    """
+    if generations <= 0 or not os.path.exists(path):
+        return
+
+    backups = backup_paths(path, generations)
+    for older, newer in reversed(list(zip(backups[1:], backups[:-1]))):
+        if os.path.exists(newer):
+            os.replace(newer, older)
+
+    temp_path = f"{backups[0]}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    try:
+        os.link(path, temp_path)
+    except OSError:
+        shutil.copy2(path, temp_path)
+    os.replace(temp_path, backups[0])
+
+class JsonInventoryStore:
+    """Single inventory stored as a JSON file with rotating backups"""
+
+    def __init__(self, path=INVENTORY_FILE, backup_generations=BACKUP_GENERATIONS):
+        self.path = path
+        self.backup_generations = backup_generations
+
+    def close(self):
+        """Nothing to release; here so either store can be used in a with block"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def load(self):
+        """Load the inventory, or None if the file does not exist
+
+        Raises json.JSONDecodeError if the file is corrupt.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def save(self, inventory):
+        """Atomically save the inventory, keeping previous versions as backups"""
+        with file_lock(self.path):
+            rotate_backups(self.path, self.backup_generations)
+            atomic_write_json(self.path, dict(inventory), indent=2)
+
+def parse_time_bound(value, end_of_day=False):
+    """A since/until bound as a datetime, from a datetime or an ISO date or datetime string
+
+    A date on its own means the start of that day, or its last microsecond
+    with end_of_day, so an until date covers the whole day.
+    """
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value)
+    return datetime.combine(day, time.max if end_of_day else time.min)
+
+class SqliteInventoryStore:
+    """Inventory snapshots for many players in a SQLite database
+
+    Each save inserts a snapshot row; load() returns the latest one for the
+    store's player. The database runs in WAL mode so readers are not blocked
+    by a writer.
+    """
+
+    def __init__(self, path, player=DEFAULT_PLAYER):
+        self.path = path
+        self.player = player
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        """Create the snapshot table and its indexes if they do not exist"""
+        columns = ", ".join(f"{field} NUMERIC NOT NULL DEFAULT 0" for field in INVENTORY_FIELDS)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "id INTEGER PRIMARY KEY, "
+                "player TEXT NOT NULL, "
+                "recorded_at TEXT NOT NULL, "
+                f"{columns}, "
+                "start_date TEXT)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_snapshots_player_time ON snapshots (player, recorded_at)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_snapshots_time ON snapshots (recorded_at)"
+            )
+
+    def close(self):
+        """Close the database connection"""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _row_values(player, inventory):
+        """Column values for one snapshot, in insert order"""
+        recorded_at = inventory.get('last_updated') or datetime.now().isoformat()
+        return ([player, recorded_at] +
+                [inventory.get(field, 0) for field in INVENTORY_FIELDS] +
+                [inventory.get('start_date')])
+
+    @staticmethod
+    def _row_to_inventory(row):
+        """Convert a snapshot row back into an inventory dict"""
+        inventory = {field: row[field] for field in INVENTORY_FIELDS}
+        inventory['start_date'] = row['start_date']
+        inventory['last_updated'] = row['recorded_at']
+        return inventory
+
+    def _insert_sql(self):
+        columns = ['player', 'recorded_at'] + INVENTORY_FIELDS + ['start_date']
+        placeholders = ", ".join("?" for _ in columns)
+        return f"INSERT INTO snapshots ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def load(self):
+        """Load the latest snapshot for this store's player, or None if there is none"""
+        row = self.connection.execute(
+            "SELECT * FROM snapshots WHERE player = ? ORDER BY recorded_at DESC, id DESC LIMIT 1",
+            (self.player,)
+        ).fetchone()
+        return self._row_to_inventory(row) if row else None
+
+    def save(self, inventory):
+        """Append a snapshot of the inventory for this store's player"""
+        with self.connection:
+            self.connection.execute(self._insert_sql(), self._row_values(self.player, inventory))
+
+    def bulk_insert(self, snapshots):
+        """Insert many (player, inventory) snapshots in a single transaction
+
+        Returns the number of snapshots inserted.
+        """
+        with self.connection:
+            cursor = self.connection.executemany(
+                self._insert_sql(),
+                (self._row_values(player, inventory) for player, inventory in snapshots)
+            )
+        return cursor.rowcount
+
+    def history(self, since=None, until=None, player=None):
+        """Yield this player's snapshots in time order, optionally within [since, until]
+
+        since and until are ISO format strings or datetimes; an until date
+        includes the whole day (see parse_time_bound()).
+        """
+        query = "SELECT * FROM snapshots WHERE player = ?"
+        params = [player or self.player]
+        if since is not None:
+            query += " AND recorded_at >= ?"
+            params.append(parse_time_bound(since).isoformat())
+        if until is not None:
+            query += " AND recorded_at <= ?"
+            params.append(parse_time_bound(until, end_of_day=True).isoformat())
+        query += " ORDER BY recorded_at, id"
+
+        for row in self.connection.execute(query, params):
+            yield self._row_to_inventory(row)
+
+    def latest(self):
+        """Latest snapshot of every player, as {player: inventory}"""
+        rows = self.connection.execute(
+            "SELECT * FROM snapshots AS s WHERE id = ("
+            "SELECT id FROM snapshots WHERE player = s.player ORDER BY recorded_at DESC, id DESC LIMIT 1) "
+            "ORDER BY player"
+        )
+        return {row['player']: self._row_to_inventory(row) for row in rows}
+
+    def players(self):
+        """List every player with at least one snapshot"""
+        rows = self.connection.execute("SELECT DISTINCT player FROM snapshots ORDER BY player")
+        return [row['player'] for row in rows]
+
+def open_store(path=INVENTORY_FILE, player=DEFAULT_PLAYER):
+    """Open a SQLite store for .db/.sqlite paths, otherwise a JSON file store"""
+    if path.lower().endswith(SQLITE_EXTENSIONS):
+        return SqliteInventoryStore(path, player)
+    return JsonInventoryStore(path)
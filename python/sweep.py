@@ -0,0 +1,186 @@
+"""
+Config parameter sweeps for ASU Calculator
+
+Evaluates a grid of config overrides, e.g. a patched med tech drop chance
+or crafting cost, against a population of inventories. For every cell it
+reports how each player's key numbers shift compared with the current
+config.
+
+Each grid cell gets its own ConfigSet: deep copies of the config dicts with
+its overrides applied, and its own ChainPlan. The metrics come from the
+calculators in utils.py, run against the cell's ConfigSet. The config module
+is never modified, so cells can run side by side in a process pool. The
+population is sent to each worker once, when the pool starts, not once per
+cell.
+
+Completion days keep each player's observed pace in scav runs per day,
+measured under the current config as in calculate_collection_rate(). A
+patch that changes drop rates or costs then moves the date the way it would
+for a player who keeps playing the same way.
+"""
+
+import copy
+import itertools
+from datetime import datetime
+from statistics import mean, median
+
+import config
+from chain_plan import ChainPlan
+from guild_planner import named_inventories
+from utils import (calculate_bag_crafter_cost, calculate_craftable_bags_from_resources,
+                   calculate_expected_med_tech_per_run, calculate_med_tech_total,
+                   calculate_remaining_bags_to_craft, calculate_scav_time,
+                   calculate_tech_scrap_equivalent_from_inventory, validate_inventory_data)
+
+CONFIG_NAMES = ('CRAFTING_CHAIN', 'CONVERSIONS', 'SCAVENGING', 'BAG_CRAFTER', 'SYN_RATE')
+METRICS = ('remaining_tech_scraps', 'scav_med_tech', 'scav_hours', 'crafting_hours', 'crafting_hours_syn',
+           'crafting_btc', 'dora_mtc_cost', 'completion_days')
+
+class ConfigSet:
+    """Private copy of the calculation config with dotted-path overrides applied
+
+    Overrides map paths like 'SCAVENGING.med_tech_drop_chance', 'SYN_RATE' or
+    'CRAFTING_CHAIN.fanny_pack.bitcoin' to values. A path must name an
+    existing setting.
+    """
+
+    def __init__(self, overrides=None):
+        self.overrides = dict(overrides or {})
+        self.values = {name: copy.deepcopy(getattr(config, name)) for name in CONFIG_NAMES}
+        for path, value in self.overrides.items():
+            self._set(path, value)
+        self.plan = ChainPlan(self.values['CRAFTING_CHAIN'])
+
+    def _set(self, path, value):
+        name, *keys = path.split('.')
+        if name not in self.values:
+            raise ValueError(f"Unknown config setting: {path}")
+        if not keys:
+            self.values[name] = value
+            return
+        target = self.values[name]
+        for key in keys[:-1]:
+            if not isinstance(target, dict) or key not in target:
+                raise ValueError(f"Unknown config setting: {path}")
+            target = target[key]
+        if not isinstance(target, dict) or keys[-1] not in target:
+            raise ValueError(f"Unknown config setting: {path}")
+        target[keys[-1]] = value
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+def parse_grid(settings):
+    """{path: [values]} from 'PATH=V1,V2,...' strings, values parsed as numbers"""
+    grid = {}
+    for setting in settings:
+        path, separator, values = setting.partition('=')
+        if not separator or not values:
+            raise ValueError(f"Expected PATH=VALUE[,VALUE...], got: {setting}")
+        grid[path.strip()] = [float(value) if any(c in value for c in '.eE') else int(value)
+                              for value in values.split(',')]
+    return grid
+
+def grid_cells(grid):
+    """Every combination of the grid values, as override dicts"""
+    paths = list(grid)
+    return [dict(zip(paths, values)) for values in itertools.product(*(grid[path] for path in paths))]
+
+def _runs_per_day(inventory, as_of, current):
+    """Observed scav runs per day under the current ConfigSet, or None without a start date"""
+    if not inventory.get('start_date'):
+        return None
+    days_elapsed = (as_of - datetime.fromisoformat(inventory['start_date'])).total_seconds() / 86400
+    if days_elapsed <= 0:
+        return None
+    daily_rate = calculate_tech_scrap_equivalent_from_inventory(inventory, current) / days_elapsed
+    return daily_rate / (calculate_expected_med_tech_per_run(current) * current['CONVERSIONS']['recycle_ratio'])
+
+def evaluate(inventory, config_set, runs_per_day=None):
+    """The METRICS for one validated inventory under a ConfigSet, as a tuple in METRICS order
+
+    Each metric is worked out as in ASUCalculator.calculate_results_data().
+    """
+    plan = config_set.plan
+    conversions = config_set['CONVERSIONS']
+    remaining = max(0, plan.tech_scraps_per_asu -
+                    calculate_tech_scrap_equivalent_from_inventory(inventory, config_set))
+    scav_med_tech = max(0, remaining / conversions['recycle_ratio'] -
+                        calculate_med_tech_total(inventory, config_set))
+    scav_hours = calculate_scav_time(scav_med_tech, config_set)['hours_no_syn']
+
+    remaining_bags = calculate_remaining_bags_to_craft(inventory, config_set=config_set)
+    crafting_hours = plan.crafting_minutes(remaining_bags) / 60
+    craftable = calculate_craftable_bags_from_resources(inventory, config_set)
+    doras_to_buy = max(0, remaining_bags[plan.dora_field] - craftable['total_craftable_doras'])
+    completion_days = None
+    if runs_per_day:
+        completion_days = remaining / (runs_per_day * calculate_expected_med_tech_per_run(config_set) *
+                                       conversions['recycle_ratio'])
+    return (remaining, scav_med_tech, scav_hours, crafting_hours, crafting_hours * config_set['SYN_RATE'],
+            plan.crafting_bitcoin(remaining_bags), calculate_bag_crafter_cost(doras_to_buy, config_set),
+            completion_days)
+
+_POPULATION = None
+
+def _init_worker(population):
+    global _POPULATION
+    _POPULATION = population
+
+def _evaluate_cell(overrides):
+    """Metrics for every member of the worker's population under one cell"""
+    config_set = ConfigSet(overrides)
+    return [evaluate(inventory, config_set, runs_per_day) for _, inventory, runs_per_day in _POPULATION]
+
+def run_sweep(inventories, grid, as_of=None, workers=1, summary=False):
+    """Evaluate every cell of grid against the inventories; returns a tidy list of rows
+
+    grid is {config path: [values]}. inventories is a {name: inventory} dict
+    or a list. Each row has the cell number and override values, the player,
+    a metric, its value under the current config, its value in the cell, and
+    the delta. With summary, rows are one per cell and metric instead, with
+    the mean, median, min and max delta over players.
+    """
+    if as_of is None:
+        as_of = datetime.now()
+    cells = grid_cells(grid)
+    for overrides in cells:
+        ConfigSet(overrides)  # Reject bad paths before starting workers
+
+    current = ConfigSet()
+    population = []
+    for name, inventory in named_inventories(inventories):
+        inventory = validate_inventory_data(dict(inventory))
+        population.append((name, inventory, _runs_per_day(inventory, as_of, current)))
+    baseline = [evaluate(inventory, current, runs_per_day) for _, inventory, runs_per_day in population]
+
+    if workers <= 1:
+        _init_worker(population)
+        try:
+            results = [_evaluate_cell(overrides) for overrides in cells]
+        finally:
+            _init_worker(None)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(population,)) as executor:
+            results = list(executor.map(_evaluate_cell, cells))
+
+    rows = []
+    for index, (overrides, values) in enumerate(zip(cells, results)):
+        for position, metric in enumerate(METRICS):
+            deltas = []
+            for (name, _, _), before, after in zip(population, baseline, values):
+                delta = None
+                if before[position] is not None and after[position] is not None:
+                    delta = after[position] - before[position]
+                    deltas.append(delta)
+                if not summary:
+                    rows.append(dict(overrides, cell=index, player=name, metric=metric,
+                                     baseline=before[position], value=after[position], delta=delta))
+            if summary:
+                rows.append(dict(overrides, cell=index, metric=metric, players=len(deltas),
+                                 mean_delta=mean(deltas) if deltas else None,
+                                 median_delta=median(deltas) if deltas else None,
+                                 min_delta=min(deltas, default=None), max_delta=max(deltas, default=None)))
+    return rows
@@ -5,17 +5,47 @@ Simple test script for ASU Calculator
 Basic tests to verify core functionality and calculations.
 """
 
+import asyncio
+import contextlib
+import csv
+import io
 import json
 import os
-from datetime import datetime
-from asu_calculator import ASUCalculator
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from asu_calculator import ASUCalculator, calculate_results_batch, stream_results, main as cli_main
 from utils import (
     calculate_total_asu_requirements, 
     format_time_duration, 
     convert_med_tech_to_tech_scraps,
     calculate_bag_crafter_cost
 )
-from config import CRAFTING_CHAIN, CONVERSIONS, BAG_CRAFTER
+import utils
+import vectorized
+import scav_simulator
+from scav_distribution import RunsDistribution, calculate_scav_time_bands, probability_of_finishing
+from chain_plan import get_chain_plan, invalidate_chain_plan
+from crafting_graph import CraftingGraph
+from storage import INVENTORY_FIELDS, JsonInventoryStore, SqliteInventoryStore, open_store, backup_paths
+from snapshot_log import SnapshotLog, snapshot_log_path
+from rate_estimator import CollectionRateEstimator
+from server import CalculatorServer
+from result_cache import ResultsCache
+import benchmark
+from inventory import Inventory, InventoryArray
+from crafting_schedule import plan_crafting_schedule, finish_time
+from pipeline import calculate_pipeline
+import inverse_solver
+import config
+from reactive_results import ReactiveResults
+from sweep import ConfigSet, parse_grid, run_sweep, METRICS
+import instrumentation
+from guild_planner import GuildPlanner, plan_guild, pool_inventories
+from cost_optimizer import optimize_bag_crafter, optimize_bag_crafter_cached, clear_optimizer_cache, evaluate_purchase
+from config import CRAFTING_CHAIN, CONVERSIONS, BAG_CRAFTER, BAG_INVENTORY_FIELDS, SCAVENGING, SYN_RATE
 
 def test_total_requirements():
     """Test total ASU requirements calculation"""
@@ -116,6 +146,1147 @@ def test_config_values():
     
     print("✅ Configuration values passed")
 
+def test_results_batch():
+    """Test batch results match per-inventory results"""
+    print("Testing batch results...")
+    
+    with open("example_inventory.json") as f:
+        example = json.load(f)
+    inventories = [example, {"tech_scraps": 5000, "old_pouches": 75000}, {}]
+    
+    rows = calculate_results_batch(inventories, columnar=False)
+    expected = ASUCalculator(dict(example)).calculate_results_data()
+    assert rows[0]['remaining_bags'] == expected['remaining_bags']
+    assert rows[0]['crafting_totals'] == expected['crafting_totals']
+    assert rows[1]['remaining_bags']['old_pouches'] == 0
+    
+    columns = calculate_results_batch(inventories)
+    assert all(len(column) == len(inventories) for column in columns.values())
+    assert columns['remaining_bags.asus'] == [1, 1, 1]
+    assert columns['collection_rate'][1] is None
+    
+    # Columns built with NumPy match the row-by-row fallback, bad values and dates included
+    as_of = datetime(2025, 6, 1)
+    inventories += [{"tech_scraps": 7500000, "asus": 2, "start_date": "2025-01-01T00:00:00"},
+                    {"fanny_packs": 50, "bitcoin": 100, "start_date": "2025-01-01"},
+                    {"med_tech": -5, "bitcoin": "lots", "old_pouches": None, "start_date": "garbage"},
+                    {"tech_scraps": 100, "explorer_backpacks": 499, "start_date": "2030-01-01"},
+                    {"tech_scraps": 10, "start_date": "2020-01-01"}]
+    columns = calculate_results_batch(inventories, as_of=as_of)
+    packed = InventoryArray(inventories[:2] + inventories[3:5])
+    packed_columns = calculate_results_batch(packed, as_of=as_of)
+    has_numpy = vectorized.HAS_NUMPY
+    vectorized.HAS_NUMPY = False
+    try:
+        assert columns == calculate_results_batch(inventories, as_of=as_of)
+        assert packed_columns == calculate_results_batch(packed, as_of=as_of)
+    finally:
+        vectorized.HAS_NUMPY = has_numpy
+    assert columns['completion_estimate.completion_date'][-1] is None
+    assert calculate_results_batch([]) == {}
+    
+    print("✅ Batch results passed")
+
+def _check_vectorized_matches_scalar(inventories):
+    """Compare every vectorized calculator with its scalar counterpart"""
+    columns = vectorized.to_columns(inventories)
+    
+    for name in ['calculate_tech_scrap_equivalent_from_inventory', 'calculate_eoc_equivalent_from_inventory']:
+        expected = [getattr(utils, name)(inventory) for inventory in inventories]
+        assert list(getattr(vectorized, name)(columns)) == expected, name
+    
+    for name in ['calculate_remaining_bags_to_craft', 'calculate_craftable_bags_from_resources']:
+        result = getattr(vectorized, name)(columns)
+        for index, inventory in enumerate(inventories):
+            expected = getattr(utils, name)(inventory)
+            assert {key: result[key][index] for key in expected} == expected, name
+    
+    med_tech = [0, -5, 496, 123456.5]
+    result = vectorized.calculate_scav_time(med_tech)
+    for index, amount in enumerate(med_tech):
+        expected = utils.calculate_scav_time(amount)
+        assert {key: result[key][index] for key in expected} == expected
+
+def test_vectorized_calculations():
+    """Test vectorized calculators match the scalar versions"""
+    print("Testing vectorized calculations...")
+    
+    with open("example_inventory.json") as f:
+        example = json.load(f)
+    inventories = [example, {"tech_scraps": 123457, "med_tech": 999, "asus": 1},
+                   {"fanny_packs": 7600, "explorer_backpacks": 3}, {}]
+    
+    _check_vectorized_matches_scalar(inventories)
+    
+    # Pure Python fallback used when NumPy is not installed
+    has_numpy = vectorized.HAS_NUMPY
+    vectorized.HAS_NUMPY = False
+    try:
+        _check_vectorized_matches_scalar(inventories)
+    finally:
+        vectorized.HAS_NUMPY = has_numpy
+    
+    print("✅ Vectorized calculations passed")
+
+def test_chain_plan():
+    """Test the compiled chain plan and its invalidation on config changes"""
+    print("Testing chain plan...")
+    
+    plan = get_chain_plan()
+    assert plan.bags_per_asu['old_pouches'] == 10 * 15 * 20 * 25
+    assert plan.tech_scraps_per_asu == 7500000
+    assert plan.bitcoin_per_asu == 79250000
+    assert calculate_total_asu_requirements(2)['bitcoin'] == 2 * 79250000
+    assert get_chain_plan() is plan
+    
+    # In-place edits are picked up without invalidating
+    original = CRAFTING_CHAIN['asu']['employee_office_cases']
+    CRAFTING_CHAIN['asu']['employee_office_cases'] = 30
+    try:
+        assert get_chain_plan().bags_per_asu['employee_office_cases'] == 30
+        assert calculate_total_asu_requirements()['tech_scraps'] == 100 * 10 * 15 * 20 * 30
+    finally:
+        CRAFTING_CHAIN['asu']['employee_office_cases'] = original
+    assert get_chain_plan().tech_scraps_per_asu == 7500000
+    
+    original = CRAFTING_CHAIN['fanny_pack']['bitcoin']
+    CRAFTING_CHAIN['fanny_pack']['bitcoin'] = 5
+    try:
+        assert get_chain_plan().tier_bitcoin['fanny_packs'] == 5
+    finally:
+        CRAFTING_CHAIN['fanny_pack']['bitcoin'] = original
+    original = config.BAG_CRAFTER['dora_tier']
+    config.BAG_CRAFTER['dora_tier'] = 'fanny_pack'
+    try:
+        assert get_chain_plan().dora_field == 'fanny_packs'
+    finally:
+        config.BAG_CRAFTER['dora_tier'] = original
+    assert get_chain_plan().dora_field == 'explorer_backpacks'
+    
+    invalidate_chain_plan()
+    assert get_chain_plan() is not plan and get_chain_plan().bitcoin_per_asu == 79250000
+    
+    # Replacing the chain is picked up without invalidating
+    chain = config.CRAFTING_CHAIN
+    config.CRAFTING_CHAIN = dict(chain, asu=dict(chain['asu'], bitcoin=0))
+    try:
+        assert get_chain_plan().bitcoin_per_asu == 79250000 - chain['asu']['bitcoin']
+    finally:
+        config.CRAFTING_CHAIN = chain
+    assert get_chain_plan().bitcoin_per_asu == 79250000
+    
+    print("✅ Chain plan passed")
+
+def test_crafting_graph():
+    """Test the recipe graph with an extra event tier and a cycle"""
+    print("Testing crafting graph...")
+    
+    graph = CraftingGraph(CRAFTING_CHAIN)
+    assert graph.final_tier == 'asu'
+    assert graph.remaining({}) == utils.calculate_remaining_bags_to_craft({})
+    
+    # Event season: a relic crafted from 2 ASUs plus 3 EOCs
+    event_chain = dict(CRAFTING_CHAIN)
+    event_chain['relic'] = {'asus': 2, 'employee_office_cases': 3, 'bitcoin': 1000, 'crafting_time_minutes': 90}
+    event_fields = dict(BAG_INVENTORY_FIELDS, relic='relics')
+    graph = CraftingGraph(event_chain, event_fields)
+    assert graph.tiers[-1] == 'relic'
+    assert graph.bags_per_unit['relic']['employee_office_cases'] == 2 * 25 + 3
+    assert graph.raw_per_unit['relic']['tech_scraps'] == 2 * 7500000 + 3 * 300000
+    
+    remaining = graph.remaining({'asus': 1, 'employee_office_cases': 10})
+    assert remaining['relics'] == 1
+    assert remaining['asus'] == 1
+    assert remaining['employee_office_cases'] == 25 + 3 - 10
+    
+    crafted, available = graph.craftable({'tech_scraps': 2000000, 'employee_office_cases': 53})
+    assert crafted['old_pouches'] == 20000
+    assert crafted['asus'] == 2
+    assert crafted['relics'] == 1
+    
+    cyclic_chain = dict(CRAFTING_CHAIN)
+    cyclic_chain['old_pouch'] = dict(CRAFTING_CHAIN['old_pouch'], asus=1)
+    try:
+        CraftingGraph(cyclic_chain)
+        assert False, "Expected a cycle error"
+    except ValueError:
+        pass
+    
+    # The event tier in the live config: every calculator follows the graph
+    chain, fields = config.CRAFTING_CHAIN, config.BAG_INVENTORY_FIELDS
+    config.CRAFTING_CHAIN, config.BAG_INVENTORY_FIELDS = event_chain, event_fields
+    try:
+        plan = get_chain_plan()
+        assert plan.final_field == 'relics' and plan.eoc_field == 'employee_office_cases'
+        assert plan.fields_above_dora == ['employee_office_cases', 'asus', 'relics']
+        inventory = utils.validate_inventory_data({"tech_scraps": 30000, "explorer_backpacks": 15, "bitcoin": 10 ** 6})
+        assert utils.calculate_total_requirements()['employee_office_cases'] == 2 * 25 + 3
+        assert utils.calculate_eoc_equivalent_from_inventory(inventory) == 15 / 20
+        assert utils.calculate_remaining_bags_to_craft(inventory)['explorer_backpacks'] == 53 * 20 - 15
+        service = ASUCalculator(inventory, verbose=False).calculate_results_data()['bag_crafter_service']
+        after = service['after_buying_doras']
+        assert after['btc_needed'] == (53 * 50000 + 2 * 500000 + 1000 - 10 ** 6 + service['btc_for_clustering'])
+        assert after['crafting_time_hours'] == (53 * 45 + 2 * 60 + 90) / 60
+        
+        config.CRAFTING_CHAIN = dict(event_chain, relic=dict(event_chain['relic']))
+        original = config.PROGRESS_TIER
+        config.PROGRESS_TIER = 'relic'
+        try:
+            get_chain_plan()
+            assert False, "the progress tier must be below the final bag"
+        except ValueError as e:
+            assert 'PROGRESS_TIER' in str(e)
+        finally:
+            config.PROGRESS_TIER = original
+    finally:
+        config.CRAFTING_CHAIN, config.BAG_INVENTORY_FIELDS = chain, fields
+    assert get_chain_plan().final_field == 'asus'
+    
+    print("✅ Crafting graph passed")
+
+def test_scav_simulator():
+    """Test Monte Carlo scav percentiles are reproducible and sensible"""
+    print("Testing scav simulator...")
+    
+    # Small chunks so the worker pool actually splits the trials
+    chunk_trials = scav_simulator.CHUNK_TRIALS
+    scav_simulator.CHUNK_TRIALS = 1000
+    try:
+        table = scav_simulator.calculate_scav_time_percentiles(50000, trials=3000, seed=7, workers=1)
+        assert table == scav_simulator.calculate_scav_time_percentiles(50000, trials=3000, seed=7, workers=2)
+    finally:
+        scav_simulator.CHUNK_TRIALS = chunk_trials
+    assert table['p50']['runs'] <= table['p90']['runs'] <= table['p99']['runs']
+    
+    mean_runs = 50000 / utils.calculate_expected_med_tech_per_run()
+    assert mean_runs - 5 < table['p50']['runs'] < mean_runs + 5
+    assert table['p50']['hours_with_syn'] == table['p50']['runs'] * 3 * 0.2
+    
+    assert scav_simulator.calculate_scav_time_percentiles(0, trials=10, workers=1)['p99']['runs'] == 0
+    
+    print("✅ Scav simulator passed")
+
+def test_scav_distribution():
+    """Test exact runs-to-target bands against the per-run distribution"""
+    print("Testing scav distribution...")
+    
+    # One run drops all 12 units with probability p^12
+    chance = SCAVENGING['med_tech_drop_chance']
+    assert abs(probability_of_finishing(12 * 57, 1) - chance ** 12) < 1e-12
+    assert probability_of_finishing(0, 0) == 1.0
+    
+    bands = calculate_scav_time_bands(50000)
+    assert bands['p50']['runs'] <= bands['p90']['runs'] <= bands['p99']['runs']
+    for name, level in [('p50', 0.5), ('p90', 0.9), ('p99', 0.99)]:
+        runs = bands[name]['runs']
+        assert probability_of_finishing(50000, runs) >= level
+        assert probability_of_finishing(50000, runs - 1) < level
+    
+    # Beyond the exact table the bands follow the mean
+    mean_runs = 6250000 / utils.calculate_expected_med_tech_per_run()
+    assert abs(calculate_scav_time_bands(6250000)['p50']['runs'] - mean_runs) < 2
+    
+    with open("example_inventory.json") as f:
+        results = ASUCalculator(json.load(f)).calculate_results_data()
+    assert results['remaining_gathering']['scav_time']['bands']['p90']['runs'] > 0
+    
+    # Certain drops take exactly drops / units runs, within and beyond the exact table
+    certain = RunsDistribution(12, 1.0)
+    for drops in (12 * 10, 12 * 1000 + 1):
+        assert certain.runs_for_drops(drops, 99) == certain.runs_for_drops(drops, 50) == -(-drops // 12)
+    assert certain.probability_within(12 * 1000, 1000) == 1.0 and certain.probability_within(12 * 1000, 999) == 0.0
+    try:
+        RunsDistribution(12, 0)
+        assert False, "a drop chance of 0 should be rejected"
+    except ValueError as e:
+        assert 'med_tech_drop_chance' in str(e)
+    
+    print("✅ Scav distribution passed")
+
+def test_sqlite_store():
+    """Test SQLite snapshot storage alongside the JSON file"""
+    print("Testing SQLite store...")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "inventory.db")
+        with open_store(path) as store:
+            assert isinstance(store, SqliteInventoryStore)
+        with open_store(os.path.join(tmp, "inventory.json")) as store:
+            assert isinstance(store, JsonInventoryStore)
+        
+        with SqliteInventoryStore(path, player="alice") as store:
+            assert store.load() is None
+            
+            calculator = ASUCalculator(store=store)
+            calculator.inventory["tech_scraps"] = 500
+            calculator.save_inventory()
+            calculator.inventory["tech_scraps"] = 900
+            calculator.save_inventory()
+            
+            inserted = store.bulk_insert(
+                (f"player{i}", {"bitcoin": i, "last_updated": f"2025-01-{i + 1:02d}T00:00:00"})
+                for i in range(20)
+            )
+            assert inserted == 20
+            
+            assert store.load()["tech_scraps"] == 900
+            assert [snapshot["tech_scraps"] for snapshot in store.history()] == [500, 900]
+            assert len(store.players()) == 21
+            assert list(store.history(since="2025-01-05", player="player3")) == []
+            
+            # A date-only until covers that whole day
+            store.bulk_insert(("carol", {"bitcoin": bitcoin, "last_updated": recorded_at}) for bitcoin, recorded_at in
+                              [(1, "2025-02-01T09:00:00"), (2, "2025-02-01T18:30:00.250000"), (3, "2025-02-02T08:00:00")])
+            assert [snapshot["bitcoin"] for snapshot in store.history(until="2025-02-01", player="carol")] == [1, 2]
+            assert [snapshot["bitcoin"] for snapshot in store.history(since="2025-02-01", until="2025-02-01T12:00",
+                                                                      player="carol")] == [1]
+        
+        with SqliteInventoryStore(path, player="player3") as store:
+            assert store.load()["bitcoin"] == 3
+            assert store.load()["start_date"] is None
+    
+    print("✅ SQLite store passed")
+
+def test_snapshot_log():
+    """Test every save appends to the snapshot log, one log per player"""
+    print("Testing snapshot log...")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JsonInventoryStore(os.path.join(tmp, "inventory.json"))
+        calculator = ASUCalculator(store=store)
+        assert calculator.snapshot_log.path == os.path.join(tmp, "inventory_snapshots.jsonl")
+        assert snapshot_log_path(JsonInventoryStore(os.path.join(tmp, "asu_inventory.json"))) == \
+            os.path.join(tmp, "asu_snapshots.jsonl")
+        
+        # JSON stores sharing a directory each get their own log and rates
+        for name, tech_scraps in (("alice", 50000), ("bob", 10), ("alice", 60000)):
+            member = ASUCalculator(store=JsonInventoryStore(os.path.join(tmp, f"{name}.json")), verbose=False)
+            member.inventory["start_date"] = "2025-01-01T00:00:00"
+            member.inventory["tech_scraps"] = tech_scraps
+            member.save_inventory()
+        alice = ASUCalculator(store=JsonInventoryStore(os.path.join(tmp, "alice.json")), verbose=False)
+        bob = ASUCalculator(store=JsonInventoryStore(os.path.join(tmp, "bob.json")), verbose=False)
+        assert [record['tech_scraps'] for record in alice.snapshot_log] == [50000, 60000]
+        assert [record['tech_scraps'] for record in bob.snapshot_log] == [10]
+        assert alice.rate_estimator.last[1] == 60000 and bob.rate_estimator.last[1] == 10
+        
+        log = SnapshotLog(os.path.join(tmp, "history.jsonl"))
+        for day, tech_scraps in enumerate([0, 1000, 3000, 6000, 10000]):
+            log.append({"tech_scraps": tech_scraps}, recorded_at=f"2025-01-{day + 1:02d}T00:00:00")
+        with open(log.path, 'a') as f:
+            f.write('{"recorded_at": "2025-01-')  # Partial write from a crash
+        
+        records = list(log)
+        assert len(records) == 5
+        assert records[2]['tech_scrap_equivalent'] == 3000
+        
+        assert [record['tech_scraps'] for record in log.iter_snapshots(since="2025-01-03")] == [3000, 6000, 10000]
+        
+        calculator.inventory["tech_scraps"] = 100
+        calculator.save_inventory()
+        calculator.save_inventory()
+        assert [record['tech_scraps'] for record in calculator.snapshot_log] == [100, 100]
+        
+        # Players sharing a database each get their own log
+        path = os.path.join(tmp, "guild.db")
+        for player, tech_scraps in (("alice", 50000), ("bob", 10), ("alice", 60000)):
+            with SqliteInventoryStore(path, player) as store:
+                calculator = ASUCalculator(store=store, verbose=False)
+                calculator.inventory["tech_scraps"] = tech_scraps
+                calculator.save_inventory()
+        with SqliteInventoryStore(path, "alice") as store:
+            alice = SnapshotLog(snapshot_log_path(store))
+        with SqliteInventoryStore(path, "bob") as store:
+            bob = SnapshotLog(snapshot_log_path(store))
+        assert alice.path != bob.path and os.path.dirname(alice.path) == tmp
+        assert [record['tech_scraps'] for record in alice] == [50000, 60000]
+        assert [record['tech_scraps'] for record in bob] == [10]
+    
+    print("✅ Snapshot log passed")
+
+def test_rate_estimator():
+    """Test rolling window and EWMA collection rates"""
+    print("Testing rate estimator...")
+    
+    estimator = CollectionRateEstimator(half_life_days=1)
+    assert estimator.rates() == {'1d': None, '7d': None, '30d': None, 'ewma': None}
+    
+    # 1000/day for 20 days, then 5000/day for 10 days
+    start = datetime(2025, 1, 1)
+    value = 0
+    for day in range(31):
+        estimator.update(start + timedelta(days=day), value)
+        value += 1000 if day < 20 else 5000
+    
+    rates = estimator.rates()
+    assert rates['1d'] == 5000
+    assert rates['7d'] == 5000
+    assert rates['30d'] == (20 * 1000 + 10 * 5000) / 30
+    assert 4990 < rates['ewma'] < 5000
+    assert len(estimator.points['1d']) == 2
+    
+    restored = CollectionRateEstimator.from_dict(json.loads(json.dumps(estimator.to_dict())))
+    assert restored.rates() == rates
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JsonInventoryStore(os.path.join(tmp, "inventory.json"))
+        calculator = ASUCalculator(store=store)
+        calculator.inventory["start_date"] = "2025-01-01T00:00:00"
+        calculator.inventory["tech_scraps"] = 1000
+        calculator.save_inventory()
+        calculator.inventory["tech_scraps"] = 3000
+        calculator.save_inventory()
+        
+        # A new calculator picks up the saved estimator state
+        calculator = ASUCalculator(store=store)
+        assert calculator.rate_estimator.last[1] == 3000
+        recent_rates = calculator.calculate_collection_rate()['recent_rates']
+        assert recent_rates['ewma'] > 0
+        
+        # Players sharing a database keep their own estimator state
+        path = os.path.join(tmp, "guild.db")
+        for player, tech_scraps in (("alice", 50000), ("bob", 10), ("alice", 60000), ("bob", 20)):
+            with SqliteInventoryStore(path, player) as store:
+                calculator = ASUCalculator(store=store, verbose=False)
+                calculator.inventory["start_date"] = "2025-01-01T00:00:00"
+                calculator.inventory["tech_scraps"] = tech_scraps
+                calculator.save_inventory()
+        for player, last in (("alice", 60000), ("bob", 20)):
+            with SqliteInventoryStore(path, player) as store:
+                calculator = ASUCalculator(store=store, verbose=False)
+                assert calculator.rate_estimator.last[1] == last
+                assert calculator.calculate_collection_rate()['recent_rates']['ewma'] > 0
+    
+    print("✅ Rate estimator passed")
+
+def test_atomic_inventory_writes():
+    """Test crash-safe JSON saves with rotating backups"""
+    print("Testing atomic inventory writes...")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "inventory.json")
+        store = JsonInventoryStore(path, backup_generations=3)
+        for tech_scraps in range(5):
+            store.save({"tech_scraps": tech_scraps})
+        
+        assert store.load() == {"tech_scraps": 4}
+        backups = backup_paths(path, 3)
+        assert [JsonInventoryStore(backup).load()["tech_scraps"] for backup in backups] == [3, 2, 1]
+        assert not os.path.exists(f"{path}.backup.3")
+        
+        # A failed write leaves the previous inventory and no temp files behind
+        try:
+            store.save({"tech_scraps": object()})
+            assert False, "Expected a serialization error"
+        except TypeError:
+            pass
+        assert store.load() == {"tech_scraps": 4}
+        assert not [name for name in os.listdir(tmp) if name.endswith('.tmp')]
+    
+    print("✅ Atomic inventory writes passed")
+
+def test_command_line():
+    """Test the non-interactive compute, update and history commands"""
+    print("Testing command line...")
+    
+    # The CLI stays cheap to start: NumPy and process pools load only when used
+    heavy = subprocess.run(
+        [sys.executable, '-c', "import sys, asu_calculator; "
+         "print([m for m in ('numpy', 'concurrent.futures') if m in sys.modules])"],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert heavy.stdout.strip() == '[]', heavy.stdout
+    
+    out = io.StringIO()
+    assert cli_main(['compute', '--tech-scraps', '5000', '--asus', '1'], out) == 0
+    results = json.loads(out.getvalue())
+    assert results['remaining_bags']['old_pouches'] == 0
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        inventories = os.path.join(tmp, "inventories.json")
+        with open(inventories, 'w') as f:
+            json.dump([{"old_pouches": 10}, {"fanny_packs": 1}], f)
+        out = io.StringIO()
+        assert cli_main(['compute', '--input', inventories, '--format', 'csv'], out) == 0
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        assert len(rows) == 2
+        assert rows[0]['remaining_bags.old_pouches'] == '74990'
+        assert rows[1]['remaining_bags.fanny_packs'] == '7499'
+        
+        # List items that are not inventory objects are an error, not a traceback
+        with open(inventories, 'w') as f:
+            json.dump([1, 2], f)
+        for command in (['compute'], ['solve', '--runs-per-day', '10']):
+            with contextlib.redirect_stderr(io.StringIO()) as err:
+                assert cli_main(command + ['--input', inventories], io.StringIO()) == 1
+            assert "inventory list items must be objects" in err.getvalue()
+        
+        # solve cleans up bad amounts in a list the same way as for one inventory
+        bad = [{"tech_scraps": "lots", "old_pouches": None}, {"tech_scraps": -5, "bitcoin": "1000"}]
+        with open(inventories, 'w') as f:
+            json.dump(bad, f)
+        out = io.StringIO()
+        assert cli_main(['solve', '--input', inventories, '--btc', '100000000', '--runs', '100000'], out) == 0
+        listed = json.loads(out.getvalue())
+        single = os.path.join(tmp, "single.json")
+        for inventory, row in zip(bad, listed):
+            with open(single, 'w') as f:
+                json.dump(inventory, f)
+            out = io.StringIO()
+            assert cli_main(['solve', '--input', single, '--btc', '100000000', '--runs', '100000'], out) == 0
+            assert json.loads(out.getvalue()) == row
+        
+        for store in [os.path.join(tmp, "inventory.json"), os.path.join(tmp, "inventory.db")]:
+            for bitcoin in ['100', '200']:
+                out = io.StringIO()
+                assert cli_main(['--store', store, 'update', '--bitcoin', bitcoin], out) == 0
+            
+            out = io.StringIO()
+            assert cli_main(['--store', store, 'history'], out) == 0
+            assert [snapshot['bitcoin'] for snapshot in json.loads(out.getvalue())] == [100, 200]
+            
+            out = io.StringIO()
+            assert cli_main(['--store', store, 'compute', '--format', 'csv'], out) == 0
+            assert len(list(csv.DictReader(io.StringIO(out.getvalue())))) == 1
+        
+        # Concurrent updates of different fields are all kept (locked from load to save)
+        for store in [os.path.join(tmp, "shared.json"), os.path.join(tmp, "shared.db")]:
+            def update(field):
+                flag = '--' + field.replace('_', '-')
+                return cli_main(['--store', store, 'update', flag, '7'], io.StringIO())
+            with ThreadPoolExecutor(max_workers=len(INVENTORY_FIELDS)) as executor:
+                assert list(executor.map(update, INVENTORY_FIELDS)) == [0] * len(INVENTORY_FIELDS)
+            with open_store(store) as opened:
+                saved = opened.load()
+            assert all(saved[field] == 7 for field in INVENTORY_FIELDS), saved
+        
+        # A collection rate too slow to finish before year 9999 is saved and reported, not a crash
+        out = io.StringIO()
+        store = os.path.join(tmp, "slow.json")
+        assert cli_main(['--store', store, 'update', '--tech-scraps', '100', '--start-date', '2020-01-01'], out) == 0
+        assert json.loads(out.getvalue())['completion_estimate']['completion_date'] is None
+    
+    print("✅ Command line passed")
+
+def test_stream_results():
+    """Test JSON Lines streaming keeps order with and without workers"""
+    print("Testing stream results...")
+    
+    lines = [json.dumps({"tech_scraps": i * 1000, "asus": i % 2}) + "\n" for i in range(25)]
+    lines.insert(3, "not json\n")
+    lines.insert(7, "\n")
+    # A rate this slow puts the completion date past year 9999
+    lines.insert(10, json.dumps({"tech_scraps": 10, "start_date": "2020-01-01"}) + "\n")
+    
+    out = io.StringIO()
+    stream_results(io.StringIO("".join(lines)), out, workers=1, chunk_lines=4, as_of=datetime(2025, 6, 1))
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert len(results) == 27
+    assert 'error' in results[3]
+    assert results[9]['completion_estimate']['completion_date'] is None
+    assert results[9]['completion_estimate']['days_to_completion'] > 1e9
+    assert results[0]['remaining_bags']['asus'] == 1 and results[1]['remaining_bags']['asus'] == 0
+    
+    parallel_out = io.StringIO()
+    stream_results(io.StringIO("".join(lines)), parallel_out, workers=2, chunk_lines=4, as_of=datetime(2025, 6, 1))
+    assert parallel_out.getvalue() == out.getvalue()
+    
+    print("✅ Stream results passed")
+
+def test_http_server():
+    """Test the HTTP service with keep-alive, coalescing and metrics"""
+    print("Testing HTTP server...")
+    
+    async def exercise():
+        server = CalculatorServer(port=0)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            
+            async def request(method, path, payload=None):
+                body = json.dumps(payload).encode() if payload is not None else b''
+                writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\n"
+                             f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+                await writer.drain()
+                status = int((await reader.readline()).split()[1])
+                headers = {}
+                while (line := await reader.readline()) != b'\r\n':
+                    name, _, value = line.decode().partition(':')
+                    headers[name.lower()] = value.strip()
+                return status, json.loads(await reader.readexactly(int(headers['content-length'])))
+            
+            # Several requests on one kept-alive connection
+            status, results = await request('POST', '/calculate', {"tech_scraps": 5000, "asus": 1})
+            assert status == 200 and results['remaining_bags']['old_pouches'] == 0
+            status, results = await request('POST', '/calculate', [{"asus": 1}, {}])
+            assert status == 200 and len(results) == 2
+            assert (await request('GET', '/nowhere'))[0] == 404
+            assert (await request('POST', '/calculate', "text"))[0] == 400
+            
+            status, metrics = await request('GET', '/metrics')
+            assert metrics['endpoints']['/calculate']['count'] == 3
+            assert metrics['endpoints']['/calculate']['p99_ms'] >= metrics['endpoints']['/calculate']['p50_ms']
+            writer.close()
+            
+            # An over-long header gets a 431 and the connection is closed
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            writer.write(b"GET /health HTTP/1.1\r\nX-Padding: " + b"x" * (1 << 17) + b"\r\n\r\n")
+            await writer.drain()
+            response = await reader.read()
+            assert response.startswith(b"HTTP/1.1 431 ") and b"Connection: close" in response
+            writer.close()
+            
+            # Identical concurrent inventories share one calculation
+            inventory = {"old_pouches": 42, "last_updated": "2025-01-01T00:00:00"}
+            first, second = await asyncio.gather(server.calculate(inventory),
+                                                 server.calculate(dict(inventory, last_updated=None)))
+            assert first is second
+            assert server.coalesced == 1
+        finally:
+            await server.close()
+    
+    asyncio.run(exercise())
+    
+    print("✅ HTTP server passed")
+
+def test_results_cache():
+    """Test the LRU results cache, TTL expiry and counters"""
+    print("Testing results cache...")
+    
+    now = [0.0]
+    cache = ResultsCache(maxsize=2, ttl=60, clock=lambda: now[0])
+    inventory = utils.validate_inventory_data({"tech_scraps": 1200, "last_updated": "2025-01-01T00:00:00"})
+    
+    first = ASUCalculator(dict(inventory), verbose=False).calculate_results_data(cache=cache)
+    resaved = dict(inventory, last_updated="2025-01-02T00:00:00")
+    second = ASUCalculator(resaved, verbose=False).calculate_results_data(cache=cache)
+    assert second['remaining_bags'] is first['remaining_bags']
+    assert second == ASUCalculator(dict(inventory), verbose=False).calculate_results_data()
+    assert cache.hits == 1 and cache.misses == 1
+    
+    # Least recently used entry is evicted once full
+    cache.get_or_compute({"asus": 1}, lambda: {"asus": 1})
+    cache.get_or_compute({"asus": 2}, lambda: {"asus": 2})
+    assert cache.evictions == 1 and cache.get(inventory) is None
+    
+    # Entries expire after the TTL
+    now[0] = 61
+    assert cache.get({"asus": 2}) is None and cache.expirations == 1
+    
+    batch = calculate_results_batch([inventory, resaved], columnar=False, cache=ResultsCache())
+    assert batch[0]['crafting_totals'] is batch[1]['crafting_totals']
+    
+    print("✅ Results cache passed")
+
+def test_as_of_clock():
+    """Test results are reproducible when calculated as of a fixed time"""
+    print("Testing as_of clock...")
+    
+    as_of = datetime(2025, 1, 11)
+    assert utils.estimate_completion_date(1000, 100, as_of) == datetime(2025, 1, 21)
+    assert utils.estimate_completion_date(1000, 0, as_of) is None
+    
+    inventory = utils.validate_inventory_data({"tech_scraps": 5000, "start_date": "2025-01-01T00:00:00"})
+    calculator = ASUCalculator(inventory, verbose=False, as_of=as_of)
+    results = calculator.calculate_results_data()
+    assert results['collection_rate']['days_elapsed'] == 10
+    assert results['collection_rate']['daily_rate'] == 500
+    remaining = results['remaining_gathering']['tech_scraps']
+    assert results['completion_estimate']['completion_date'] == as_of + timedelta(days=remaining / 500)
+    assert calculator.calculate_results_data() == results
+    
+    # An explicit as_of overrides the calculator's clock
+    later = calculator.calculate_results_data(as_of=datetime(2025, 1, 21))
+    assert later['collection_rate']['days_elapsed'] == 20
+    
+    # One timestamp for a whole batch, via the command line too
+    batch = calculate_results_batch([inventory, inventory], columnar=False, as_of=as_of)
+    assert batch[0] == batch[1] == results
+    out = io.StringIO()
+    assert cli_main(['compute', '--tech-scraps', '5000', '--start-date', '2025-01-01',
+                     '--as-of', '2025-01-11T00:00:00'], out=out) == 0
+    assert json.loads(out.getvalue())['collection_rate']['daily_rate'] == 500
+    
+    print("✅ As-of clock passed")
+
+def test_benchmark_harness():
+    """Test the benchmark harness runs and detects regressions against a baseline"""
+    print("Testing benchmark harness...")
+    
+    inventories = list(benchmark.generate_inventories(3, seed=1))
+    assert inventories == list(benchmark.generate_inventories(3, seed=1))
+    assert all(utils.validate_inventory_data(dict(inventory)) == inventory for inventory in inventories)
+    
+    results = benchmark.run_benchmarks(scales=[1, 20], names=['results_data', 'utils.bag_crafter_cost'], repeat=1)
+    assert set(results) == {'results_data@1', 'results_data@20', 'utils.bag_crafter_cost@1', 'utils.bag_crafter_cost@20'}
+    assert results['results_data@20']['ops'] == 20 and results['results_data@20']['peak_bytes'] > 0
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "baseline.json")
+        benchmark.save_baseline(path, results)
+        with open(path) as f:
+            baseline = json.load(f)
+    assert benchmark.compare_to_baseline(results, baseline) == []
+    slower = {key: dict(result, ops_per_sec=result['ops_per_sec'] / 2) for key, result in results.items()}
+    assert len(benchmark.compare_to_baseline(slower, baseline)) == len(results)
+    
+    print("✅ Benchmark harness passed")
+
+def test_compact_inventory():
+    """Test Inventory and InventoryArray work wherever inventory dicts do"""
+    print("Testing compact inventory...")
+    
+    data = utils.validate_inventory_data({"tech_scraps": 1234, "med_tech_clusters": 3, "old_pouches": 40,
+                                          "fanny_packs": 2, "start_date": "2025-01-01T00:00:00"})
+    data['last_updated'] = None
+    inventory = Inventory.from_dict(dict(data, unknown=1))
+    assert inventory.to_dict() == data and inventory == data
+    assert inventory.get('fanny_packs', 0) == 2 and inventory.get('missing', 7) == 7
+    assert not hasattr(inventory, '__dict__')
+    try:
+        inventory['missing'] = 1
+        assert False, "unknown fields should be rejected"
+    except KeyError:
+        pass
+    
+    as_of = datetime(2025, 2, 1)
+    assert utils.calculate_tech_scrap_equivalent_from_inventory(inventory) == \
+        utils.calculate_tech_scrap_equivalent_from_inventory(data)
+    assert utils.calculate_remaining_bags_to_craft(inventory) == utils.calculate_remaining_bags_to_craft(data)
+    expected = ASUCalculator(dict(data), verbose=False, as_of=as_of).calculate_results_data()
+    assert ASUCalculator(inventory.copy(), verbose=False, as_of=as_of).calculate_results_data() == expected
+    
+    # Stores accept it too
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = JsonInventoryStore(os.path.join(temp_dir, "inventory.json"))
+        store.save(inventory)
+        assert store.load() == data
+    
+    rows = [data, {"asus": 1}, {"bitcoin": 99, "explorer_backpacks": 5}]
+    packed = InventoryArray(rows)
+    assert len(packed) == 3 and packed[-1]['bitcoin'] == 99
+    assert packed.to_dicts()[0] == data
+    assert calculate_results_batch(packed, columnar=False, as_of=as_of)[0] == expected
+    columns = vectorized.to_columns(packed)
+    assert list(vectorized.calculate_tech_scrap_equivalent_from_inventory(columns)) == \
+        [utils.calculate_tech_scrap_equivalent_from_inventory(row) for row in rows]
+    packed[1] = {"asus": 2}
+    assert packed[1]['asus'] == 2
+    
+    print("✅ Compact inventory passed")
+
+def test_crafting_schedule():
+    """Test the crafting schedule respects tier dependencies, slots and syn windows"""
+    print("Testing crafting schedule...")
+    
+    # Syn windows speed up only the overlapping part of a craft
+    assert finish_time(0, 100, [(50, 60)]) == 60
+    assert finish_time(55, 10, [(50, 60)]) == 57
+    assert finish_time(0, 10, []) == 10
+    
+    as_of = datetime(2025, 1, 1)
+    remaining = utils.calculate_remaining_bags_to_craft({"fanny_packs": 7400, "old_pouches": 900})
+    single = plan_crafting_schedule(remaining, slots=1, as_of=as_of)
+    assert single['crafts'] == sum(remaining.values())
+    assert single['makespan_minutes'] == single['sequential_minutes'] == get_chain_plan().crafting_minutes(remaining)
+    
+    plan = get_chain_plan()
+    for slots in (1, 3, 10):
+        schedule = plan_crafting_schedule(remaining, slots=slots, as_of=as_of)
+        assert schedule['makespan_minutes'] >= schedule['sequential_minutes'] / slots
+        # List scheduling stays within one chain of crafts of the work / slots bound
+        assert schedule['makespan_minutes'] <= schedule['sequential_minutes'] / slots + sum(plan.tier_minutes.values())
+        produced = {field: [] for field in plan.fields}
+        for step in schedule['steps']:
+            for n in range(step['count']):
+                produced[step['field']].append(step['start_minute'] + (n + 1) * plan.tier_minutes[step['field']])
+        for field, times in produced.items():
+            assert len(times) == remaining[field]
+        last = schedule['steps'][-1]
+        # The ASU starts only once every EOC exists
+        assert last['field'] == 'asus' and last['end_minute'] == schedule['makespan_minutes']
+        assert max(produced['employee_office_cases']) <= last['start_minute']
+    
+    # Crafting through a syn window saves (1 - SYN_RATE) of the window's work
+    with_syn = plan_crafting_schedule(remaining, slots=1, syn_windows=[(0, 600)], as_of=as_of)
+    saved = single['makespan_minutes'] - with_syn['makespan_minutes']
+    assert abs(saved - 600 * (1 / SYN_RATE - 1)) < 1e-6
+    assert with_syn['completion_date'] == as_of + timedelta(minutes=with_syn['makespan_minutes'])
+    
+    out = io.StringIO()
+    assert cli_main(['schedule', '--fanny-packs', '7400', '--old-pouches', '900', '--slots', '3',
+                     '--as-of', '2025-01-01T00:00:00'], out=out) == 0
+    assert json.loads(out.getvalue())['slots'] == 3
+    
+    print("✅ Crafting schedule passed")
+
+def test_pipeline_model():
+    """Test the concurrent scav/recycle/craft pipeline model and its bottleneck"""
+    print("Testing pipeline model...")
+    
+    inventory = utils.validate_inventory_data({"fanny_packs": 7400})
+    pipeline = calculate_pipeline(inventory)
+    stages = pipeline['stages']
+    
+    # 100 fanny packs -> 1000 pouches -> 100,000 tech scraps, all from recycled med tech
+    med_tech = 100000 / CONVERSIONS['recycle_ratio']
+    assert abs(stages['recycling']['units'] - med_tech) < 1e-6
+    assert abs(stages['scavenging']['units'] - med_tech) < 1e-6
+    assert abs(stages['recycling']['busy_minutes'] - utils.calculate_recycling_time(med_tech)) < 1e-6
+    assert abs(stages['scavenging']['busy_minutes'] - utils.calculate_scavenging_time(med_tech) * 60) < 1e-6
+    assert stages['crafting']['units'] == sum(utils.calculate_remaining_bags_to_craft(inventory).values())
+    
+    # Stages overlap: end-to-end is close to the slowest stage, far below the sum
+    assert pipeline['bottleneck'] == 'scavenging'
+    slowest = stages['scavenging']['busy_minutes']
+    assert slowest <= pipeline['completion_minutes'] < slowest * 1.05
+    assert pipeline['completion_hours'] < pipeline['sequential_hours'] / 2
+    
+    # More scav slots move the bottleneck; syn shortens every stage
+    faster = calculate_pipeline(inventory, slots={'scavenging': 4})
+    assert faster['bottleneck'] != 'scavenging' and faster['completion_minutes'] < pipeline['completion_minutes']
+    with_syn = calculate_pipeline(inventory, use_syn=True)
+    assert abs(with_syn['completion_minutes'] - pipeline['completion_minutes'] * SYN_RATE) < 1e-6
+    
+    for slots in ({'crafting': 0}, {'recycling': -1}):
+        try:
+            calculate_pipeline(inventory, slots=slots)
+            assert False, f"{slots} should be rejected"
+        except ValueError as e:
+            assert 'slot' in str(e)
+    
+    # Nothing left to do
+    done = calculate_pipeline(utils.validate_inventory_data({"asus": 1}))
+    assert done['completion_minutes'] == 0 and done['bottleneck'] is None
+    
+    # Opt-in: left out of the results unless asked for
+    calculator = ASUCalculator(inventory, verbose=False)
+    assert 'pipeline' not in calculator.calculate_results_data()
+    assert calculator.calculate_results_data(pipeline=True)['pipeline'] == pipeline
+    out = io.StringIO()
+    assert cli_main(['compute', '--fanny-packs', '7400', '--pipeline'], out) == 0
+    assert json.loads(out.getvalue())['pipeline'] == pipeline
+    
+    print("✅ Pipeline model passed")
+
+def test_cost_optimizer():
+    """Test the Bag Crafter Service optimizer against trying every purchase count"""
+    print("Testing cost optimizer...")
+    
+    inventory = utils.validate_inventory_data({
+        "tech_scraps": 500000, "tech_scrap_clusters": 100, "med_tech": 200000, "med_tech_clusters": 300,
+        "bitcoin": 1000000, "old_pouches": 40000, "fanny_packs": 300, "explorer_backpacks": 20
+    })
+    result = optimize_bag_crafter(inventory)
+    doras_needed = result['doras_needed']
+    assert doras_needed == utils.calculate_remaining_bags_to_craft(inventory)['explorer_backpacks']
+    assert result['evaluated'] < doras_needed / 4
+    
+    # Held clusters pay first, the rest is clustered from med tech
+    option = evaluate_purchase(inventory, 40)
+    assert option['mtc_cost'] == 40 * BAG_CRAFTER['mtc_per_dora']
+    assert option['mtc_from_inventory'] == 300 and option['mtc_to_cluster'] == 300
+    assert option['clustering_btc'] == 300 * CONVERSIONS['cluster_cost_mtc']
+    assert option['remaining_bags']['explorer_backpacks'] == doras_needed - 40
+    
+    options = [evaluate_purchase(inventory, doras) for doras in range(doras_needed + 1)]
+    fastest = min(option['completion_minutes'] for option in options)
+    cheapest = min(option['total_btc'] for option in options)
+    assert result['best']['completion_minutes'] == fastest
+    assert optimize_bag_crafter(inventory, 'btc')['best']['total_btc'] == cheapest
+    
+    # Budgets: cheapest within a time limit, nothing when no option fits
+    max_minutes = (fastest + options[0]['completion_minutes']) / 2
+    within = optimize_bag_crafter(inventory, 'btc', max_minutes=max_minutes)['best']
+    assert within['total_btc'] == min(option['total_btc'] for option in options
+                                      if option['completion_minutes'] <= max_minutes)
+    assert optimize_bag_crafter(inventory, max_btc=0)['best'] is None
+    
+    assert optimize_bag_crafter_cached(inventory) is optimize_bag_crafter_cached(dict(inventory))
+    
+    # Config edits miss the cache instead of returning stale results
+    cached = optimize_bag_crafter_cached(inventory)
+    for setting, key, value in ((config.PIPELINE, 'scavenging', 4), (config.BAG_CRAFTER, 'mtc_per_dora', 5)):
+        original = setting[key]
+        setting[key] = value
+        try:
+            assert optimize_bag_crafter_cached(inventory) == optimize_bag_crafter(inventory) != cached
+        finally:
+            setting[key] = original
+    assert optimize_bag_crafter_cached(inventory) is cached
+    clear_optimizer_cache()
+    assert optimize_bag_crafter_cached(inventory) is not cached
+    assert ASUCalculator(inventory, verbose=False).optimize_bag_crafter() == result
+    
+    try:
+        optimize_bag_crafter(inventory, 'fun')
+        assert False, "unknown objective should be rejected"
+    except ValueError:
+        pass
+    
+    print("✅ Cost optimizer passed")
+
+def test_guild_planner():
+    """Test pooling many inventories toward several ASUs and splitting the crafts"""
+    print("Testing guild planner...")
+    
+    members = {
+        'alice': {"tech_scraps": 1000000, "bitcoin": 30000000, "old_pouches": 5000},
+        'bob': {"tech_scraps": 200000, "bitcoin": 1000000, "fanny_packs": 100},
+        'carol': {"employee_office_cases": 10}
+    }
+    pooled, rows = pool_inventories(members)
+    assert pooled['tech_scraps'] == 1200000 and pooled['fanny_packs'] == 100
+    assert pooled['employee_office_cases'] == 10 and set(rows) == set(members)
+    # Chunked and parallel pooling give the same sums
+    assert pool_inventories(members, chunk_size=1) == (pooled, rows)
+    assert pool_inventories(members, workers=2, chunk_size=1) == (pooled, rows)
+    
+    plan = plan_guild(members, target_asus=2)
+    assert plan['remaining_bags'] == utils.calculate_remaining_bags_to_craft(pooled, 2)
+    assert plan['bitcoin_needed'] == get_chain_plan().crafting_bitcoin(plan['remaining_bags'])
+    
+    # Every craft is assigned or reported, within each member's means
+    allocation = plan['allocation']
+    for field, count in plan['remaining_bags'].items():
+        assigned = sum(member['crafts'].get(field, 0) for member in allocation.values())
+        assert assigned + plan['unassigned'].get(field, 0) == count
+    assert allocation['bob']['crafts']['old_pouches'] <= 200000 // 100
+    assert not allocation['carol']['crafts'] and allocation['carol']['crafting_minutes'] == 0
+    assert plan['makespan_minutes'] == max(member['crafting_minutes'] for member in allocation.values())
+    
+    # Incremental updates match planning from scratch
+    planner = GuildPlanner(members, target_asus=2)
+    planner.set_member('bob', {"tech_scraps": 5000000, "bitcoin": 50000000})
+    planner.remove_member('carol')
+    updated = dict(members, bob={"tech_scraps": 5000000, "bitcoin": 50000000})
+    del updated['carol']
+    assert planner.plan() == plan_guild(updated, target_asus=2)
+    assert len(planner) == 2 and 'carol' not in planner
+    
+    print("✅ Guild planner passed")
+
+def test_inverse_solver():
+    """Test the inverse queries against the forward completion estimate"""
+    print("Testing inverse solver...")
+    
+    as_of = datetime(2025, 6, 1)
+    inventory = utils.validate_inventory_data({
+        "tech_scraps": 30000, "med_tech": 500, "fanny_packs": 50, "bitcoin": 200000,
+        "start_date": "2025-05-01T00:00:00"
+    })
+    results = ASUCalculator(inventory, verbose=False, as_of=as_of).calculate_results_data()
+    remaining = results['remaining_gathering']['tech_scraps']
+    assert inverse_solver.remaining_tech_scraps(inventory) == remaining
+    
+    # The forward estimate at the measured rate inverts back to the same rate and date
+    forward = results['completion_estimate']
+    runs_per_day = results['collection_rate']['scav_runs_per_day']
+    completion = inverse_solver.completion_for_runs_per_day(inventory, runs_per_day, as_of)
+    assert abs(completion['days_to_completion'] - forward['days_to_completion']) < 1e-6
+    needed = inverse_solver.runs_per_day_for_date(inventory, forward['completion_date'], as_of)
+    assert abs(needed['runs_per_day'] - runs_per_day) < 1e-6
+    assert needed['achievable'] == (needed['scav_hours_per_day'] <= 24)
+    assert inverse_solver.runs_per_day_for_date(inventory, as_of, as_of)['runs_per_day'] is None
+    assert inverse_solver.completion_for_runs_per_day(inventory, 0, as_of)['completion_date'] is None
+    slow = inverse_solver.completion_for_runs_per_day(inventory, 1e-9, as_of)
+    assert slow['completion_date'] is None and slow['days_to_completion'] > 1e9
+    
+    # Budget -> ASUs: the largest count whose BTC fits the budget
+    plan = get_chain_plan()
+    for extra in (0, 10 ** 6, 2 * 10 ** 8):
+        reachable = inverse_solver.achievable_asus(inventory, bitcoin=extra)
+        budget = inventory['bitcoin'] + extra
+        cost = lambda asus: plan.crafting_bitcoin(utils.calculate_remaining_bags_to_craft(inventory, asus))
+        assert cost(reachable['asus']) <= budget < cost(reachable['asus'] + 1)
+    runs_for_two = inverse_solver.remaining_tech_scraps(inventory, 2) / inverse_solver.tech_scraps_per_run()
+    assert inverse_solver.achievable_asus(inventory, runs=runs_for_two + 1)['asus'] == 2
+    assert inverse_solver.achievable_asus(inventory, runs=runs_for_two - 1)['asus'] == 1
+    try:
+        inverse_solver.achievable_asus(inventory)
+        assert False, "a budget should be required"
+    except ValueError:
+        pass
+    
+    # Batch forms agree with the scalar ones
+    inventories = [inventory, utils.validate_inventory_data({"asus": 1}), utils.validate_inventory_data({})]
+    target = datetime(2026, 1, 1)
+    batch = inverse_solver.runs_per_day_for_date_batch(inventories, target, as_of)
+    dates = inverse_solver.completion_for_runs_per_day_batch(inventories, 5, as_of)['completion_date']
+    for index, row in enumerate(inventories):
+        assert abs(batch['runs_per_day'][index] -
+                   inverse_solver.runs_per_day_for_date(row, target, as_of)['runs_per_day']) < 1e-9
+        assert dates[index] == inverse_solver.completion_for_runs_per_day(row, 5, as_of)['completion_date']
+    assert inverse_solver.achievable_asus_batch(inventories, bitcoin=0)['asus'][1] == 1
+    assert inverse_solver.completion_for_runs_per_day_batch(inventories, 1e-9, as_of)['completion_date'][0] is None
+    
+    print("✅ Inverse solver passed")
+
+def test_parameter_sweep():
+    """Test config sweeps: per-cell configs, parity with the current config, tidy deltas"""
+    print("Testing parameter sweep...")
+    
+    as_of = datetime(2025, 6, 1)
+    inventories = {
+        'ann': {"tech_scraps": 30000, "med_tech": 500, "fanny_packs": 50, "start_date": "2025-05-01T00:00:00"},
+        'ben': {"old_pouches": 300, "explorer_backpacks": 10}
+    }
+    scavenging = dict(SCAVENGING)
+    grid = parse_grid(["SCAVENGING.med_tech_drop_chance=0.6,0.7252", "CRAFTING_CHAIN.fanny_pack.bitcoin=6000"])
+    assert grid == {'SCAVENGING.med_tech_drop_chance': [0.6, 0.7252], 'CRAFTING_CHAIN.fanny_pack.bitcoin': [6000]}
+    rows = run_sweep(inventories, grid, as_of)
+    assert SCAVENGING == scavenging and config.CRAFTING_CHAIN['fanny_pack']['bitcoin'] == 5000
+    assert len(rows) == 2 * len(METRICS) * len(inventories)
+    
+    # The baseline matches the forward results
+    def row(cell, player, metric):
+        return next(r for r in rows if r['cell'] == cell and r['player'] == player and r['metric'] == metric)
+    ann = ASUCalculator(utils.validate_inventory_data(dict(inventories['ann'])), verbose=False,
+                        as_of=as_of).calculate_results_data()
+    assert row(0, 'ann', 'remaining_tech_scraps')['baseline'] == ann['remaining_gathering']['tech_scraps']
+    assert abs(row(0, 'ann', 'completion_days')['baseline'] -
+               ann['completion_estimate']['days_to_completion']) < 1e-6
+    assert row(0, 'ben', 'completion_days')['delta'] is None
+    service = ann['bag_crafter_service']
+    assert service['doras_you_can_craft'] > 0
+    assert row(0, 'ann', 'dora_mtc_cost')['baseline'] == service['mtc_cost']
+    assert abs(row(0, 'ann', 'scav_hours')['baseline'] -
+               ann['remaining_gathering']['scav_time']['hours_no_syn']) < 1e-6
+    
+    # Inventories are cleaned up like everywhere else before they are evaluated
+    messy = run_sweep({'cat': {"tech_scraps": "lots", "med_tech": None, "fanny_packs": -5}}, grid, as_of)
+    assert next(r for r in messy if r['metric'] == 'remaining_tech_scraps')['baseline'] == 7500000
+    
+    # A lower drop chance slows scavenging in proportion; a pricier fanny pack costs more BTC
+    scav = row(0, 'ann', 'scav_hours')
+    assert abs(scav['value'] - scav['baseline'] * 0.7252 / 0.6) < 1e-6
+    assert row(1, 'ann', 'scav_hours')['delta'] == 0
+    fanny_packs = utils.calculate_remaining_bags_to_craft(inventories['ben'])['fanny_packs']
+    assert row(1, 'ben', 'crafting_btc')['delta'] == fanny_packs * 1000
+    
+    # Parallel cells and the summary view agree with the per-player rows
+    assert run_sweep(inventories, grid, as_of, workers=2) == rows
+    summary = run_sweep(inventories, grid, as_of, summary=True)
+    crafting_btc = next(r for r in summary if r['cell'] == 1 and r['metric'] == 'crafting_btc')
+    assert crafting_btc['max_delta'] == max(row(1, player, 'crafting_btc')['delta'] for player in inventories)
+    
+    assert ConfigSet({'SYN_RATE': 0.5})['SYN_RATE'] == 0.5 and SYN_RATE != 0.5
+    for bad in ({'SCAVENGING.nope': 1}, {'NOPE': 1}, {'CRAFTING_CHAIN.asu.bitcoin.x': 1}):
+        try:
+            ConfigSet(bad)
+            assert False, f"{bad} should be rejected"
+        except ValueError:
+            pass
+    
+    print("✅ Parameter sweep passed")
+
+def test_reactive_results():
+    """Test incremental recomputation of the results when single fields change"""
+    print("Testing reactive results...")
+    
+    as_of = datetime(2025, 6, 1)
+    inventory = {"tech_scraps": 30000, "med_tech": 500, "fanny_packs": 50, "bitcoin": 200000,
+                 "start_date": "2025-05-01T00:00:00"}
+    model = ReactiveResults(inventory, as_of=as_of)
+    
+    def expected():
+        return ASUCalculator(dict(model.inventory), verbose=False, as_of=as_of).calculate_results_data()
+    
+    assert model.results() == expected()
+    assert len(model.last_recomputed) == 7
+    
+    # Only the nodes that read the changed field are recomputed
+    before = model.results()
+    assert model.last_recomputed == ()
+    assert model.update(bitcoin=5000000) == ['bitcoin']
+    after = model.results()
+    assert model.last_recomputed == ('bag_crafter_service',) and after == expected()
+    assert after['remaining_bags'] is before['remaining_bags']
+    
+    model.update(med_tech=900)
+    assert model.results() == expected()
+    assert 'remaining_bags' not in model.last_recomputed and 'time' in model.last_recomputed
+    
+    # Unchanged values and cut-off nodes do no work
+    assert model.update(med_tech=900) == []
+    model.update(old_pouches=150)
+    assert model.results() == expected()
+    assert 'crafting_totals' in model.last_recomputed
+    
+    model.update(start_date=None)
+    assert model.results() == expected() and model.last_recomputed == ('time',)
+    assert model.results(as_of=datetime(2025, 7, 1))['completion_estimate'] is None
+    
+    try:
+        model.update(gold=1)
+        assert False, "unknown fields should be rejected"
+    except KeyError:
+        pass
+    
+    # The pipeline node is opt-in, like calculate_results_data(pipeline=True)
+    with_pipeline = ReactiveResults(inventory, as_of=as_of, pipeline=True)
+    assert with_pipeline.results() == ASUCalculator(utils.validate_inventory_data(dict(inventory)), verbose=False,
+                                                    as_of=as_of).calculate_results_data(pipeline=True)
+    with_pipeline.update(fanny_packs=60)
+    with_pipeline.results()
+    assert 'pipeline' in with_pipeline.last_recomputed
+    
+    print("✅ Reactive results passed")
+
+def test_instrumentation():
+    """Test opt-in stage timers, utils call counters, exporters and --profile"""
+    print("Testing instrumentation...")
+    
+    inventory = {"tech_scraps": 30000, "med_tech": 500, "fanny_packs": 50, "bitcoin": 200000}
+    original = utils.calculate_remaining_bags_to_craft
+    instrumentation.reset()
+    calculate_results_batch([inventory], columnar=False)
+    assert instrumentation.export_json() == {'stages': {}, 'calls': {}}
+    
+    instrumentation.enable()
+    try:
+        # utils functions are counted wherever they were imported by name
+        assert utils.calculate_remaining_bags_to_craft is not original
+        results = calculate_results_batch([inventory, inventory], columnar=False)
+    finally:
+        instrumentation.disable()
+    assert utils.calculate_remaining_bags_to_craft is original
+    assert results[0] == calculate_results_batch([inventory], columnar=False)[0]
+    
+    exported = instrumentation.export_json()
+    stages = exported['stages']
+    assert stages['validate']['calls'] == 2 and stages['results.bag_crafter_service']['calls'] == 2
+    assert stages['results.time']['max_seconds'] <= stages['results.time']['total_seconds']
+    assert exported['calls']['utils.validate_inventory_data'] == 2
+    assert exported['calls']['utils.calculate_remaining_bags_to_craft'] == 2
+    
+    text = instrumentation.export_prometheus()
+    assert '# TYPE asu_stage_seconds_total counter' in text
+    assert 'asu_stage_calls_total{stage="validate"} 2' in text
+    assert 'asu_function_calls_total{function="utils.validate_inventory_data"} 2' in text
+    instrumentation.reset()
+    
+    # --timings and --profile report on stderr and leave stdout alone
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'inventory.json')
+        with open(path, 'w') as f:
+            json.dump(inventory, f)
+        plain = io.StringIO()
+        assert cli_main(['compute', '--input', path, '--as-of', '2025-06-01'], plain) == 0
+        
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stderr(err):
+            assert cli_main(['--timings', 'json', '--profile', '--profile-limit', '5',
+                             'compute', '--input', path, '--as-of', '2025-06-01'], out) == 0
+        assert out.getvalue() == plain.getvalue()
+        report = err.getvalue()
+        assert 'Ordered by: cumulative time' in report
+        timings = json.loads(report[report.index('{\n  "stages"'):])
+        assert timings['stages']['render']['calls'] == 1
+    assert not instrumentation.enabled()
+    instrumentation.reset()
+    
+    print("✅ Instrumentation passed")
+
 def run_all_tests():
     """Run all tests"""
     print("🧪 Running ASU Calculator Tests")
@@ -128,6 +1299,31 @@ def run_all_tests():
         test_bag_crafter_cost()
         test_time_formatting()
         test_calculator_initialization()
+        test_results_batch()
+        test_vectorized_calculations()
+        test_chain_plan()
+        test_crafting_graph()
+        test_scav_simulator()
+        test_scav_distribution()
+        test_sqlite_store()
+        test_snapshot_log()
+        test_rate_estimator()
+        test_atomic_inventory_writes()
+        test_command_line()
+        test_stream_results()
+        test_http_server()
+        test_results_cache()
+        test_as_of_clock()
+        test_benchmark_harness()
+        test_compact_inventory()
+        test_crafting_schedule()
+        test_pipeline_model()
+        test_cost_optimizer()
+        test_guild_planner()
+        test_inverse_solver()
+        test_parameter_sweep()
+        test_reactive_results()
+        test_instrumentation()
         
         print("\n✅ All tests passed!")
         print("Calculator is ready to use.")
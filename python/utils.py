@@ -2,10 +2,15 @@
 Utility functions for ASU Calculator
 
 Helper functions for calculations, formatting, and data processing.
+
+The calculators that take a config_set use that sweep.ConfigSet's settings
+and chain plan instead of the live config, so a parameter sweep runs the
+same formulas as the results.
 """
 
 from datetime import datetime, timedelta
 from config import CRAFTING_CHAIN, CONVERSIONS, SCAVENGING, BAG_CRAFTER, SYN_RATE
+from chain_plan import get_chain_plan
 
 def format_time_duration(minutes):
     """Format minutes into human-readable duration"""
@@ -95,16 +100,17 @@ def calculate_clustering_cost(base_units, cluster_type):
     else:
         raise ValueError(f"Unknown cluster type: {cluster_type}")
 
-def calculate_bag_crafter_cost(doras_needed):
+def calculate_bag_crafter_cost(doras_needed, config_set=None):
     """Calculate MTC cost for bag crafter service"""
-    return doras_needed * BAG_CRAFTER['mtc_per_dora']
+    bag_crafter = BAG_CRAFTER if config_set is None else config_set['BAG_CRAFTER']
+    return doras_needed * bag_crafter['mtc_per_dora']
 
 def calculate_remaining_bags(current_inventory, target_asus=1):
     """Calculate how many of each bag type is still needed"""
     total_req = calculate_total_asu_requirements(target_asus)
     
     remaining = {}
-    for bag_type in ['old_pouches', 'fanny_packs', 'explorer_backpacks', 'employee_office_cases']:
+    for bag_type in get_chain_plan().fields[:-1]:
         current = current_inventory.get(bag_type, 0)
         needed = total_req.get(bag_type, 0)
         remaining[bag_type] = max(0, needed - current)
@@ -113,52 +119,16 @@ def calculate_remaining_bags(current_inventory, target_asus=1):
 
 def calculate_total_asu_requirements(target_asus=1):
     """Calculate total requirements for target number of ASUs"""
-    # Base requirements for 1 ASU
-    tech_scraps = (CRAFTING_CHAIN['old_pouch']['tech_scraps'] * 
-                  CRAFTING_CHAIN['fanny_pack']['old_pouches'] * 
-                  CRAFTING_CHAIN['explorer_backpack']['fanny_packs'] * 
-                  CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-                  CRAFTING_CHAIN['asu']['employee_office_cases'])
-    
-    bitcoin = (CRAFTING_CHAIN['old_pouch']['bitcoin'] * 
-              CRAFTING_CHAIN['fanny_pack']['old_pouches'] * 
-              CRAFTING_CHAIN['explorer_backpack']['fanny_packs'] * 
-              CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-              CRAFTING_CHAIN['asu']['employee_office_cases'] +
-              CRAFTING_CHAIN['fanny_pack']['bitcoin'] * 
-              CRAFTING_CHAIN['explorer_backpack']['fanny_packs'] * 
-              CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-              CRAFTING_CHAIN['asu']['employee_office_cases'] +
-              CRAFTING_CHAIN['explorer_backpack']['bitcoin'] * 
-              CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-              CRAFTING_CHAIN['asu']['employee_office_cases'] +
-              CRAFTING_CHAIN['employee_office_case']['bitcoin'] * 
-              CRAFTING_CHAIN['asu']['employee_office_cases'] +
-              CRAFTING_CHAIN['asu']['bitcoin'])
-    
-    old_pouches = (CRAFTING_CHAIN['fanny_pack']['old_pouches'] * 
-                   CRAFTING_CHAIN['explorer_backpack']['fanny_packs'] * 
-                   CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-                   CRAFTING_CHAIN['asu']['employee_office_cases'])
-    
-    fanny_packs = (CRAFTING_CHAIN['explorer_backpack']['fanny_packs'] * 
-                   CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-                   CRAFTING_CHAIN['asu']['employee_office_cases'])
-    
-    explorer_backpacks = (CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-                         CRAFTING_CHAIN['asu']['employee_office_cases'])
-    
-    employee_office_cases = CRAFTING_CHAIN['asu']['employee_office_cases']
-    
-    # Multiply by target ASUs
-    return {
-        'tech_scraps': tech_scraps * target_asus,
-        'bitcoin': bitcoin * target_asus,
-        'old_pouches': old_pouches * target_asus,
-        'fanny_packs': fanny_packs * target_asus,
-        'explorer_backpacks': explorer_backpacks * target_asus,
-        'employee_office_cases': employee_office_cases * target_asus
+    plan = get_chain_plan()
+    
+    requirements = {
+        'tech_scraps': plan.tech_scraps_per_asu * target_asus,
+        'bitcoin': plan.bitcoin_per_asu * target_asus
     }
+    for field in plan.fields[:-1]:
+        requirements[field] = plan.bags_per_asu[field] * target_asus
+    
+    return requirements
 
 def validate_inventory_data(inventory):
     """Validate inventory data structure and values"""
@@ -198,58 +168,43 @@ def calculate_progress_percentage(current_eoc_equivalent, target_eocs):
 
 def calculate_total_requirements():
     """Calculate total requirements for crafting one ASU"""
-    # Calculate total bags needed for the complete chain
-    old_pouches = (CRAFTING_CHAIN['fanny_pack']['old_pouches'] * 
-                   CRAFTING_CHAIN['explorer_backpack']['fanny_packs'] * 
-                   CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-                   CRAFTING_CHAIN['asu']['employee_office_cases'])
-    
-    fanny_packs = (CRAFTING_CHAIN['explorer_backpack']['fanny_packs'] * 
-                   CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-                   CRAFTING_CHAIN['asu']['employee_office_cases'])
-    
-    explorer_backpacks = (CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-                         CRAFTING_CHAIN['asu']['employee_office_cases'])
-    
-    employee_office_cases = CRAFTING_CHAIN['asu']['employee_office_cases']
-    
-    # Calculate total tech scraps needed
-    tech_scraps = old_pouches * CRAFTING_CHAIN['old_pouch']['tech_scraps']
-    
-    # Calculate total bitcoin needed for all crafting operations
-    bitcoin = (
-        # Old Pouches
-        old_pouches * CRAFTING_CHAIN['old_pouch']['bitcoin'] +
-        # Fanny Packs  
-        fanny_packs * CRAFTING_CHAIN['fanny_pack']['bitcoin'] +
-        # Explorer Backpacks
-        explorer_backpacks * CRAFTING_CHAIN['explorer_backpack']['bitcoin'] +
-        # Employee Office Cases
-        employee_office_cases * CRAFTING_CHAIN['employee_office_case']['bitcoin'] +
-        # Final ASU
-        CRAFTING_CHAIN['asu']['bitcoin']
-    )
+    plan = get_chain_plan()
     
-    return {
-        'old_pouches': old_pouches,
-        'fanny_packs': fanny_packs,
-        'explorer_backpacks': explorer_backpacks,
-        'employee_office_cases': employee_office_cases,
-        'tech_scraps': tech_scraps,
-        'bitcoin': bitcoin
-    }
+    # Total bags needed for the complete chain, then raw resources
+    requirements = {field: plan.bags_per_asu[field] for field in plan.fields[:-1]}
+    requirements['tech_scraps'] = plan.tech_scraps_per_asu
+    requirements['bitcoin'] = plan.bitcoin_per_asu
+    
+    return requirements
 
-def calculate_expected_med_tech_per_run():
+def calculate_expected_med_tech_per_run(config_set=None):
     """Calculate expected med tech per scavenging run"""
-    return (SCAVENGING['max_units_per_run'] * 
-            SCAVENGING['med_tech_drop_chance'] * 
-            SCAVENGING['med_tech_per_drop'])
+    scavenging = SCAVENGING if config_set is None else config_set['SCAVENGING']
+    return (scavenging['max_units_per_run'] * 
+            scavenging['med_tech_drop_chance'] * 
+            scavenging['med_tech_per_drop'])
 
 def hours_to_days(hours):
     """Convert hours to days"""
     return hours / 24
 
-def calculate_scav_time(med_tech_needed):
+def calculate_scav_time_for_runs(runs):
+    """Calculate scavenging time for a whole number of runs
+    
+    Returns dict with the run count plus hours and days for both syn states
+    """
+    hours_no_syn = runs * SCAVENGING['run_time_hours']
+    hours_with_syn = hours_no_syn * SYN_RATE
+    
+    return {
+        'runs': runs,
+        'hours_no_syn': hours_no_syn,
+        'days_no_syn': hours_to_days(hours_no_syn),
+        'hours_with_syn': hours_with_syn,
+        'days_with_syn': hours_to_days(hours_with_syn)
+    }
+
+def calculate_scav_time(med_tech_needed, config_set=None):
     """Calculate scavenging time needed for given med tech amount
     
     Returns dict with hours and days for both syn states
@@ -262,13 +217,15 @@ def calculate_scav_time(med_tech_needed):
             'days_with_syn': 0
         }
     
-    expected_per_run = calculate_expected_med_tech_per_run()
+    scavenging = SCAVENGING if config_set is None else config_set['SCAVENGING']
+    syn_rate = SYN_RATE if config_set is None else config_set['SYN_RATE']
+    expected_per_run = calculate_expected_med_tech_per_run(config_set)
     runs_needed = med_tech_needed / expected_per_run
     
-    hours_no_syn = runs_needed * SCAVENGING['run_time_hours']
+    hours_no_syn = runs_needed * scavenging['run_time_hours']
     days_no_syn = hours_to_days(hours_no_syn)
     
-    hours_with_syn = hours_no_syn * SYN_RATE
+    hours_with_syn = hours_no_syn * syn_rate
     days_with_syn = hours_to_days(hours_with_syn)
     
     return {
@@ -278,145 +235,91 @@ def calculate_scav_time(med_tech_needed):
         'days_with_syn': days_with_syn
     }
 
-def calculate_tech_scrap_equivalent_from_inventory(inventory):
+def calculate_med_tech_total(inventory, config_set=None):
+    """Calculate med tech in inventory, counting clustered med tech"""
+    conversions = CONVERSIONS if config_set is None else config_set['CONVERSIONS']
+    return (inventory.get('med_tech', 0) + 
+            inventory.get('med_tech_clusters', 0) * conversions['med_tech_per_cluster'])
+
+def calculate_tech_scrap_equivalent_from_inventory(inventory, config_set=None):
     """Calculate total tech scrap equivalent from inventory items"""
+    conversions = CONVERSIONS if config_set is None else config_set['CONVERSIONS']
     total = inventory.get('tech_scraps', 0)
     
     # Add clustered tech scraps
-    total += inventory.get('tech_scrap_clusters', 0) * CONVERSIONS['tech_scrap_per_cluster']
+    total += inventory.get('tech_scrap_clusters', 0) * conversions['tech_scrap_per_cluster']
     
     # Add med tech (via recycling)
-    med_tech_total = (inventory.get('med_tech', 0) + 
-                     inventory.get('med_tech_clusters', 0) * CONVERSIONS['med_tech_per_cluster'])
-    total += med_tech_total * CONVERSIONS['recycle_ratio']
+    total += calculate_med_tech_total(inventory, config_set) * conversions['recycle_ratio']
     
     # Add bags converted to tech scrap equivalent
-    total += calculate_tech_scrap_equivalent_from_bags(inventory)
+    total += calculate_tech_scrap_equivalent_from_bags(inventory, config_set)
     
     return int(total)
 
 def calculate_eoc_equivalent_from_inventory(inventory):
     """Calculate current progress in EOC equivalents from inventory"""
-    eoc_equivalent = 0
-    
-    # Convert existing bags to EOC fractions
-    eoc_equivalent += inventory.get('employee_office_cases', 0)
-    
-    # Explorer backpacks
-    eoc_equivalent += (inventory.get('explorer_backpacks', 0) / 
-                      CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'])
+    plan = get_chain_plan()
     
-    # Fanny packs
-    eoc_equivalent += (inventory.get('fanny_packs', 0) / 
-                      (CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-                       CRAFTING_CHAIN['explorer_backpack']['fanny_packs']))
-    
-    # Old pouches
-    eoc_equivalent += (inventory.get('old_pouches', 0) / 
-                      (CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-                       CRAFTING_CHAIN['explorer_backpack']['fanny_packs'] * 
-                       CRAFTING_CHAIN['fanny_pack']['old_pouches']))
+    # Existing EOCs, plus lower bags converted to EOC fractions
+    eoc_equivalent = inventory.get(plan.eoc_field, 0)
+    for field, bags_per_eoc in plan.bags_per_eoc:
+        eoc_equivalent += inventory.get(field, 0) / bags_per_eoc
     
     return eoc_equivalent
 
-def calculate_remaining_bags_to_craft(inventory, target_asus=1):
+def _plan(config_set):
+    return get_chain_plan() if config_set is None else config_set.plan
+
+def calculate_remaining_bags_to_craft(inventory, target_asus=1, config_set=None):
     """Calculate remaining bags needed working backwards from final requirements
     
     Returns dict with remaining counts for each bag type
     """
-    # Work backwards from final requirements
-    remaining_asus = max(0, target_asus - inventory.get('asus', 0))
-    total_eocs_needed = remaining_asus * CRAFTING_CHAIN['asu']['employee_office_cases']
-    remaining_eocs = max(0, total_eocs_needed - inventory.get('employee_office_cases', 0))
-    
-    # Each EOC needs 20 Doras
-    doras_needed_for_eocs = remaining_eocs * CRAFTING_CHAIN['employee_office_case']['explorer_backpacks']
-    remaining_doras = max(0, doras_needed_for_eocs - inventory.get('explorer_backpacks', 0))
-    
-    # Each Dora needs 15 Fannys
-    fannys_needed_for_doras = remaining_doras * CRAFTING_CHAIN['explorer_backpack']['fanny_packs']
-    remaining_fannys = max(0, fannys_needed_for_doras - inventory.get('fanny_packs', 0))
-    
-    # Each Fanny needs 10 OPs
-    ops_needed_for_fannys = remaining_fannys * CRAFTING_CHAIN['fanny_pack']['old_pouches']
-    remaining_ops = max(0, ops_needed_for_fannys - inventory.get('old_pouches', 0))
-    
-    return {
-        'old_pouches': remaining_ops,
-        'fanny_packs': remaining_fannys,
-        'explorer_backpacks': remaining_doras,
-        'employee_office_cases': remaining_eocs,
-        'asus': remaining_asus
-    }
+    return _plan(config_set).graph.remaining(inventory, target_asus)
 
-def calculate_craftable_bags_from_resources(inventory):
+def calculate_craftable_bags_from_resources(inventory, config_set=None):
     """Calculate how many bags can be crafted from available tech scraps and existing bags
     
     Returns dict with craftable counts for each bag type
     """
-    # Calculate how many OPs can be crafted from available tech scraps
-    current_tech_scraps = inventory.get('tech_scraps', 0)
-    current_tsc = inventory.get('tech_scrap_clusters', 0)
-    total_tech_scraps = current_tech_scraps + (current_tsc * CONVERSIONS['tech_scrap_per_cluster'])
-    
-    tech_scraps_per_op = CRAFTING_CHAIN['old_pouch']['tech_scraps']
-    craftable_ops_from_tech_scraps = total_tech_scraps // tech_scraps_per_op
-    
-    # Calculate craftable bags from existing inventory
-    current_ops = inventory.get('old_pouches', 0)
-    current_fannys = inventory.get('fanny_packs', 0)
-    current_doras = inventory.get('explorer_backpacks', 0)
-    
-    # Total OPs available (current + craftable)
-    total_available_ops = current_ops + craftable_ops_from_tech_scraps
-    
-    # How many Fannys can be made from total available OPs
-    ops_per_fanny = CRAFTING_CHAIN['fanny_pack']['old_pouches']
-    additional_fannys_from_ops = total_available_ops // ops_per_fanny
-    total_available_fannys = current_fannys + additional_fannys_from_ops
-    
-    # How many Doras can be made from total available Fannys
-    fannys_per_dora = CRAFTING_CHAIN['explorer_backpack']['fanny_packs']
-    craftable_doras = total_available_fannys // fannys_per_dora
+    plan = _plan(config_set)
+    crafted, available = plan.graph.craftable(inventory, through=plan.dora_field)
     
     return {
-        'ops_from_tech_scraps': craftable_ops_from_tech_scraps,
-        'total_craftable_doras': craftable_doras,
-        'total_available_ops': total_available_ops,
-        'total_available_fannys': total_available_fannys
+        'ops_from_tech_scraps': crafted.get('old_pouches', 0),
+        'total_craftable_doras': crafted[plan.dora_field],
+        'total_available_ops': available.get('old_pouches', 0),
+        'total_available_fannys': available.get('fanny_packs', 0)
     }
 
-def calculate_tech_scrap_equivalent_from_bags(inventory):
+def calculate_tech_scrap_equivalent_from_bags(inventory, config_set=None):
     """Calculate tech scrap equivalent from bag inventory only"""
-    total = 0
-    
-    # Old Pouches
-    total += inventory.get('old_pouches', 0) * CRAFTING_CHAIN['old_pouch']['tech_scraps']
-    
-    # Fanny Packs
-    total += (inventory.get('fanny_packs', 0) * 
-             CRAFTING_CHAIN['fanny_pack']['old_pouches'] * 
-             CRAFTING_CHAIN['old_pouch']['tech_scraps'])
-    
-    # Explorer Backpacks
-    total += (inventory.get('explorer_backpacks', 0) * 
-             CRAFTING_CHAIN['explorer_backpack']['fanny_packs'] * 
-             CRAFTING_CHAIN['fanny_pack']['old_pouches'] * 
-             CRAFTING_CHAIN['old_pouch']['tech_scraps'])
+    plan = _plan(config_set)
     
-    # Employee Office Cases
-    total += (inventory.get('employee_office_cases', 0) * 
-             CRAFTING_CHAIN['employee_office_case']['explorer_backpacks'] * 
-             CRAFTING_CHAIN['explorer_backpack']['fanny_packs'] * 
-             CRAFTING_CHAIN['fanny_pack']['old_pouches'] * 
-             CRAFTING_CHAIN['old_pouch']['tech_scraps'])
+    total = 0
+    for field in plan.fields[:-1]:
+        total += inventory.get(field, 0) * plan.tech_scraps_per_bag[field]
     
     return total
 
-def estimate_completion_date(remaining_tech_scraps, daily_collection_rate):
-    """Estimate completion date based on remaining requirements and collection rate"""
+def add_days(start, days):
+    """start plus a number of days, or None if that is past what datetime can represent"""
+    try:
+        return start + timedelta(days=days)
+    except OverflowError:
+        return None
+
+def estimate_completion_date(remaining_tech_scraps, daily_collection_rate, as_of=None):
+    """Estimate completion date based on remaining requirements and collection rate
+    
+    The estimate counts from as_of, or from now if it is not given. Returns
+    None when the rate is not positive or the date would fall after year 9999.
+    """
     if daily_collection_rate <= 0:
         return None
     
+    if as_of is None:
+        as_of = datetime.now()
     days_remaining = remaining_tech_scraps / daily_collection_rate
-    return datetime.now() + timedelta(days=days_remaining)
+    return add_days(as_of, days_remaining)
@@ -0,0 +1,232 @@
+"""
+Vectorized calculation functions for ASU Calculator
+
+Array versions of the inventory calculators in utils.py for bulk jobs such as
+leaderboards and what-if runs. Each function takes a dict of equal-length
+arrays keyed by inventory field (or a NumPy structured array) and returns
+arrays with the same numbers the scalar versions produce per inventory.
+
+NumPy is optional. Without it the same functions accept sequences and fall
+back to calling the scalar versions row by row, returning lists.
+"""
+
+import scav_distribution
+import utils
+from chain_plan import get_chain_plan
+from config import CONVERSIONS, SCAVENGING, SYN_RATE
+from crafting_graph import RAW_CLUSTER_FIELDS
+from inventory import InventoryArray
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+    HAS_NUMPY = False
+
+INVENTORY_FIELDS = [
+    'tech_scraps', 'tech_scrap_clusters', 'med_tech', 'med_tech_clusters',
+    'bitcoin', 'old_pouches', 'fanny_packs', 'explorer_backpacks',
+    'employee_office_cases', 'asus'
+]
+
+def _field_names(columns):
+    """Return the field names available in a dict of arrays or structured array"""
+    names = getattr(getattr(columns, 'dtype', None), 'names', None)
+    return names if names is not None else columns.keys()
+
+def _length(columns):
+    """Return the number of inventories held in the columns"""
+    names = list(_field_names(columns))
+    if not names:
+        return 0
+    return len(columns[names[0]])
+
+def _column(columns, field, size):
+    """Return a field as a NumPy array, or zeros if the field is missing"""
+    if field in _field_names(columns):
+        return np.asarray(columns[field])
+    return np.zeros(size, dtype=np.int64)
+
+def _rows(columns):
+    """Yield one inventory dict per row, for the pure Python fallback"""
+    names = [field for field in INVENTORY_FIELDS if field in _field_names(columns)]
+    for values in zip(*(columns[field] for field in names)):
+        yield dict(zip(names, values))
+
+def _dict_of_lists(rows, keys):
+    """Transpose a list of result dicts into a dict of lists"""
+    return {key: [row[key] for row in rows] for key in keys}
+
+def to_columns(inventories):
+    """Convert a sequence of inventory dicts (or an InventoryArray) into a dict of arrays (lists without NumPy)"""
+    if isinstance(inventories, InventoryArray):
+        return inventories.columns()
+    inventories = list(inventories)
+    columns = {field: [inventory.get(field, 0) for inventory in inventories]
+               for field in INVENTORY_FIELDS}
+    if HAS_NUMPY:
+        columns = {field: np.asarray(values) for field, values in columns.items()}
+    return columns
+
+def calculate_tech_scrap_equivalent_from_inventory(columns):
+    """Vectorized utils.calculate_tech_scrap_equivalent_from_inventory"""
+    if not HAS_NUMPY:
+        return [utils.calculate_tech_scrap_equivalent_from_inventory(row) for row in _rows(columns)]
+
+    size = _length(columns)
+    total = (_column(columns, 'tech_scraps', size) +
+             _column(columns, 'tech_scrap_clusters', size) * CONVERSIONS['tech_scrap_per_cluster'])
+    med_tech_total = (_column(columns, 'med_tech', size) +
+                      _column(columns, 'med_tech_clusters', size) * CONVERSIONS['med_tech_per_cluster'])
+    total = total + med_tech_total * CONVERSIONS['recycle_ratio']
+    total = total + calculate_tech_scrap_equivalent_from_bags(columns)
+    return np.trunc(total).astype(np.int64)
+
+def calculate_tech_scrap_equivalent_from_bags(columns):
+    """Vectorized utils.calculate_tech_scrap_equivalent_from_bags"""
+    if not HAS_NUMPY:
+        return [utils.calculate_tech_scrap_equivalent_from_bags(row) for row in _rows(columns)]
+
+    size = _length(columns)
+    plan = get_chain_plan()
+    total = np.zeros(size, dtype=np.int64)
+    for field in plan.fields[:-1]:
+        total = total + _column(columns, field, size) * plan.tech_scraps_per_bag[field]
+    return total
+
+def calculate_eoc_equivalent_from_inventory(columns):
+    """Vectorized utils.calculate_eoc_equivalent_from_inventory"""
+    if not HAS_NUMPY:
+        return [utils.calculate_eoc_equivalent_from_inventory(row) for row in _rows(columns)]
+
+    size = _length(columns)
+    plan = get_chain_plan()
+    eoc_equivalent = _column(columns, plan.eoc_field, size).astype(np.float64)
+    for field, bags_per_eoc in plan.bags_per_eoc:
+        eoc_equivalent = eoc_equivalent + _column(columns, field, size) / bags_per_eoc
+    return eoc_equivalent
+
+def calculate_remaining_bags_to_craft(columns, target_asus=1):
+    """Vectorized utils.calculate_remaining_bags_to_craft
+
+    Returns dict of arrays with remaining counts for each bag type
+    """
+    graph = get_chain_plan().graph
+    if not HAS_NUMPY:
+        rows = [utils.calculate_remaining_bags_to_craft(row, target_asus) for row in _rows(columns)]
+        return _dict_of_lists(rows, graph.fields)
+
+    size = _length(columns)
+    needed = {graph.final_tier: target_asus}
+    remaining = {}
+    for tier in reversed(graph.tiers):
+        field = graph.field_of[tier]
+        remaining[field] = np.maximum(0, needed.get(tier, 0) - _column(columns, field, size))
+        for source, quantity in graph.bag_inputs[tier]:
+            needed[source] = needed.get(source, 0) + remaining[field] * quantity
+
+    return {field: remaining[field] for field in graph.fields}
+
+def _raw_column(columns, resource, size):
+    """Vectorized crafting_graph.raw_available"""
+    amount = _column(columns, resource, size)
+    if resource in RAW_CLUSTER_FIELDS:
+        cluster_field, per_cluster_key = RAW_CLUSTER_FIELDS[resource]
+        amount = amount + _column(columns, cluster_field, size) * CONVERSIONS[per_cluster_key]
+    return amount
+
+def calculate_craftable_bags_from_resources(columns):
+    """Vectorized utils.calculate_craftable_bags_from_resources
+
+    Returns dict of arrays with craftable counts for each bag type
+    """
+    keys = ['ops_from_tech_scraps', 'total_craftable_doras', 'total_available_ops', 'total_available_fannys']
+    if not HAS_NUMPY:
+        rows = [utils.calculate_craftable_bags_from_resources(row) for row in _rows(columns)]
+        return _dict_of_lists(rows, keys)
+
+    size = _length(columns)
+    plan = get_chain_plan()
+    graph = plan.graph
+    crafted = {}
+    available = {}
+    for tier in graph.tiers:
+        limits = [_raw_column(columns, resource, size) // quantity
+                  for resource, quantity in graph.raw_inputs[tier]]
+        limits += [available[graph.field_of[source]] // quantity
+                   for source, quantity in graph.bag_inputs[tier]]
+        field = graph.field_of[tier]
+        crafted[field] = np.minimum.reduce(limits) if limits else np.zeros(size, dtype=np.int64)
+        available[field] = _column(columns, field, size) + crafted[field]
+        if field == plan.dora_field:
+            break
+
+    zeros = np.zeros(size, dtype=np.int64)
+    return {
+        'ops_from_tech_scraps': crafted.get('old_pouches', zeros),
+        'total_craftable_doras': crafted[plan.dora_field],
+        'total_available_ops': available.get('old_pouches', zeros),
+        'total_available_fannys': available.get('fanny_packs', zeros)
+    }
+
+def calculate_scav_time(med_tech_needed):
+    """Vectorized utils.calculate_scav_time over an array of med tech amounts
+
+    Returns dict of arrays with hours and days for both syn states
+    """
+    keys = ['hours_no_syn', 'days_no_syn', 'hours_with_syn', 'days_with_syn']
+    if not HAS_NUMPY:
+        return _dict_of_lists([utils.calculate_scav_time(amount) for amount in med_tech_needed], keys)
+
+    med_tech_needed = np.asarray(med_tech_needed)
+    runs_needed = np.where(med_tech_needed > 0,
+                           med_tech_needed / utils.calculate_expected_med_tech_per_run(), 0)
+
+    hours_no_syn = runs_needed * SCAVENGING['run_time_hours']
+    hours_with_syn = hours_no_syn * SYN_RATE
+
+    return {
+        'hours_no_syn': hours_no_syn,
+        'days_no_syn': hours_no_syn / 24,
+        'hours_with_syn': hours_with_syn,
+        'days_with_syn': hours_with_syn / 24
+    }
+
+def calculate_scav_time_for_runs(runs):
+    """Vectorized utils.calculate_scav_time_for_runs over an array of run counts"""
+    keys = ['runs', 'hours_no_syn', 'days_no_syn', 'hours_with_syn', 'days_with_syn']
+    if not HAS_NUMPY:
+        return _dict_of_lists([utils.calculate_scav_time_for_runs(count) for count in runs], keys)
+
+    runs = np.asarray(runs)
+    hours_no_syn = runs * SCAVENGING['run_time_hours']
+    hours_with_syn = hours_no_syn * SYN_RATE
+    return {
+        'runs': runs,
+        'hours_no_syn': hours_no_syn,
+        'days_no_syn': hours_no_syn / 24,
+        'hours_with_syn': hours_with_syn,
+        'days_with_syn': hours_with_syn / 24
+    }
+
+def calculate_scav_time_bands(med_tech_needed):
+    """Vectorized scav_distribution.calculate_scav_time_bands over an array of med tech amounts
+
+    Returns dict keyed 'p50', 'p90', ... of calculate_scav_time_for_runs() dicts
+    """
+    distribution = scav_distribution.get_runs_distribution()
+    keys = [f"p{percentile:g}" for percentile in distribution.percentiles]
+    if not HAS_NUMPY:
+        rows = [scav_distribution.calculate_scav_time_bands(amount) for amount in med_tech_needed]
+        return {key: calculate_scav_time_for_runs([row[key]['runs'] for row in rows]) for key in keys}
+
+    drops = np.maximum(0, np.ceil(np.asarray(med_tech_needed) / SCAVENGING['med_tech_per_drop'])).astype(np.int64)
+    most = int(drops.max()) if drops.size else 0
+    bands = {}
+    for key, percentile in zip(keys, distribution.percentiles):
+        distribution.runs_for_drops(most, percentile)  # extends the table to cover the most drops
+        table = np.asarray(distribution.tables[percentile])
+        runs = np.where(drops > 0, np.searchsorted(table, drops) + 1, 0)
+        bands[key] = calculate_scav_time_for_runs(runs)
+    return bands